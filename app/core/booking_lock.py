@@ -0,0 +1,85 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Hashable
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.observability import get_histogram, timed_span
+
+BOOKING_LOCK_WAIT_SECONDS = get_histogram(
+    "booking_lock_wait_seconds",
+    "Time spent waiting for the per-therapist booking lock",
+    "backend",
+)
+
+
+def advisory_key(therapist_id: UUID) -> int:
+    """Signed 64-bit key for pg_advisory_xact_lock derived from the UUID."""
+    value = UUID(str(therapist_id)).int & 0xFFFFFFFFFFFFFFFF
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class KeyedLockTable:
+    """In-process asyncio locks created on demand, one per key.
+
+    Entries are reference counted and dropped once nobody holds or waits for
+    them, so the table only grows with the number of concurrently booked
+    therapists. Different keys never share a lock.
+    """
+
+    def __init__(self):
+        # key -> [lock, holders and waiters]
+        self._entries: dict[Hashable, list] = {}
+
+    async def acquire(self, key: Hashable) -> None:
+        entry = self._entries.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            await entry[0].acquire()
+        except BaseException:
+            self._forget(key, entry)
+            raise
+
+    def release(self, key: Hashable) -> None:
+        entry = self._entries[key]
+        entry[0].release()
+        self._forget(key, entry)
+
+    def _forget(self, key: Hashable, entry: list) -> None:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+LOCAL_BOOKING_LOCKS = KeyedLockTable()
+
+
+@asynccontextmanager
+async def therapist_booking_lock(db: AsyncSession, therapist_id: UUID):
+    """Serialize bookings for one therapist until the block exits.
+
+    On PostgreSQL this takes a transaction-scoped advisory lock, which is
+    released by the commit or rollback that must happen inside the block.
+    Other databases use an in-process lock, which is only correct with a
+    single worker process.
+    """
+    if db.bind.dialect.name == "postgresql":
+        with timed_span("booking.lock_wait", BOOKING_LOCK_WAIT_SECONDS, "postgresql"):
+            await db.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"),
+                {"key": advisory_key(therapist_id)},
+            )
+        yield
+        return
+
+    with timed_span("booking.lock_wait", BOOKING_LOCK_WAIT_SECONDS, "local"):
+        await LOCAL_BOOKING_LOCKS.acquire(therapist_id)
+    try:
+        yield
+    finally:
+        LOCAL_BOOKING_LOCKS.release(therapist_id)
@@ -0,0 +1,170 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency that is known to be failing."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = max(retry_after, 0.0)
+        super().__init__(f"Circuit '{name}' is open; retry in {self.retry_after:.1f}s")
+
+
+class CircuitBreaker:
+    """Failure-counting circuit breaker with a short negative cache.
+
+    - closed: calls go through; `failure_threshold` consecutive failures open
+      the circuit.
+    - open: calls fail fast with `CircuitOpenError` for `reset_timeout`
+      seconds, then the circuit becomes half-open.
+    - half_open: a single trial call is let through; success closes the
+      circuit, failure opens it again.
+
+    Independently of the state, every failure is negatively cached for
+    `negative_ttl` seconds so a burst of requests doesn't retry a dependency
+    that has just failed.
+
+    `is_failure` decides which exceptions count against the dependency, so
+    client errors (e.g. invalid credentials) don't trip the breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        negative_ttl: float = 5,
+        is_failure: Callable[[BaseException], bool] | None = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.negative_ttl = negative_ttl
+        self.is_failure = is_failure or (lambda exc: True)
+        self.state = CLOSED
+        self.failures = 0
+        self.total_failures = 0
+        self.total_successes = 0
+        self.rejected = 0
+        self.opened_at: float = 0
+        self.last_failure_at: float = 0
+        self.last_error: str | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _retry_after(self, now: float) -> float:
+        waits = [self.last_failure_at + self.negative_ttl - now]
+        if self.state == OPEN:
+            waits.append(self.opened_at + self.reset_timeout - now)
+        return max(waits)
+
+    def before_call(self) -> None:
+        """Raise `CircuitOpenError` if the call must not be attempted."""
+        now = time.time()
+        with self._lock:
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+
+            negative_cached = now - self.last_failure_at < self.negative_ttl
+            blocked = (
+                self.state == OPEN
+                or (self.state == HALF_OPEN and self._trial_in_flight)
+                or (self.state == CLOSED and negative_cached)
+            )
+            if blocked:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self._retry_after(now))
+
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.total_successes += 1
+            self._trial_in_flight = False
+
+    def record_failure(self, exc: BaseException | None = None) -> None:
+        now = time.time()
+        with self._lock:
+            self.failures += 1
+            self.total_failures += 1
+            self.last_failure_at = now
+            self.last_error = repr(exc) if exc is not None else None
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = now
+
+    @contextmanager
+    def guard(self):
+        """Wrap one call to the protected dependency.
+
+        Works around both sync calls and `await` expressions.
+        """
+        self.before_call()
+        try:
+            yield
+        except CircuitOpenError:
+            raise
+        except Exception as exc:
+            if self.is_failure(exc):
+                self.record_failure(exc)
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancellation says nothing about the dependency's health
+            with self._lock:
+                self._trial_in_flight = False
+            raise
+        else:
+            self.record_success()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = 0
+            self.last_failure_at = 0
+            self.last_error = None
+            self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "total_failures": self.total_failures,
+                "total_successes": self.total_successes,
+                "rejected": self.rejected,
+                "retry_after": max(self._retry_after(now), 0.0),
+                "last_error": self.last_error,
+            }
+
+
+BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Return the named breaker, creating it with `kwargs` on first use."""
+    breaker = BREAKERS.get(name)
+    if breaker is None:
+        breaker = BREAKERS[name] = CircuitBreaker(name, **kwargs)
+    return breaker
+
+
+def breaker_states() -> list[Dict[str, Any]]:
+    return [breaker.snapshot() for breaker in BREAKERS.values()]
@@ -18,6 +18,19 @@ class Settings(BaseSettings):
     smtp_password: str
     smtp_host: str = "smtp.gmail.com"
     smtp_port: int = 587
+    # Which token signatures this deployment accepts: "hs256", "jwks" or "both"
+    jwt_verification_mode: str = "both"
+    # Fraction of successful token verifications that are logged
+    auth_log_sample_rate: float = 0.01
+    # Free-slot response cache: empty for in-process, or a redis:// URL
+    slot_cache_url: str = ""
+    slot_cache_ttl: int = 300
+    # Serialize bookings per therapist, for databases without the no-overlap
+    # constraint
+    booking_lock_enabled: bool = False
+    # Where slot holds live: "memory" (single node) or "database" (shared)
+    slot_hold_backend: str = "memory"
+    slot_hold_ttl: int = 300
 
     model_config = ConfigDict(env_file=".env", extra="allow")
 
@@ -57,6 +70,18 @@ def get_settings():
             "smtp_password": os.environ.get("SMTP_PASSWORD", ""),
             "smtp_host": os.environ.get("SMTP_HOST", "smtp.gmail.com"),
             "smtp_port": _int_env("SMTP_PORT", 587),
+            "jwt_verification_mode": os.environ.get("JWT_VERIFICATION_MODE", "both"),
+            "auth_log_sample_rate": float(
+                os.environ.get("AUTH_LOG_SAMPLE_RATE", "0.01")
+            ),
+            "slot_cache_url": os.environ.get("SLOT_CACHE_URL", ""),
+            "slot_cache_ttl": _int_env("SLOT_CACHE_TTL", 300),
+            "booking_lock_enabled": os.environ.get(
+                "BOOKING_LOCK_ENABLED", "false"
+            ).lower()
+            in ("1", "true", "yes"),
+            "slot_hold_backend": os.environ.get("SLOT_HOLD_BACKEND", "memory"),
+            "slot_hold_ttl": _int_env("SLOT_HOLD_TTL", 300),
         }
 
         return SimpleNamespace(**fallback)  # type: ignore[return-value]
@@ -1,3 +1,4 @@
 UNKNOWN_ROLE_ERROR = "Unknown role"
 APPOINTMENT_NOT_FOUND_ERROR = "Appointment not found"
 NOT_ALLOWED_ERROR = "Not allowed"
+AUTH_UNAVAILABLE_ERROR = "Authentication service temporarily unavailable"
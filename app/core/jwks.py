@@ -0,0 +1,292 @@
+import asyncio
+import base64
+import logging
+import time
+from typing import Any, Dict, Tuple
+
+import httpx
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec as cryptography_ec
+from cryptography.hazmat.primitives.asymmetric.ec import EllipticCurvePublicNumbers
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicNumbers
+from jose import jwk
+from jose.backends.base import Key
+from jose.exceptions import JWKError
+
+from app.core.circuit_breaker import CircuitOpenError, get_breaker
+from app.core.config import settings
+from app.core.observability import (
+    get_event_logger,
+    get_histogram,
+    log_event,
+    timed_span,
+)
+
+# Constants
+JWKS_TTL = 300  # JWKS cache time-to-live in seconds
+# Start a background refresh this many seconds before `JWKS_TTL` runs out
+JWKS_REFRESH_AHEAD = 60
+# Keys older than this make callers wait on a refresh attempt; if it fails
+# the last known good keys are still served
+JWKS_MAX_STALE = 3600
+# Minimum seconds between forced JWKS refreshes triggered by an unknown `kid`
+JWKS_MIN_REFRESH_INTERVAL = 30
+JWKS_FETCH_TIMEOUT = 5  # seconds per HTTP request
+# Failed refreshes are not retried for this many seconds
+JWKS_NEGATIVE_TTL = 10
+JWKS_ALGORITHMS = ["RS256", "ES256"]
+# Default signing algorithm per JWK key type when the JWK omits `alg`
+JWK_DEFAULT_ALGORITHMS = {"RSA": "RS256", "EC": "ES256"}
+
+AUTH_STAGE_SECONDS = get_histogram(
+    "auth_stage_seconds", "Authentication latency per stage", "stage"
+)
+auth_logger = get_event_logger("mgfisiobook.auth")
+
+
+class JWKSFetchError(Exception):
+    """Raised when no JWKS endpoint returned a usable key set."""
+
+
+def _base64url_to_int(val: str) -> int:
+    """Decode base64url string to integer."""
+    val_padded = val + "=" * (-len(val) % 4)
+    data = base64.urlsafe_b64decode(val_padded)
+    return int.from_bytes(data, "big")
+
+
+def jwk_to_public_key(jwk_data: Dict[str, Any]):
+    """Build a `cryptography` public key object from an RSA or EC JWK."""
+    kty = jwk_data.get("kty")
+
+    if kty == "RSA":
+        n = _base64url_to_int(jwk_data["n"])
+        e = _base64url_to_int(jwk_data["e"])
+        return RSAPublicNumbers(e, n).public_key(default_backend())
+
+    if kty == "EC":
+        x = _base64url_to_int(jwk_data["x"])
+        y = _base64url_to_int(jwk_data["y"])
+        curve_name = jwk_data.get("crv", "")
+
+        if curve_name != "P-256":
+            raise ValueError(f"Unsupported EC curve: {curve_name}")
+
+        curve = cryptography_ec.SECP256R1()
+        return EllipticCurvePublicNumbers(x, y, curve).public_key(default_backend())
+
+    raise ValueError(f"Unsupported JWK key type: {kty}")
+
+
+def jwk_to_pem(jwk_data: Dict[str, Any]) -> bytes:
+    """Convert a JWK to PEM format for RSA or EC keys."""
+    pub_key = jwk_to_public_key(jwk_data)
+    return pub_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+
+
+def build_key_store(jwks: Dict[str, Any]) -> Dict[Any, Tuple[str, Key]]:
+    """Parse every usable JWK once and index it by `kid`.
+
+    Values are `(alg, key)` pairs where `key` wraps the already constructed
+    public key, so verification never re-parses or re-serializes it. Keys
+    without a `kid` are stored under `None`.
+    """
+    store: Dict[Any, Tuple[str, Key]] = {}
+    for jwk_data in jwks.get("keys", []):
+        if jwk_data.get("use", "sig") != "sig":
+            continue
+        alg = jwk_data.get("alg") or JWK_DEFAULT_ALGORITHMS.get(jwk_data.get("kty"))
+        if alg not in JWKS_ALGORITHMS:
+            continue
+        try:
+            key = jwk.construct(jwk_to_public_key(jwk_data), alg)
+        except (JWKError, ValueError, KeyError) as e:
+            log_event(
+                auth_logger,
+                "jwk_skipped",
+                logging.WARNING,
+                kid=jwk_data.get("kid"),
+                reason=str(e),
+            )
+            continue
+        store[jwk_data.get("kid")] = (alg, key)
+    return store
+
+
+class JWKSManager:
+    """Async, single-flight JWKS cache with stale-while-revalidate.
+
+    - A cold cache blocks callers on one shared fetch.
+    - Once the keys are older than `ttl - refresh_ahead`, a refresh is started
+      in the background and callers keep getting the current keys.
+    - Concurrent refreshes collapse into a single in-flight task.
+    - The endpoint that last worked is tried first on the next refresh.
+    - Fetches go through the "jwks" circuit breaker; while it is open, or the
+      last failure is still negatively cached, the last known good keys keep
+      being served and cold callers fail fast instead of waiting on timeouts.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        ttl: int = JWKS_TTL,
+        refresh_ahead: int = JWKS_REFRESH_AHEAD,
+        max_stale: int = JWKS_MAX_STALE,
+        timeout: float = JWKS_FETCH_TIMEOUT,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.keys: Dict[str, Any] | None = None
+        self.key_store: Dict[Any, Tuple[str, Key]] = {}
+        self.fetched_at: float = 0
+        self.endpoint: str | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self.breaker = get_breaker(
+            "jwks", failure_threshold=3, negative_ttl=JWKS_NEGATIVE_TTL
+        )
+
+    @property
+    def candidates(self) -> list[str]:
+        # Plausible JWKS endpoints that supabase/gotrue may expose, with the
+        # last one that worked moved to the front.
+        urls = [
+            f"{self.base_url}/auth/v1/.well-known/jwks.json",
+            f"{self.base_url}/.well-known/jwks.json",
+            f"{self.base_url}/auth/v1/certs",
+            f"{self.base_url}/.well-known/openid-configuration",
+        ]
+        if self.endpoint in urls:
+            urls.remove(self.endpoint)
+            urls.insert(0, self.endpoint)
+        return urls
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def load(self, data: Dict[str, Any], endpoint: str | None = None) -> None:
+        """Install a JWKS document and rebuild the `kid` index."""
+        self.key_store = build_key_store(data)
+        self.keys = data
+        self.fetched_at = time.time()
+        if endpoint is not None:
+            self.endpoint = endpoint
+
+    def clear(self) -> None:
+        self.keys = None
+        self.key_store = {}
+        self.fetched_at = 0
+        self._refresh_task = None
+
+    async def get_key_store(self) -> Dict[Any, Tuple[str, Key]]:
+        """Return the current key store, refreshing it as needed."""
+        age = self.age()
+        if self.keys is None:
+            await self.refresh()
+        elif age >= self.max_stale:
+            try:
+                await self.refresh()
+            except JWKSFetchError as e:
+                # Keep serving the last known good keys through an outage
+                log_event(
+                    auth_logger,
+                    "jwks_serving_stale",
+                    logging.WARNING,
+                    age=round(age),
+                    reason=str(e),
+                )
+        elif age >= self.ttl - self.refresh_ahead:
+            self.refresh_in_background()
+        return self.key_store
+
+    async def refresh(self) -> Dict[Any, Tuple[str, Key]]:
+        """Refresh the keys, joining an in-flight refresh if there is one."""
+        # shield() so a cancelled request doesn't cancel the shared fetch
+        await asyncio.shield(self._ensure_refresh_task())
+        return self.key_store
+
+    def refresh_in_background(self) -> None:
+        self._ensure_refresh_task()
+
+    def _ensure_refresh_task(self) -> asyncio.Task:
+        task = self._refresh_task
+        loop = asyncio.get_running_loop()
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._fetch())
+            task.add_done_callback(self._on_refresh_done)
+            self._refresh_task = task
+        return task
+
+    @staticmethod
+    def _on_refresh_done(task: asyncio.Task) -> None:
+        # Mark the exception as retrieved; callers awaiting the task still
+        # see it, background refreshes just keep serving the stale keys.
+        if not task.cancelled() and task.exception() is not None:
+            log_event(
+                auth_logger,
+                "jwks_refresh_failed",
+                logging.WARNING,
+                reason=str(task.exception()),
+            )
+
+    async def _fetch(self) -> None:
+        try:
+            with self.breaker.guard():
+                with timed_span("auth.jwks_fetch", AUTH_STAGE_SECONDS, "jwks_fetch"):
+                    await self._fetch_candidates()
+        except CircuitOpenError as e:
+            raise JWKSFetchError(str(e)) from e
+
+    async def _fetch_candidates(self) -> None:
+        last_exc: Exception | None = None
+        candidates = self.candidates
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            for url in candidates:
+                try:
+                    data = await self._fetch_url(client, url)
+                    self.load(data, endpoint=url)
+                    log_event(auth_logger, "jwks_fetched", endpoint=url)
+                    return
+                except Exception as e:  # pragma: no cover - network behavior
+                    last_exc = e
+                    log_event(
+                        auth_logger,
+                        "jwks_fetch_attempt_failed",
+                        logging.WARNING,
+                        endpoint=url,
+                        reason=str(e),
+                    )
+                    continue
+
+        # Nothing worked
+        raise JWKSFetchError(
+            f"All JWKS endpoints failed; tried: {candidates}; last error: {last_exc}"
+        )
+
+    @staticmethod
+    async def _fetch_url(client: httpx.AsyncClient, url: str) -> Dict[str, Any]:
+        resp = await client.get(url)
+        # Accept 200 responses only
+        if resp.status_code != 200:
+            raise httpx.HTTPError(f"HTTP {resp.status_code}: {resp.reason_phrase}")
+
+        data = resp.json()
+
+        # Some endpoints return OpenID config containing a `jwks_uri` entry
+        if "keys" not in data and "jwks_uri" in data:
+            resp = await client.get(data["jwks_uri"])
+            resp.raise_for_status()
+            data = resp.json()
+
+        if "keys" not in data:
+            raise ValueError("No 'keys' in JWKS response")
+        return data
+
+
+jwks_manager = JWKSManager(settings.supabase_url)
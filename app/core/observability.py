@@ -0,0 +1,192 @@
+import atexit
+import bisect
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterable, Tuple
+
+try:  # Optional: emit real trace spans when OpenTelemetry is installed
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - depends on installed extras
+    otel_trace = None
+
+# Latency buckets in seconds, from sub-millisecond crypto to slow JWKS fetches
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with Prometheus text export."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_name: str,
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.label_name = label_name
+        self.buckets = tuple(sorted(buckets))
+        # label value -> [bucket counts..., +Inf count], sum
+        self._series: Dict[str, Tuple[list[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label: str, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(label, (None, 0.0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self._series[label] = (counts, total + value)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                label: {"count": sum(counts), "sum": total}
+                for label, (counts, total) in self._series.items()
+            }
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = {k: (list(c), s) for k, (c, s) in self._series.items()}
+        for label, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'{self.name}_bucket{{{self.label_name}="{label}",le="{le}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(f'{self.name}_sum{{{self.label_name}="{label}"}} {total}')
+            lines.append(
+                f'{self.name}_count{{{self.label_name}="{label}"}} {cumulative}'
+            )
+        return lines
+
+
+HISTOGRAMS: Dict[str, Histogram] = {}
+
+
+def get_histogram(name: str, description: str, label_name: str) -> Histogram:
+    histogram = HISTOGRAMS.get(name)
+    if histogram is None:
+        histogram = HISTOGRAMS[name] = Histogram(name, description, label_name)
+    return histogram
+
+
+def render_metrics(gauges: Dict[str, float] | None = None) -> str:
+    """Render every registered histogram, plus ad-hoc gauges, as Prometheus text."""
+    lines: list[str] = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.render())
+    typed: set[str] = set()
+    for name, value in (gauges or {}).items():
+        # Gauge names may carry labels, e.g. 'circuit_breaker_open{name="jwks"}'
+        base = name.split("{", 1)[0]
+        if base not in typed:
+            typed.add(base)
+            lines.append(f"# TYPE {base} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# Per-request trace: list of (span name, seconds), set by the timing middleware
+request_spans: ContextVar[list | None] = ContextVar("request_spans", default=None)
+
+_tracer = otel_trace.get_tracer("mgfisiobook") if otel_trace else None
+
+
+@contextmanager
+def timed_span(name: str, histogram: Histogram | None = None, label: str = ""):
+    """Time a block into `histogram`, the current request trace and OpenTelemetry."""
+    otel_span = _tracer.start_as_current_span(name) if _tracer else nullcontext()
+    start = time.perf_counter()
+    with otel_span:
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if histogram is not None:
+                histogram.observe(label or name, elapsed)
+            spans = request_spans.get()
+            if spans is not None:
+                spans.append((name, elapsed))
+
+
+def server_timing_header(spans: list) -> str:
+    return ", ".join(f"{name};dur={elapsed * 1000:.3f}" for name, elapsed in spans)
+
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        event.update(getattr(record, "fields", {}))
+        return json.dumps(event, default=str)
+
+
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(_JSONFormatter())
+# Records are formatted and written on the listener's thread, never on the
+# request path.
+_listener = QueueListener(_log_queue, _stream_handler)
+_listener.start()
+atexit.register(_listener.stop)
+
+
+def get_event_logger(name: str) -> logging.Logger:
+    logger = logging.getLogger(name)
+    if not any(isinstance(h, QueueHandler) for h in logger.handlers):
+        logger.addHandler(QueueHandler(_log_queue))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def log_event(
+    logger: logging.Logger,
+    event: str,
+    level: int = logging.INFO,
+    sample_rate: float = 1.0,
+    **fields: Any,
+) -> None:
+    """Emit a structured event, keeping only `sample_rate` of them."""
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
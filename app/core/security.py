@@ -1,95 +1,104 @@
-import base64
+import hashlib
+import logging
 import time
-from typing import Any, Dict
-
-import requests
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import ec as cryptography_ec
-from cryptography.hazmat.primitives.asymmetric.ec import EllipticCurvePublicNumbers
-from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicNumbers
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer
+from typing import Any, Dict, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
+from jose.backends.base import Key
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.database import get_db
+from app.core.jwks import (
+    JWKS_ALGORITHMS,
+    JWKS_MIN_REFRESH_INTERVAL,
+    JWKSFetchError,
+    jwks_manager,
+)
+from app.core.observability import (
+    get_event_logger,
+    get_histogram,
+    log_event,
+    timed_span,
+)
+from app.services.principal_service import Principal, resolve_principal
 
 # Constants
-JWKS_TTL = 300  # JWKS cache time-to-live in seconds
 JWT_DECODE_OPTIONS = {"verify_aud": False}
 HS256_ALGORITHMS = ["HS256"]
-JWKS_ALGORITHMS = ["RS256", "ES256"]
+# Algorithm families enabled by each `settings.jwt_verification_mode`
+VERIFICATION_MODES = {
+    "hs256": frozenset(HS256_ALGORITHMS),
+    "jwks": frozenset(JWKS_ALGORITHMS),
+    "both": frozenset(HS256_ALGORITHMS + JWKS_ALGORITHMS),
+}
 # Allow small clock skew when verifying `exp`
 LEEWAY = 10  # seconds
+# Maximum number of verified tokens kept in memory
+TOKEN_CACHE_MAX_SIZE = 1024
+
+AUTH_STAGE_SECONDS = get_histogram(
+    "auth_stage_seconds", "Authentication latency per stage", "stage"
+)
+auth_logger = get_event_logger("mgfisiobook.auth")
+
+
+def _auth_stage(name: str):
+    """Time one authentication stage into metrics and the request trace."""
+    return timed_span(f"auth.{name}", AUTH_STAGE_SECONDS, name)
+
+
+def _log_sample_rate() -> float:
+    return settings.auth_log_sample_rate
+
+
+class TimedHTTPBearer(HTTPBearer):
+    """`HTTPBearer` that records how long bearer parsing takes."""
+
+    async def __call__(self, request: Request) -> HTTPAuthorizationCredentials:
+        with _auth_stage("bearer"):
+            return await super().__call__(request)
+
 
 # Security schemes
-bearer_scheme = HTTPBearer()
+bearer_scheme = TimedHTTPBearer()
 
-# JWKS cache
-JWKS_CACHE: Dict[str, Any] = {"keys": None, "fetched_at": 0}
 
+class VerifiedTokenCache(TTLCache):
+    """Bounded LRU of already verified tokens.
 
-def _fetch_jwks() -> Dict[str, Any]:
-    """Fetch JWKS from Supabase with caching."""
-    now = time.time()
+    Entries are keyed by the SHA-256 of the raw token, hold the extracted user
+    data and expire at the token's `exp` plus `LEEWAY`, so a cached token is
+    never accepted after the point where verification would reject it.
+    """
 
-    # Return cached JWKS if still valid
-    if JWKS_CACHE["keys"] and (now - JWKS_CACHE["fetched_at"]) < JWKS_TTL:
-        return JWKS_CACHE["keys"]
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE):
+        super().__init__(max_size=max_size, ttl=0)
 
-    # Fetch fresh JWKS
-    base = settings.supabase_url.rstrip("/")
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
 
-    # Try a list of plausible JWKS endpoints that supabase/gotrue may expose.
-    candidates = [
-        f"{base}/auth/v1/.well-known/jwks.json",
-        f"{base}/.well-known/jwks.json",
-        f"{base}/auth/v1/certs",
-        f"{base}/.well-known/openid-configuration",
-    ]
+    def get(self, token: str) -> Dict[str, Any] | None:
+        user = super().get(self._key(token))
+        return dict(user) if user is not None else None
 
-    last_exc: Exception | None = None
-    for url in candidates:
-        try:
-            resp = requests.get(url, timeout=5)
-            # Accept 200 responses only
-            if resp.status_code != 200:
-                raise requests.HTTPError(f"HTTP {resp.status_code}: {resp.reason}")
-
-            data = resp.json()
-
-            # Some endpoints return OpenID config containing a `jwks_uri` entry
-            if "keys" not in data and "jwks_uri" in data:
-                jwks_uri = data["jwks_uri"]
-                resp = requests.get(jwks_uri, timeout=5)
-                resp.raise_for_status()
-                data = resp.json()
-
-            if "keys" not in data:
-                raise ValueError("No 'keys' in JWKS response")
-
-            JWKS_CACHE["keys"] = data
-            JWKS_CACHE["fetched_at"] = now
-            print(f"Fetched JWKS from: {url}")
-            return data
-        except Exception as e:  # pragma: no cover - network/requests behavior
-            last_exc = e
-            print(f"JWKS fetch attempt failed for {url}: {e}")
-            continue
-
-    # Nothing worked
-    print(f"All JWKS endpoints failed; tried: {candidates}; last error: {last_exc}")
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Unable to fetch JWKS for token verification",
-    )
+    def set(self, token: str, payload: Dict[str, Any], user: Dict[str, Any]):
+        exp = payload.get("exp")
+        if exp is None:
+            # Tokens without `exp` never expire on their own; don't pin them
+            return
+        ttl = int(exp) + LEEWAY - time.time()
+        super().set(self._key(token), dict(user), ttl=ttl)
 
+    def discard(self, token: str) -> None:
+        super().discard(self._key(token))
 
-def _base64url_to_int(val: str) -> int:
-    """Decode base64url string to integer."""
-    val_padded = val + "=" * (-len(val) % 4)
-    data = base64.urlsafe_b64decode(val_padded)
-    return int.from_bytes(data, "big")
+
+TOKEN_CACHE = VerifiedTokenCache()
 
 
 def _check_expiration(payload: Dict[str, Any]) -> None:
@@ -108,31 +117,29 @@ def _check_expiration(payload: Dict[str, Any]) -> None:
         )
 
 
-def _jwk_to_pem(jwk: Dict[str, Any]) -> bytes:
-    """Convert a JWK to PEM format for RSA or EC keys."""
-    kty = jwk.get("kty")
-
-    if kty == "RSA":
-        n = _base64url_to_int(jwk["n"])
-        e = _base64url_to_int(jwk["e"])
-        pub_key = RSAPublicNumbers(e, n).public_key(default_backend())
-    elif kty == "EC":
-        x = _base64url_to_int(jwk["x"])
-        y = _base64url_to_int(jwk["y"])
-        curve_name = jwk.get("crv", "")
+async def _select_jwks_key(header: Dict[str, Any]) -> Tuple[str, Key]:
+    """Pick the verification key matching the token header's `kid`.
 
-        if curve_name != "P-256":
-            raise ValueError(f"Unsupported EC curve: {curve_name}")
-
-        curve = cryptography_ec.SECP256R1()
-        pub_key = EllipticCurvePublicNumbers(x, y, curve).public_key(default_backend())
-    else:
-        raise ValueError(f"Unsupported JWK key type: {kty}")
-
-    return pub_key.public_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PublicFormat.SubjectPublicKeyInfo,
-    )
+    An unknown `kid` usually means the signing keys were rotated, so the JWKS
+    is refetched once, at most every `JWKS_MIN_REFRESH_INTERVAL` seconds.
+    """
+    kid = header.get("kid")
+    with _auth_stage("jwks_keys"):
+        key_store = await jwks_manager.get_key_store()
+    with _auth_stage("key_selection"):
+        entry = key_store.get(kid)
+
+    if entry is None and jwks_manager.age() >= JWKS_MIN_REFRESH_INTERVAL:
+        with _auth_stage("jwks_keys"):
+            key_store = await jwks_manager.refresh()
+        entry = key_store.get(kid)
+
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token signature",
+        )
+    return entry
 
 
 def _verify_token_hs256(token: str) -> Dict[str, Any]:
@@ -141,55 +148,129 @@ def _verify_token_hs256(token: str) -> Dict[str, Any]:
         # Disable automatic exp verification so we can apply a leeway check manually
         opts = dict(JWT_DECODE_OPTIONS)
         opts_with_no_exp = {**opts, "verify_exp": False}
-        payload = jwt.decode(
-            token=token,
-            key=settings.supabase_secret_key,
-            algorithms=HS256_ALGORITHMS,
-            options=opts_with_no_exp,
-        )
-        print("JWT Payload (verified HS256):", payload)
-        _check_expiration(payload)
-        return payload
+        with _auth_stage("hs256"):
+            payload = jwt.decode(
+                token=token,
+                key=settings.supabase_secret_key,
+                algorithms=HS256_ALGORITHMS,
+                options=opts_with_no_exp,
+            )
     except JWTError as e:
-        print(f"HS256 verification failed: {e}")
+        log_event(
+            auth_logger, "token_rejected", logging.WARNING, alg="HS256", reason=str(e)
+        )
         raise
 
+    log_event(
+        auth_logger,
+        "token_verified",
+        sample_rate=_log_sample_rate(),
+        alg="HS256",
+        sub=payload.get("sub"),
+    )
+    return payload
+
+
+def _get_token_header(token: str) -> Dict[str, Any]:
+    """Read the unverified JOSE header, used only to route verification."""
+    try:
+        return jwt.get_unverified_header(token)
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token header",
+        )
+
+
+def _allowed_algorithms() -> frozenset:
+    mode = str(getattr(settings, "jwt_verification_mode", "both")).lower()
+    try:
+        return VERIFICATION_MODES[mode]
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unknown JWT verification mode: {mode}",
+        )
+
+
+async def _verify_token_jwks(
+    token: str, header: Dict[str, Any] | None = None
+) -> Dict[str, Any]:
+    """Verify an asymmetric token against the JWKS key named by its `kid`."""
+    if header is None:
+        header = _get_token_header(token)
 
-def _verify_token_jwks(token: str) -> Dict[str, Any]:
-    """Attempt JWKS-based verification with public keys."""
     try:
-        jwks = _fetch_jwks()
-    except Exception as e:
-        print(f"Failed to fetch JWKS: {e}")
+        alg, key = await _select_jwks_key(header)
+    except HTTPException:
+        raise
+    except JWKSFetchError as e:
+        log_event(auth_logger, "jwks_unavailable", logging.ERROR, reason=str(e))
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Unable to fetch JWKS for token verification",
         )
 
-    last_exc = None
     opts = dict(JWT_DECODE_OPTIONS)
     opts_with_no_exp = {**opts, "verify_exp": False}
-    for jwk in jwks.get("keys", []):
-        try:
-            pem = _jwk_to_pem(jwk)
+    try:
+        with _auth_stage("signature"):
             payload = jwt.decode(
                 token=token,
-                key=pem,
-                algorithms=JWKS_ALGORITHMS,
+                key=key,
+                algorithms=[alg],
                 options=opts_with_no_exp,
             )
-            print("JWT Payload (verified via JWKS):", payload)
-            _check_expiration(payload)
-            return payload
-        except (JWTError, ValueError) as e:
-            last_exc = e
-            continue
-
-    print(f"JWT verification via JWKS failed: {last_exc}")
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Invalid token signature",
+    except JWTError as e:
+        log_event(
+            auth_logger,
+            "token_rejected",
+            logging.WARNING,
+            alg=alg,
+            kid=header.get("kid"),
+            reason=str(e),
+        )
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token signature",
+        )
+
+    log_event(
+        auth_logger,
+        "token_verified",
+        sample_rate=_log_sample_rate(),
+        alg=alg,
+        kid=header.get("kid"),
+        sub=payload.get("sub"),
     )
+    return payload
+
+
+async def _verify_token(token: str) -> Dict[str, Any]:
+    """Dispatch verification on the header's `alg`.
+
+    Each token takes exactly one verification path, and only if its algorithm
+    is enabled by `settings.jwt_verification_mode`.
+    """
+    with _auth_stage("header"):
+        header = _get_token_header(token)
+    alg = header.get("alg")
+    if alg not in _allowed_algorithms():
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Unsupported token algorithm",
+        )
+
+    if alg in HS256_ALGORITHMS:
+        try:
+            return _verify_token_hs256(token)
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token signature",
+            )
+
+    return await _verify_token_jwks(token, header)
 
 
 def _extract_user_data(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -212,15 +293,19 @@ def _extract_user_data(payload: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def get_current_user(token: str = Depends(bearer_scheme)) -> Dict[str, Any]:
+async def get_current_user(token: str = Depends(bearer_scheme)) -> Dict[str, Any]:
     """Verify JWT token and extract user information."""
-    # Try HS256 verification first, then fall back to JWKS
-    try:
-        payload = _verify_token_hs256(token.credentials)
-    except JWTError:
-        payload = _verify_token_jwks(token.credentials)
+    with _auth_stage("token_cache"):
+        cached = TOKEN_CACHE.get(token.credentials)
+    if cached is not None:
+        return cached
 
-    return _extract_user_data(payload)
+    payload = await _verify_token(token.credentials)
+    with _auth_stage("claims"):
+        _check_expiration(payload)
+        user = _extract_user_data(payload)
+    TOKEN_CACHE.set(token.credentials, payload, user)
+    return user
 
 
 def require_role(*allowed_roles: str):
@@ -251,3 +336,27 @@ def require_role(*allowed_roles: str):
 
 
 require_admin = require_role("admin")
+
+
+async def get_principal(
+    user: Dict[str, Any] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> Principal:
+    """Resolve the caller's role, profile id and active flag once per request."""
+    return await resolve_principal(db, user)
+
+
+def require_principal(*allowed_roles: str):
+    """Like `require_role`, but yields the resolved `Principal`."""
+
+    def principal_checker(
+        principal: Principal = Depends(get_principal),
+    ) -> Principal:
+        if principal.role not in allowed_roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions for this operation",
+            )
+        return principal
+
+    return principal_checker
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import time
+from datetime import date
+from typing import Any, Awaitable, Callable, Iterable
+from uuid import UUID
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+SLOT_CACHE_TTL = 300  # seconds; versions make entries stale, TTL bounds memory
+SLOT_CACHE_MAX_SIZE = 4096
+SLOT_CACHE_VERSIONS_MAX_SIZE = 65536
+SLOT_CACHE_VERSIONS_TTL = 24 * 60 * 60
+
+
+def _fresh_version() -> int:
+    # A version that was evicted or never set starts above any earlier value,
+    # so an old entry can never be served under a recreated version.
+    return time.time_ns()
+
+
+class InMemorySlotCacheBackend:
+    """Per-process LRU backend; each worker keeps its own entries."""
+
+    def __init__(
+        self, max_size: int = SLOT_CACHE_MAX_SIZE, ttl: float = SLOT_CACHE_TTL
+    ):
+        self.values = TTLCache(max_size=max_size, ttl=ttl)
+        self.versions = TTLCache(
+            max_size=SLOT_CACHE_VERSIONS_MAX_SIZE, ttl=SLOT_CACHE_VERSIONS_TTL
+        )
+
+    async def get(self, key: str) -> Any:
+        return self.values.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self.values.set(key, value, ttl)
+
+    async def version(self, name: str) -> int:
+        current = self.versions.get(name)
+        if current is None:
+            current = _fresh_version()
+            self.versions.set(name, current)
+        return current
+
+    async def bump(self, name: str) -> None:
+        current = self.versions.get(name)
+        self.versions.set(name, max((current or 0) + 1, _fresh_version()))
+
+    def stats(self) -> dict:
+        return self.values.stats()
+
+
+class RedisSlotCacheBackend:
+    """Shared backend so every worker sees the same entries and versions."""
+
+    def __init__(self, url: str, prefix: str = "mgfisiobook:slots"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:  # pragma: no cover - optional dependency
+            raise RuntimeError(
+                "SLOT_CACHE_URL requires the 'redis' package (pip install redis)"
+            ) from e
+        self.client = redis_asyncio.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get(self, key: str) -> Any:
+        raw = await self.client.get(self._key(key))
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self.client.set(self._key(key), json.dumps(value), ex=int(ttl))
+
+    async def version(self, name: str) -> int:
+        key = self._key(name)
+        raw = await self.client.get(key)
+        if raw is None:
+            await self.client.set(key, _fresh_version(), nx=True)
+            raw = await self.client.get(key)
+        return int(raw)
+
+    async def bump(self, name: str) -> None:
+        key = self._key(name)
+        await self.client.set(key, _fresh_version(), nx=True)
+        await self.client.incr(key)
+
+    def stats(self) -> dict:
+        return {}
+
+
+def create_backend(url: str = ""):
+    """In-process LRU unless a shared store URL is configured."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSlotCacheBackend(url)
+    return InMemorySlotCacheBackend()
+
+
+class SlotCache:
+    """Versioned cache for free-slot and availability responses.
+
+    Every entry is keyed by therapist, day, response kind, its parameters
+    and the current version of that therapist day. The version combines a
+    per-therapist counter (bumped on availability changes, which affect every
+    day) and a per-day counter (bumped on appointment changes), so a bump
+    makes the old entries unreachable instead of deleting them.
+    """
+
+    def __init__(self, backend, ttl: float = SLOT_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def version(self, therapist_id: UUID, day: date) -> str:
+        therapist_version = await self.backend.version(f"v:{therapist_id}")
+        day_version = await self.backend.version(f"v:{therapist_id}:{day}")
+        return f"{therapist_version}.{day_version}"
+
+    async def bump_days(self, therapist_id: UUID, days: Iterable[date]) -> None:
+        for day in days:
+            await self.backend.bump(f"v:{therapist_id}:{day}")
+
+    async def bump_therapist(self, therapist_id: UUID) -> None:
+        await self.backend.bump(f"v:{therapist_id}")
+
+    @staticmethod
+    def etag(version: str, kind: str, therapist_id: UUID, day: date, *params) -> str:
+        raw = ":".join(str(part) for part in (kind, therapist_id, day, *params))
+        digest = hashlib.sha256(f"{raw}:{version}".encode()).hexdigest()[:32]
+        return f'"{digest}"'
+
+    async def get_or_compute(
+        self, etag: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Cached value for `etag` (which already embeds the version)."""
+        key = "s:" + etag.strip('"')
+        value = await self.backend.get(key)
+        if value is None:
+            value = await compute()
+            await self.backend.set(key, value, self.ttl)
+        return value
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+slot_cache = SlotCache(
+    create_backend(settings.slot_cache_url), ttl=settings.slot_cache_ttl
+)
@@ -0,0 +1,223 @@
+import heapq
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.slot_hold import SlotHold
+
+SLOT_HOLD_TTL = 300  # seconds a patient has to confirm a held slot
+
+
+def utcnow() -> datetime:
+    # Hold times are naive UTC, like appointment times
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass(frozen=True)
+class Hold:
+    id: UUID
+    therapist_id: UUID
+    patient_id: UUID
+    treatment_id: UUID
+    start_time: datetime
+    end_time: datetime
+    expires_at: datetime
+
+
+class InMemorySlotHoldBackend:
+    """Per-process holds; each worker sees only its own.
+
+    Holds are indexed by therapist and by patient, and a heap ordered by
+    expiry drops the expired ones lazily on each call, so lookups only touch
+    live holds of the therapists asked for.
+    """
+
+    def __init__(self):
+        self.holds: dict[UUID, Hold] = {}
+        self.by_therapist: dict[UUID, set[UUID]] = defaultdict(set)
+        self.by_patient: dict[UUID, set[UUID]] = defaultdict(set)
+        self.expiry: list[tuple[datetime, UUID]] = []
+
+    def _drop(self, hold_id: UUID) -> Optional[Hold]:
+        hold = self.holds.pop(hold_id, None)
+        if hold is None:
+            return None
+        for index, key in (
+            (self.by_therapist, hold.therapist_id),
+            (self.by_patient, hold.patient_id),
+        ):
+            index[key].discard(hold_id)
+            if not index[key]:
+                del index[key]
+        return hold
+
+    def _purge(self, now: datetime) -> None:
+        # Released holds leave their heap entry behind until it expires
+        while self.expiry and self.expiry[0][0] <= now:
+            _, hold_id = heapq.heappop(self.expiry)
+            self._drop(hold_id)
+
+    async def add(self, db: AsyncSession, hold: Hold) -> None:
+        self._purge(utcnow())
+        self.holds[hold.id] = hold
+        self.by_therapist[hold.therapist_id].add(hold.id)
+        self.by_patient[hold.patient_id].add(hold.id)
+        heapq.heappush(self.expiry, (hold.expires_at, hold.id))
+
+    async def get(self, db: AsyncSession, hold_id: UUID) -> Optional[Hold]:
+        self._purge(utcnow())
+        return self.holds.get(hold_id)
+
+    async def remove(self, db: AsyncSession, hold_id: UUID) -> None:
+        self._drop(hold_id)
+
+    async def remove_patient(self, db: AsyncSession, patient_id: UUID) -> None:
+        for hold_id in list(self.by_patient.get(patient_id, ())):
+            self._drop(hold_id)
+
+    async def active(
+        self,
+        db: AsyncSession,
+        therapist_ids: Sequence[UUID],
+        start: datetime,
+        end: datetime,
+    ) -> list[Hold]:
+        self._purge(utcnow())
+        return [
+            hold
+            for therapist_id in therapist_ids
+            for hold in map(self.holds.get, self.by_therapist.get(therapist_id, ()))
+            if hold.start_time < end and hold.end_time > start
+        ]
+
+    def __len__(self) -> int:
+        return len(self.holds)
+
+
+class DatabaseSlotHoldBackend:
+    """Holds in the `slot_holds` table, shared by every worker.
+
+    Writes run in the caller's transaction and do not commit. Expired rows
+    are filtered out on read and deleted through the expiry index when a
+    new hold is added.
+    """
+
+    @staticmethod
+    def _hold(row: SlotHold) -> Hold:
+        return Hold(
+            id=row.id,
+            therapist_id=row.therapist_id,
+            patient_id=row.patient_id,
+            treatment_id=row.treatment_id,
+            start_time=row.start_time,
+            end_time=row.end_time,
+            expires_at=row.expires_at,
+        )
+
+    async def add(self, db: AsyncSession, hold: Hold) -> None:
+        await db.execute(delete(SlotHold).where(SlotHold.expires_at <= utcnow()))
+        db.add(SlotHold(**asdict(hold)))
+        await db.flush()
+
+    async def get(self, db: AsyncSession, hold_id: UUID) -> Optional[Hold]:
+        query = select(SlotHold).where(
+            SlotHold.id == hold_id, SlotHold.expires_at > utcnow()
+        )
+        row = (await db.execute(query)).scalar_one_or_none()
+        return None if row is None else self._hold(row)
+
+    async def remove(self, db: AsyncSession, hold_id: UUID) -> None:
+        await db.execute(delete(SlotHold).where(SlotHold.id == hold_id))
+
+    async def remove_patient(self, db: AsyncSession, patient_id: UUID) -> None:
+        await db.execute(delete(SlotHold).where(SlotHold.patient_id == patient_id))
+
+    async def active(
+        self,
+        db: AsyncSession,
+        therapist_ids: Sequence[UUID],
+        start: datetime,
+        end: datetime,
+    ) -> list[Hold]:
+        query = select(SlotHold).where(
+            SlotHold.therapist_id.in_(therapist_ids),
+            SlotHold.start_time < end,
+            SlotHold.end_time > start,
+            SlotHold.expires_at > utcnow(),
+        )
+        return [self._hold(row) for row in (await db.execute(query)).scalars()]
+
+
+def create_backend(name: str = "memory"):
+    """In-process holds unless the shared table is configured."""
+    if name == "database":
+        return DatabaseSlotHoldBackend()
+    return InMemorySlotHoldBackend()
+
+
+class SlotHolds:
+    """Slots kept for a patient for `ttl` seconds while they confirm.
+
+    A patient holds at most one slot: a new hold replaces their previous
+    ones, and booking any appointment releases them.
+    """
+
+    def __init__(self, backend, ttl: float = SLOT_HOLD_TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def place(
+        self,
+        db: AsyncSession,
+        patient_id: UUID,
+        therapist_id: UUID,
+        treatment_id: UUID,
+        start: datetime,
+        end: datetime,
+    ) -> Hold:
+        hold = Hold(
+            id=uuid4(),
+            therapist_id=therapist_id,
+            patient_id=patient_id,
+            treatment_id=treatment_id,
+            start_time=start,
+            end_time=end,
+            expires_at=utcnow() + timedelta(seconds=self.ttl),
+        )
+        await self.backend.remove_patient(db, patient_id)
+        await self.backend.add(db, hold)
+        return hold
+
+    async def get(self, db: AsyncSession, hold_id: UUID) -> Optional[Hold]:
+        return await self.backend.get(db, hold_id)
+
+    async def release(self, db: AsyncSession, hold_id: UUID) -> None:
+        await self.backend.remove(db, hold_id)
+
+    async def release_patient(self, db: AsyncSession, patient_id: UUID) -> None:
+        await self.backend.remove_patient(db, patient_id)
+
+    async def active(
+        self,
+        db: AsyncSession,
+        therapist_ids: Sequence[UUID],
+        start: datetime,
+        end: datetime,
+        exclude_patient_id: Optional[UUID] = None,
+    ) -> list[Hold]:
+        """Live holds overlapping [start, end), except the given patient's."""
+        if not therapist_ids:
+            return []
+        holds = await self.backend.active(db, therapist_ids, start, end)
+        return [hold for hold in holds if hold.patient_id != exclude_patient_id]
+
+
+slot_holds = SlotHolds(
+    create_backend(settings.slot_hold_backend), ttl=settings.slot_hold_ttl
+)
@@ -1,5 +1,79 @@
+import httpx
 from supabase import create_client
+from supabase_auth import AsyncGoTrueClient
+from supabase_auth.errors import (
+    AuthApiError,
+    AuthError,
+    AuthRetryableError,
+    AuthUnknownError,
+)
 
+from app.core.circuit_breaker import get_breaker
 from app.core.config import settings
 
+AUTH_HTTP_TIMEOUT = 10  # seconds per GoTrue request
+# Keep-alive pool shared by every auth request in this worker
+AUTH_HTTP_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=30
+)
+
 supabase = create_client(settings.supabase_url, settings.supabase_publishable_key)
+
+_auth_client: AsyncGoTrueClient | None = None
+_auth_http_client: httpx.AsyncClient | None = None
+
+
+def create_auth_client(
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> tuple[AsyncGoTrueClient, httpx.AsyncClient]:
+    """Build a non-blocking GoTrue client over a pooled HTTP client.
+
+    Sessions are neither persisted nor auto-refreshed: the client is shared by
+    all requests, so it must never act on behalf of a stored user session.
+    """
+    http_client = httpx.AsyncClient(
+        timeout=AUTH_HTTP_TIMEOUT,
+        limits=AUTH_HTTP_LIMITS,
+        follow_redirects=True,
+        transport=transport,
+    )
+    key = settings.supabase_publishable_key
+    client = AsyncGoTrueClient(
+        url=f"{settings.supabase_url.rstrip('/')}/auth/v1",
+        headers={"apikey": key, "Authorization": f"Bearer {key}"},
+        http_client=http_client,
+        persist_session=False,
+        auto_refresh_token=False,
+    )
+    return client, http_client
+
+
+def get_auth_client() -> AsyncGoTrueClient:
+    """Return the worker-wide async GoTrue client, creating it on first use."""
+    global _auth_client, _auth_http_client
+    if _auth_client is None or _auth_http_client.is_closed:
+        _auth_client, _auth_http_client = create_auth_client()
+    return _auth_client
+
+
+async def close_auth_client() -> None:
+    global _auth_client, _auth_http_client
+    if _auth_http_client is not None:
+        await _auth_http_client.aclose()
+    _auth_client = _auth_http_client = None
+
+
+def _is_supabase_outage(exc: BaseException) -> bool:
+    """Count network errors and 5xx responses against the breaker.
+
+    Client errors such as invalid credentials or weak passwords mean Supabase
+    answered normally and must not open the circuit.
+    """
+    if isinstance(exc, AuthApiError):
+        return exc.status >= 500
+    if isinstance(exc, (AuthRetryableError, AuthUnknownError)):
+        return True
+    return not isinstance(exc, AuthError)
+
+
+supabase_auth_breaker = get_breaker("supabase_auth", is_failure=_is_supabase_outage)
@@ -1,6 +1,10 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.observability import request_spans, server_timing_header
+from app.core.supabase_client import close_auth_client
 from app.routers import (
     admin,
     appointment,
@@ -9,12 +13,22 @@ from app.routers import (
     device,
     free_slots,
     invoice,
+    metrics,
     patient,
     therapist,
     treatment,
 )
 
-app = FastAPI(title="MGFisioBook API", docs_url="/docs", redoc_url="/redoc")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_auth_client()
+
+
+app = FastAPI(
+    title="MGFisioBook API", docs_url="/docs", redoc_url="/redoc", lifespan=lifespan
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,6 +37,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """Collect the spans timed while handling the request into `Server-Timing`."""
+    token = request_spans.set([])
+    try:
+        response = await call_next(request)
+        spans = request_spans.get()
+    finally:
+        request_spans.reset(token)
+    if spans:
+        response.headers["Server-Timing"] = server_timing_header(spans)
+    return response
+
+
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
 app.include_router(patient.router, prefix="/patients", tags=["patients"])
@@ -33,6 +62,7 @@ app.include_router(invoice.router, prefix="/invoices", tags=["invoices"])
 app.include_router(treatment.router, prefix="/treatments", tags=["treatments"])
 app.include_router(free_slots.router, prefix="/free-slots", tags=["free slots"])
 app.include_router(device.router, prefix="/devices", tags=["devices"])
+app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
 
 
 @app.get("/")
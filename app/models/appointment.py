@@ -1,7 +1,17 @@
 import enum
 import uuid
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Text
+from sqlalchemy import (
+    DDL,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Text,
+    event,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -16,6 +26,19 @@ class AppointmentStatus(str, enum.Enum):
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        Index("ix_appointments_therapist_start", "therapist_id", "start_time"),
+        Index("ix_appointments_patient_start", "patient_id", "start_time"),
+        # Conflict checks and slot computations only read scheduled rows
+        Index(
+            "ix_appointments_scheduled_therapist_span",
+            "therapist_id",
+            "start_time",
+            "end_time",
+            postgresql_where=text("status = 'scheduled'"),
+            sqlite_where=text("status = 'scheduled'"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     patient_id = Column(UUID(as_uuid=True), ForeignKey("patients.id"), nullable=False)
@@ -31,7 +54,68 @@ class Appointment(Base):
         Enum(AppointmentStatus), nullable=False, default=AppointmentStatus.scheduled
     )
     notes = Column(Text)
+    # Shared by the seats of one group session, and by the appointments of a
+    # double booking an admin approved, which may overlap each other; NULL
+    # for other one-to-one appointments
+    session_key = Column(UUID(as_uuid=True))
 
     patient = relationship("Patient")
     therapist = relationship("Therapist")
     treatment = relationship("Treatment")
+
+
+# Overlapping scheduled appointments for the same therapist are rejected by
+# the database, so concurrent bookings cannot both pass a read-then-write
+# check; only rows sharing a session key may overlap. Migrations 0009, 0014
+# and 0015 install the same objects on existing databases.
+NO_OVERLAP_CONSTRAINT = "appointments_no_overlap"
+
+event.listen(
+    Appointment.__table__,
+    "after_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+event.listen(
+    Appointment.__table__,
+    "after_create",
+    DDL(
+        f"ALTER TABLE appointments ADD CONSTRAINT {NO_OVERLAP_CONSTRAINT} "
+        "EXCLUDE USING gist ("
+        "therapist_id WITH =, tsrange(start_time, end_time, '[)') WITH &&, "
+        "COALESCE(session_key, id) WITH <>"
+        ") WHERE (status = 'scheduled')"
+    ).execute_if(dialect="postgresql"),
+)
+
+_SQLITE_OVERLAP_CHECK = f"""
+    WHEN NEW.status = 'scheduled'
+    BEGIN
+        SELECT RAISE(ABORT, '{NO_OVERLAP_CONSTRAINT}')
+        WHERE EXISTS (
+            SELECT 1 FROM appointments AS other
+            WHERE other.therapist_id = NEW.therapist_id
+              AND other.id != NEW.id
+              AND other.status = 'scheduled'
+              AND other.start_time < NEW.end_time
+              AND other.end_time > NEW.start_time
+              AND COALESCE(other.session_key, other.id)
+                  != COALESCE(NEW.session_key, NEW.id)
+        );
+    END
+"""
+
+for _name, _timing in [
+    ("insert", "BEFORE INSERT"),
+    (
+        "update",
+        "BEFORE UPDATE OF therapist_id, start_time, end_time, status, session_key",
+    ),
+]:
+    event.listen(
+        Appointment.__table__,
+        "after_create",
+        DDL(
+            f"CREATE TRIGGER {NO_OVERLAP_CONSTRAINT}_{_name} {_timing} "
+            f"ON appointments FOR EACH ROW {_SQLITE_OVERLAP_CHECK}"
+        ).execute_if(dialect="sqlite"),
+    )
@@ -0,0 +1,32 @@
+import uuid
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.models.base import Base
+
+
+class AvailabilityException(Base):
+    """Time off carved out of the weekly availability template.
+
+    Covers `[start_time, end_time)` in naive UTC, like appointments. Rows
+    without a therapist apply to every therapist (public holidays).
+    """
+
+    __tablename__ = "availability_exceptions"
+    # Lookups ask for exceptions ending after a day starts; leading with the
+    # end time skips the past ones, which pile up over the years
+    __table_args__ = (
+        Index(
+            "ix_availability_exceptions_therapist_end",
+            "therapist_id",
+            "end_time",
+            "start_time",
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    therapist_id = Column(UUID(as_uuid=True), ForeignKey("therapists.id"))
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    reason = Column(String)
@@ -12,7 +12,7 @@ class Invoice(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     appointment_id = Column(
-        UUID(as_uuid=True), ForeignKey("appointments.id"), nullable=False
+        UUID(as_uuid=True), ForeignKey("appointments.id"), nullable=False, index=True
     )
     amount = Column(Numeric(10, 2), nullable=False)
     paid = Column(Boolean, default=False)
@@ -0,0 +1,43 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.models.base import Base
+
+
+class SlotCalendarDay(Base):
+    """Marks a therapist's day as materialized in `free_intervals`."""
+
+    __tablename__ = "slot_calendar_days"
+
+    therapist_id = Column(
+        UUID(as_uuid=True), ForeignKey("therapists.id"), primary_key=True
+    )
+    day = Column(Date, primary_key=True)
+    built_at = Column(
+        DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+
+
+class FreeInterval(Base):
+    """Free part of one availability block on one day.
+
+    Offsets are seconds since midnight of `day`. `anchor_offset` is the start
+    of the availability block, so slots keep starting on the block's grid.
+    """
+
+    __tablename__ = "free_intervals"
+    __table_args__ = (
+        Index("ix_free_intervals_therapist_day", "therapist_id", "day", "start_offset"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    therapist_id = Column(
+        UUID(as_uuid=True), ForeignKey("therapists.id"), nullable=False
+    )
+    day = Column(Date, nullable=False)
+    anchor_offset = Column(Integer, nullable=False)
+    start_offset = Column(Integer, nullable=False)
+    end_offset = Column(Integer, nullable=False)
@@ -0,0 +1,33 @@
+import uuid
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.models.base import Base
+
+
+class SlotHold(Base):
+    """A slot kept for one patient while they confirm the booking.
+
+    Only used by the database hold store (multi-node deployments); rows past
+    `expires_at` are ignored and purged on the next hold.
+    """
+
+    __tablename__ = "slot_holds"
+    __table_args__ = (
+        Index("ix_slot_holds_therapist_start", "therapist_id", "start_time"),
+        Index("ix_slot_holds_patient", "patient_id"),
+        Index("ix_slot_holds_expires_at", "expires_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    therapist_id = Column(
+        UUID(as_uuid=True), ForeignKey("therapists.id"), nullable=False
+    )
+    patient_id = Column(UUID(as_uuid=True), ForeignKey("patients.id"), nullable=False)
+    treatment_id = Column(
+        UUID(as_uuid=True), ForeignKey("treatments.id"), nullable=False
+    )
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,18 +1,83 @@
 import uuid
+from datetime import time
 
-from sqlalchemy import Column, ForeignKey, String, Time
+from sqlalchemy import Column, ForeignKey, Index, SmallInteger
 from sqlalchemy.dialects.postgresql import UUID
 
 from app.models.base import Base
 
+# Position matches date.weekday(): 0 is Monday
+WEEKDAYS = (
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+)
+MINUTES_PER_DAY = 24 * 60
+
+
+def weekday_number(name: str) -> int:
+    try:
+        return WEEKDAYS.index(name.strip().lower())
+    except ValueError:
+        raise ValueError(f"Unknown weekday: {name!r}") from None
+
+
+def minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def minute_to_time(minute: int) -> time:
+    if minute >= MINUTES_PER_DAY:
+        return time.max
+    return time(*divmod(minute, 60))
+
 
 class TherapistAvailability(Base):
     __tablename__ = "therapist_availability"
+    # Covers the availability lookups, which only need these columns
+    __table_args__ = (
+        Index(
+            "ix_therapist_availability_lookup",
+            "therapist_id",
+            "day_of_week",
+            "start_minute",
+            "end_minute",
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     therapist_id = Column(
         UUID(as_uuid=True), ForeignKey("therapists.id"), nullable=False
     )
-    weekday = Column(String, nullable=False)  # e.g., 'Monday', 'Tuesday', etc.
-    start_time = Column(Time, nullable=False)
-    end_time = Column(Time, nullable=False)
+    day_of_week = Column(SmallInteger, nullable=False)  # 0 = Monday ... 6 = Sunday
+    start_minute = Column(SmallInteger, nullable=False)  # minutes from midnight
+    end_minute = Column(SmallInteger, nullable=False)
+
+    # The API keeps speaking weekday names and times of day
+    @property
+    def weekday(self) -> str:
+        return WEEKDAYS[self.day_of_week]
+
+    @weekday.setter
+    def weekday(self, value: str) -> None:
+        self.day_of_week = weekday_number(value)
+
+    @property
+    def start_time(self) -> time:
+        return minute_to_time(self.start_minute)
+
+    @start_time.setter
+    def start_time(self, value: time) -> None:
+        self.start_minute = minute_of_day(value)
+
+    @property
+    def end_time(self) -> time:
+        return minute_to_time(self.end_minute)
+
+    @end_time.setter
+    def end_time(self, value: time) -> None:
+        self.end_minute = minute_of_day(value)
@@ -14,3 +14,5 @@ class Treatment(Base):
     description = Column(Text)
     duration_minutes = Column(Integer, nullable=False)
     price = Column(Numeric(10, 2), nullable=False)
+    # Patients one session takes; above 1 for group classes such as Pilates
+    capacity = Column(Integer, nullable=False, default=1, server_default="1")
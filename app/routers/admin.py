@@ -5,11 +5,14 @@ from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.circuit_breaker import CircuitOpenError, breaker_states
+from app.core.constants import AUTH_UNAVAILABLE_ERROR
 from app.core.database import get_db
 from app.core.security import require_admin
 from app.models.patient import Patient
 from app.models.promote_user import PromoteUserRequest
 from app.models.therapist import Therapist
+from app.services.principal_service import invalidate_principal
 from app.services.user_service import update_role
 
 router = APIRouter()
@@ -45,6 +48,7 @@ async def promote_user(
             # Remove patient record and commit
             await db.delete(patient)
             await db.commit()
+            invalidate_principal(user_id)
             return {"detail": f"User already promoted as {existing_by_id.name}."}
 
         # If a therapist exists with the same email, update that record
@@ -62,6 +66,7 @@ async def promote_user(
             # delete patient and commit all changes together
             await db.delete(patient)
             await db.commit()
+            invalidate_principal(user_id)
             await db.refresh(existing_by_email)
             await update_role(user_id, data.role)
             return {
@@ -80,6 +85,7 @@ async def promote_user(
         # delete patient and commit both insert and delete together
         await db.delete(patient)
         await db.commit()
+        invalidate_principal(user_id)
         await db.refresh(new_therapist)
 
         # Update role in Supabase after database transaction succeeds
@@ -87,6 +93,9 @@ async def promote_user(
         return {
             "detail": f"User {new_therapist.name} promoted to {data.role} successfully."
         }
+    except CircuitOpenError:
+        await db.rollback()
+        raise HTTPException(status_code=503, detail=AUTH_UNAVAILABLE_ERROR)
     except IntegrityError as e:
         await db.rollback()
         raise HTTPException(
@@ -95,3 +104,9 @@ async def promote_user(
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/circuit-breakers")
+async def circuit_breakers(admin=Depends(require_admin)):
+    """State of the circuit breakers guarding outbound auth dependencies."""
+    return breaker_states()
@@ -9,12 +9,21 @@ from app.core.constants import (
     UNKNOWN_ROLE_ERROR,
 )
 from app.core.database import get_db
-from app.core.security import get_current_user, require_role
+from app.core.security import get_principal, require_principal
 from app.schemas.appointment import (
+    AppointmentBatchCreate,
+    AppointmentBatchPublic,
     AppointmentCreate,
     AppointmentPublic,
+    AppointmentSeriesCreate,
+    AppointmentSeriesPublic,
     AppointmentUpdate,
+    SlotHoldConfirm,
+    SlotHoldCreate,
+    SlotHoldPublic,
 )
+from app.services.appointment_batch_service import create_appointment_batch
+from app.services.appointment_series_service import create_appointment_series
 from app.services.appointment_service import (
     create_appointment,
     delete_appointment,
@@ -24,48 +33,120 @@ from app.services.appointment_service import (
     list_therapist_appointments,
     update_appointment,
 )
-from app.services.patient_service import get_patient
-from app.services.therapist_service import get_therapist
+from app.services.principal_service import Principal
+from app.services.slot_hold_service import confirm_hold, hold_slot, release_hold
 
 router = APIRouter()
 
 
+def _require_profile(principal: Principal) -> UUID:
+    if principal.profile_id is None:
+        kind = "Therapist" if principal.role == "therapist" else "Patient"
+        raise HTTPException(status_code=404, detail=f"{kind} profile not found")
+    return principal.profile_id
+
+
+def _check_access(principal: Principal, appt) -> None:
+    """Allow admins, and therapists/patients on their own appointments."""
+    if principal.role == "admin":
+        return
+    if principal.role == "therapist":
+        owner_id = appt.therapist_id
+    elif principal.role == "patient":
+        owner_id = appt.patient_id
+    else:
+        raise HTTPException(status_code=403, detail=UNKNOWN_ROLE_ERROR)
+    if principal.profile_id is None or owner_id != principal.profile_id:
+        raise HTTPException(status_code=403, detail=NOT_ALLOWED_ERROR)
+
+
 @router.post("/", response_model=AppointmentPublic)
 async def book_appointment(
     data: AppointmentCreate,
     background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
-    user=Depends(require_role("patient")),
+    principal: Principal = Depends(require_principal("patient")),
 ):
-    patient = await get_patient(db, user["id"])
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient profile not found")
-
-    appt = await create_appointment(db, patient.id, data, background_tasks)
+    patient_id = _require_profile(principal)
+    appt = await create_appointment(db, patient_id, data, background_tasks)
     return appt
 
 
+@router.post("/series", response_model=AppointmentSeriesPublic)
+async def book_appointment_series(
+    data: AppointmentSeriesCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    principal: Principal = Depends(require_principal("patient")),
+):
+    patient_id = _require_profile(principal)
+    series = await create_appointment_series(db, patient_id, data, background_tasks)
+    return AppointmentSeriesPublic(
+        booked=[AppointmentPublic.model_validate(a) for a in series["booked"]],
+        skipped=series["skipped"],
+    )
+
+
+@router.post("/batch", response_model=AppointmentBatchPublic)
+async def book_appointment_batch(
+    data: AppointmentBatchCreate,
+    db: AsyncSession = Depends(get_db),
+    principal: Principal = Depends(require_principal("admin")),
+):
+    """Front-desk bulk entry: book many appointments, reporting each item."""
+    results = await create_appointment_batch(db, data.items)
+    return AppointmentBatchPublic(
+        created=sum(result["status"] == "created" for result in results),
+        results=results,
+    )
+
+
+@router.post("/holds", response_model=SlotHoldPublic)
+async def hold_slot_endpoint(
+    data: SlotHoldCreate,
+    db: AsyncSession = Depends(get_db),
+    principal: Principal = Depends(require_principal("patient")),
+):
+    """Keep a slot for the patient for a few minutes while they confirm it."""
+    return await hold_slot(db, _require_profile(principal), data)
+
+
+@router.post("/holds/{hold_id}/confirm", response_model=AppointmentPublic)
+async def confirm_hold_endpoint(
+    hold_id: UUID,
+    background_tasks: BackgroundTasks,
+    data: SlotHoldConfirm = SlotHoldConfirm(),
+    db: AsyncSession = Depends(get_db),
+    principal: Principal = Depends(require_principal("patient")),
+):
+    patient_id = _require_profile(principal)
+    return await confirm_hold(db, patient_id, hold_id, background_tasks, data.notes)
+
+
+@router.delete("/holds/{hold_id}")
+async def release_hold_endpoint(
+    hold_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    principal: Principal = Depends(require_principal("patient")),
+):
+    return await release_hold(db, _require_profile(principal), hold_id)
+
+
 @router.get("/", response_model=list[AppointmentPublic])
 async def list_appointments(
     db: AsyncSession = Depends(get_db),
-    user=Depends(get_current_user),
+    principal: Principal = Depends(get_principal),
 ):
-    role = user["role"]
+    role = principal.role
 
     if role == "admin":
         return await list_all_appointments(db)
 
     if role == "therapist":
-        therapist = await get_therapist(db, user["id"])
-        if not therapist:
-            raise HTTPException(status_code=404, detail="Therapist profile not found")
-        return await list_therapist_appointments(db, therapist.id)
+        return await list_therapist_appointments(db, _require_profile(principal))
 
     if role == "patient":
-        patient = await get_patient(db, user["id"])
-        if not patient:
-            raise HTTPException(status_code=404, detail="Patient profile not found")
-        return await list_patient_appointments(db, patient.id)
+        return await list_patient_appointments(db, _require_profile(principal))
 
     raise HTTPException(status_code=403, detail=UNKNOWN_ROLE_ERROR)
 
@@ -74,27 +155,13 @@ async def list_appointments(
 async def get_appointment_endpoint(
     appointment_id: UUID,
     db: AsyncSession = Depends(get_db),
-    user=Depends(get_current_user),
+    principal: Principal = Depends(get_principal),
 ):
     appt = await get_appointment(db, appointment_id)
     if not appt:
         raise HTTPException(status_code=404, detail=APPOINTMENT_NOT_FOUND_ERROR)
 
-    role = user["role"]
-
-    if role == "admin":
-        pass  # Admin has access to all appointments
-    elif role == "therapist":
-        therapist = await get_therapist(db, user["id"])
-        if not therapist or appt.therapist_id != therapist.id:
-            raise HTTPException(status_code=403, detail=NOT_ALLOWED_ERROR)
-    elif role == "patient":
-        patient = await get_patient(db, user["id"])
-        if not patient or appt.patient_id != patient.id:
-            raise HTTPException(status_code=403, detail=NOT_ALLOWED_ERROR)
-    else:
-        raise HTTPException(status_code=403, detail=UNKNOWN_ROLE_ERROR)
-
+    _check_access(principal, appt)
     return appt
 
 
@@ -103,24 +170,17 @@ async def update_appointment_endpoint(
     appointment_id: UUID,
     data: AppointmentUpdate,
     db: AsyncSession = Depends(get_db),
-    user=Depends(get_current_user),
+    principal: Principal = Depends(get_principal),
 ):
     appt = await get_appointment(db, appointment_id)
     if not appt:
         raise HTTPException(status_code=404, detail=APPOINTMENT_NOT_FOUND_ERROR)
 
-    role = user["role"]
+    role = principal.role
     allow_override = role == "admin"
 
-    if role == "patient":
-        patient = await get_patient(db, user["id"])
-        if not patient or appt.patient_id != patient.id:
-            raise HTTPException(status_code=403, detail=NOT_ALLOWED_ERROR)
-
-    if role == "therapist":
-        therapist = await get_therapist(db, user["id"])
-        if not therapist or appt.therapist_id != therapist.id:
-            raise HTTPException(status_code=403, detail=NOT_ALLOWED_ERROR)
+    if role in ("patient", "therapist"):
+        _check_access(principal, appt)
 
     appt = await update_appointment(db, appt, data, allow_override=allow_override)
     return appt
@@ -130,30 +190,12 @@ async def update_appointment_endpoint(
 async def cancel_appointment_endpoint(
     appointment_id: UUID,
     db: AsyncSession = Depends(get_db),
-    user=Depends(get_current_user),
+    principal: Principal = Depends(get_principal),
 ):
     appt = await get_appointment(db, appointment_id)
     if not appt:
         raise HTTPException(status_code=404, detail="Appointment not found")
 
-    role = user["role"]
-
-    if role == "admin":
-        await delete_appointment(db, appt)
-        return Response(status_code=status.HTTP_204_NO_CONTENT)
-
-    if role == "patient":
-        patient = await get_patient(db, user["id"])
-        if not patient or appt.patient_id != patient.id:
-            raise HTTPException(status_code=403, detail=NOT_ALLOWED_ERROR)
-        await delete_appointment(db, appt)
-        return Response(status_code=status.HTTP_204_NO_CONTENT)
-
-    if role == "therapist":
-        therapist = await get_therapist(db, user["id"])
-        if not therapist or appt.therapist_id != therapist.id:
-            raise HTTPException(status_code=403, detail=NOT_ALLOWED_ERROR)
-        await delete_appointment(db, appt)
-        return Response(status_code=status.HTTP_204_NO_CONTENT)
-
-    raise HTTPException(status_code=403, detail=UNKNOWN_ROLE_ERROR)
+    _check_access(principal, appt)
+    await delete_appointment(db, appt)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
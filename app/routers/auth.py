@@ -1,42 +1,66 @@
+from contextlib import contextmanager
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from supabase import AuthInvalidCredentialsError
+from supabase import AuthApiError, AuthInvalidCredentialsError
 from supabase_auth import AuthResponse
 
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.constants import AUTH_UNAVAILABLE_ERROR
 from app.core.database import get_db
-from app.core.security import get_current_user
-from app.core.supabase_client import supabase
+from app.core.security import TOKEN_CACHE, get_current_user
+from app.core.supabase_client import get_auth_client, supabase_auth_breaker
 from app.schemas.auth import LoginRequest, SignupRequest, TokenResponse, UserInfo
 from app.schemas.patient import PatientCreate
 from app.services.patient_service import create_patient
 
 router = APIRouter()
 
+# Logout works with or without a bearer token
+optional_bearer_scheme = HTTPBearer(auto_error=False)
+
+
+@contextmanager
+def _supabase_auth():
+    """Guard a Supabase auth call with the breaker, failing fast with 503."""
+    try:
+        with supabase_auth_breaker.guard():
+            yield
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail=AUTH_UNAVAILABLE_ERROR)
+
 
 @router.post("/signup", response_model=TokenResponse)
 async def signup(data: SignupRequest, db: AsyncSession = Depends(get_db)):
+    role = "patient"
     try:
-        result: AuthResponse = supabase.auth.sign_up(
-            {"email": data.email, "password": data.password},
-        )
+        with _supabase_auth():
+            # Profile metadata goes with the sign-up itself, so no follow-up
+            # update_user round trip is needed.
+            result: AuthResponse = await get_auth_client().sign_up(
+                {
+                    "email": data.email,
+                    "password": data.password,
+                    "options": {
+                        "data": {
+                            "first_name": data.first_name,
+                            "last_name": data.last_name,
+                            "role": role,
+                        }
+                    },
+                },
+            )
     except AuthInvalidCredentialsError:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    except AuthApiError as e:
+        if e.status >= 500:
+            raise
+        raise HTTPException(status_code=400, detail=e.message)
 
     user = result.user
     token = result.session.access_token
-    role = "patient"
-
-    supabase.auth.update_user(
-        {
-            "data": {
-                "first_name": data.first_name,
-                "last_name": data.last_name,
-                "role": role,
-            }
-        }
-    )
 
     await create_patient(
         db,
@@ -56,14 +80,19 @@ async def signup(data: SignupRequest, db: AsyncSession = Depends(get_db)):
 @router.post("/login", response_model=TokenResponse)
 async def login(data: LoginRequest):
     try:
-        result = supabase.auth.sign_in_with_password(
-            {"email": data.email, "password": data.password}
-        )
+        with _supabase_auth():
+            result = await get_auth_client().sign_in_with_password(
+                {"email": data.email, "password": data.password}
+            )
     except AuthInvalidCredentialsError:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    except AuthApiError as e:
+        if e.status >= 500:
+            raise
+        raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    user_data = supabase.auth.get_user(result.session.access_token)
-    role = user_data.user.user_metadata.get("role", "patient")
+    # The sign-in response already carries the user the token was issued for
+    role = result.user.user_metadata.get("role", "patient")
 
     return TokenResponse(access_token=result.session.access_token, role=role)
 
@@ -85,6 +114,17 @@ async def me(
 
 
 @router.post("/logout")
-async def logout():
-    supabase.auth.sign_out()
+async def logout(
+    credentials: HTTPAuthorizationCredentials | None = Depends(optional_bearer_scheme),
+):
+    if credentials is not None:
+        TOKEN_CACHE.discard(credentials.credentials)
+        try:
+            with _supabase_auth():
+                await get_auth_client().admin.sign_out(credentials.credentials)
+        except AuthApiError as e:
+            if e.status >= 500:
+                raise
+            # An expired or already revoked token cannot be signed out; the
+            # client is logged out either way
     return {"message": "Successfully logged out"}
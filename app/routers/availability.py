@@ -1,19 +1,37 @@
-from datetime import date
+from datetime import date, datetime, time
+from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.constants import NOT_ALLOWED_ERROR
 from app.core.database import get_db
-from app.core.security import get_current_user, require_role
-from app.schemas.availability import AvailabilityCreate, AvailabilityPublic
-from app.services.appointment_service import get_daily_availability
+from app.core.security import get_current_user, require_principal, require_role
+from app.core.slot_cache import slot_cache
+from app.schemas.availability import (
+    AvailabilityCreate,
+    AvailabilityExceptionCreate,
+    AvailabilityExceptionPublic,
+    AvailabilityPublic,
+    AvailabilitySlot,
+    WeeklyTemplate,
+)
+from app.services.appointment_service import (
+    DAILY_AVAILABILITY_STEP_MINUTES,
+    get_daily_availability,
+)
 from app.services.availability_service import (
     create_availability,
+    create_availability_exception,
+    delete_availability_exception,
     delete_availability_slot,
+    get_availability_exception,
+    list_availability_exceptions,
     list_therapist_availability,
+    set_weekly_template,
 )
-from app.services.therapist_service import get_therapist
+from app.services.principal_service import Principal
 
 router = APIRouter()
 
@@ -22,25 +40,109 @@ router = APIRouter()
 async def create_availability_endpoint(
     data: AvailabilityCreate,
     db: AsyncSession = Depends(get_db),
-    user=Depends(require_role("therapist")),
+    principal: Principal = Depends(require_principal("therapist")),
+):
+    if principal.profile_id is None:
+        raise HTTPException(status_code=404, detail="Therapist profile not found")
+    return await create_availability(db, principal.profile_id, data)
+
+
+@router.put("/template", response_model=list[AvailabilityPublic])
+async def set_weekly_template_endpoint(
+    data: WeeklyTemplate,
+    db: AsyncSession = Depends(get_db),
+    principal: Principal = Depends(require_principal("therapist")),
 ):
-    return await create_availability(db, user["id"], data)
+    """Replace the caller's weekly availability in one request."""
+    if principal.profile_id is None:
+        raise HTTPException(status_code=404, detail="Therapist profile not found")
+    return await set_weekly_template(db, principal.profile_id, data.blocks)
 
 
-@router.get("")
+@router.get("", response_model=list[AvailabilitySlot])
 async def get_availability(
-    date: date, therapist_id: UUID, db: AsyncSession = Depends(get_db)
+    request: Request,
+    response: Response,
+    date: date,
+    therapist_id: UUID,
+    step_minutes: int = Query(DAILY_AVAILABILITY_STEP_MINUTES, ge=5, le=24 * 60),
+    start: Optional[time] = None,
+    end: Optional[time] = None,
+    db: AsyncSession = Depends(get_db),
 ):
-    return await get_daily_availability(db, therapist_id, date)
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    version = await slot_cache.version(therapist_id, date)
+    etag = slot_cache.etag(
+        version, "availability", therapist_id, date, step_minutes, start, end
+    )
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    async def _compute():
+        slots = await get_daily_availability(
+            db, therapist_id, date, step_minutes, window_start=start, window_end=end
+        )
+        return [slot.model_dump(mode="json") for slot in slots]
+
+    response.headers["ETag"] = etag
+    return await slot_cache.get_or_compute(etag, _compute)
 
 
 @router.get("/me", response_model=list[AvailabilityPublic])
 async def get_my_availability(
     db: AsyncSession = Depends(get_db),
-    user=Depends(require_role("admin", "therapist")),
+    principal: Principal = Depends(require_principal("admin", "therapist")),
+):
+    if principal.profile_id is None:
+        raise HTTPException(status_code=404, detail="Therapist profile not found")
+    return await list_therapist_availability(db, principal.profile_id)
+
+
+@router.post("/exceptions", response_model=AvailabilityExceptionPublic)
+async def create_availability_exception_endpoint(
+    data: AvailabilityExceptionCreate,
+    db: AsyncSession = Depends(get_db),
+    principal: Principal = Depends(require_principal("admin", "therapist")),
+):
+    """Time off for a therapist; admins may also add clinic-wide holidays."""
+    therapist_id = data.therapist_id
+    if principal.role == "therapist":
+        if principal.profile_id is None:
+            raise HTTPException(status_code=404, detail="Therapist profile not found")
+        if therapist_id not in (None, principal.profile_id):
+            raise HTTPException(status_code=403, detail=NOT_ALLOWED_ERROR)
+        therapist_id = principal.profile_id
+    return await create_availability_exception(db, therapist_id, data)
+
+
+@router.get("/exceptions", response_model=list[AvailabilityExceptionPublic])
+async def list_availability_exceptions_endpoint(
+    therapist_id: UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    return await list_availability_exceptions(db, therapist_id, start, end)
+
+
+@router.delete("/exceptions/{exception_id}")
+async def delete_availability_exception_endpoint(
+    exception_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    principal: Principal = Depends(require_principal("admin", "therapist")),
 ):
-    therapist = await get_therapist(db, user["id"])
-    return await list_therapist_availability(db, therapist.id)
+    exception = await get_availability_exception(db, exception_id)
+    if exception is None:
+        raise HTTPException(status_code=404, detail="Availability exception not found")
+    if principal.role == "therapist" and (
+        exception.therapist_id is None or exception.therapist_id != principal.profile_id
+    ):
+        raise HTTPException(status_code=403, detail=NOT_ALLOWED_ERROR)
+    await delete_availability_exception(db, exception)
+    return {"detail": "Availability exception deleted"}
 
 
 @router.get("/{therapist_id}", response_model=list[AvailabilityPublic])
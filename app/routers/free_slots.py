@@ -1,20 +1,49 @@
-from datetime import date
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
+from app.core.security import require_admin
+from app.core.slot_cache import slot_cache
+from app.core.slot_holds import slot_holds
+from app.models.therapist import Therapist
 from app.models.treatment import Treatment
-from app.services.free_slot_service import get_free_slots
+from app.services.free_slot_service import (
+    count_free_slots_by_date,
+    find_next_free_slots,
+    get_free_slots,
+)
+from app.services.schedule_bitmap import TICK_MINUTES, count_free_slots_by_day
 
 router = APIRouter()
 
+NEXT_SLOTS_DEFAULT_DAYS = 14
+NEXT_SLOTS_MAX_DAYS = 62
+NEXT_SLOTS_MAX_LIMIT = 100
+
+
+async def _get_treatment(db: AsyncSession, treatment_id: UUID) -> Treatment:
+    query = select(Treatment).where(Treatment.id == treatment_id)
+    result = await db.execute(query)
+    treatment = result.scalar_one_or_none()
+    if not treatment:
+        raise HTTPException(status_code=404, detail="Treatment not found")
+    return treatment
+
 
 @router.get("/")
 async def free_slots_endpoint(
-    therapist_id: UUID, treatment_id: UUID, day: str, db: AsyncSession = Depends(get_db)
+    request: Request,
+    response: Response,
+    therapist_id: UUID,
+    treatment_id: UUID,
+    day: str,
+    step_minutes: Optional[int] = Query(None, ge=1, le=24 * 60),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
         day_obj = date.fromisoformat(day)
@@ -23,10 +52,174 @@ async def free_slots_endpoint(
             status_code=400, detail="Invalid date format. Expected YYYY-MM-DD."
         )
 
-    query = select(Treatment).where(Treatment.id == treatment_id)
-    result = await db.execute(query)
-    treatment = result.scalar_one_or_none()
-    if not treatment:
-        raise HTTPException(status_code=404, detail="Treatment not found")
+    treatment = await _get_treatment(db, treatment_id)
+    duration = treatment.duration_minutes
+
+    start_of_day = datetime.combine(day_obj, time.min)
+    holds = await slot_holds.active(
+        db, [therapist_id], start_of_day, start_of_day + timedelta(days=1)
+    )
+    # Holds expire without a version bump, so the live ones are part of the key
+    held = ",".join(sorted(str(hold.id) for hold in holds))
+    # One-to-one slots depend only on the duration; group slots also on the
+    # treatment's own sessions and capacity
+    group = (treatment.id, treatment.capacity) if treatment.capacity > 1 else None
+    version = await slot_cache.version(therapist_id, day_obj)
+    etag = slot_cache.etag(
+        version,
+        "free-slots",
+        therapist_id,
+        day_obj,
+        duration,
+        step_minutes,
+        held,
+        group,
+    )
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return await slot_cache.get_or_compute(
+        etag,
+        lambda: get_free_slots(
+            db,
+            therapist_id,
+            day_obj,
+            duration,
+            step_minutes,
+            holds=holds,
+            treatment_id=treatment.id,
+            capacity=treatment.capacity,
+        ),
+    )
+
+
+@router.get("/next")
+async def next_free_slots_endpoint(
+    treatment_id: UUID,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    therapist_id: Optional[list[UUID]] = Query(None),
+    specialty: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=NEXT_SLOTS_MAX_LIMIT),
+    step_minutes: Optional[int] = Query(None, ge=1, le=24 * 60),
+    db: AsyncSession = Depends(get_db),
+):
+    """First open slots for a treatment across therapists, earliest first."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    start_date = start_date or now.date()
+    end_date = end_date or start_date + timedelta(days=NEXT_SLOTS_DEFAULT_DAYS - 1)
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=400, detail="end_date must not be before start_date"
+        )
+    if (end_date - start_date).days >= NEXT_SLOTS_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date window cannot exceed {NEXT_SLOTS_MAX_DAYS} days",
+        )
+
+    treatment = await _get_treatment(db, treatment_id)
+    return await find_next_free_slots(
+        db,
+        treatment.duration_minutes,
+        start_date,
+        end_date,
+        therapist_ids=therapist_id,
+        specialty=specialty,
+        limit=limit,
+        step_minutes=step_minutes,
+        not_before=now,
+        treatment_id=treatment.id,
+        capacity=treatment.capacity,
+    )
+
+
+@router.get("/month")
+async def month_free_slots_endpoint(
+    therapist_id: UUID,
+    treatment_id: UUID,
+    month: str,
+    step_minutes: Optional[int] = Query(None, ge=1, le=24 * 60),
+    db: AsyncSession = Depends(get_db),
+):
+    """Bookable slot count for each day of a month, for the calendar picker.
+
+    Each count is the number of slots `/free-slots/` lists for that day.
+    """
+    try:
+        first = datetime.strptime(month, "%Y-%m").date()
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="Invalid month format. Expected YYYY-MM."
+        )
+    last = (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+
+    treatment = await _get_treatment(db, treatment_id)
+    counts = await count_free_slots_by_date(
+        db,
+        therapist_id,
+        first,
+        last,
+        treatment.duration_minutes,
+        step_minutes,
+        treatment_id=treatment.id,
+        capacity=treatment.capacity,
+    )
+    return [{"date": day.isoformat(), "slots": slots} for day, slots in counts.items()]
+
+
+@router.get("/capacity")
+async def capacity_free_slots_endpoint(
+    start_date: date,
+    end_date: date,
+    duration_minutes: int = Query(
+        ..., ge=TICK_MINUTES, le=24 * 60, multiple_of=TICK_MINUTES
+    ),
+    therapist_id: Optional[list[UUID]] = Query(None),
+    step_minutes: Optional[int] = Query(
+        None, ge=TICK_MINUTES, le=24 * 60, multiple_of=TICK_MINUTES
+    ),
+    db: AsyncSession = Depends(get_db),
+    admin=Depends(require_admin),
+):
+    """Free one-to-one slots per active therapist and day, for capacity planning.
+
+    Counted on 5-minute schedule bitmaps, so durations and steps are whole
+    ticks and an appointment off the grid blocks every tick it touches. Live
+    holds are short-lived and not counted as busy.
+    """
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=400, detail="end_date must not be before start_date"
+        )
+    if (end_date - start_date).days >= NEXT_SLOTS_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date window cannot exceed {NEXT_SLOTS_MAX_DAYS} days",
+        )
+
+    query = (
+        select(Therapist.id, Therapist.name)
+        .where(Therapist.active.is_(True))
+        .order_by(Therapist.name)
+    )
+    if therapist_id:
+        query = query.where(Therapist.id.in_(therapist_id))
+    therapists = (await db.execute(query)).all()
+    if not therapists:
+        return []
 
-    return await get_free_slots(db, therapist_id, day_obj, treatment.duration_minutes)
+    names = {row.id: row.name for row in therapists}
+    counts = await count_free_slots_by_day(
+        db, list(names), start_date, end_date, duration_minutes, step_minutes
+    )
+    return [
+        {
+            "therapist_id": therapist_id,
+            "therapist_name": names[therapist_id],
+            "date": day.isoformat(),
+            "slots": slots,
+        }
+        for (therapist_id, day), slots in counts.items()
+    ]
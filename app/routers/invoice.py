@@ -5,7 +5,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
-from app.core.security import get_current_user, require_role
+from app.core.security import get_principal, require_principal, require_role
 from app.models.appointment import Appointment
 from app.schemas.invoice import InvoicePublic
 from app.services.invoice_service import (
@@ -14,7 +14,7 @@ from app.services.invoice_service import (
     list_patient_invoices,
     mark_invoice_paid,
 )
-from app.services.patient_service import get_patient
+from app.services.principal_service import Principal
 
 router = APIRouter()
 
@@ -28,13 +28,13 @@ async def list_invoices_endpoint(
 
 @router.get("/my", response_model=list[InvoicePublic])
 async def list_my_invoices(
-    db: AsyncSession = Depends(get_db), user=Depends(require_role("patient"))
+    db: AsyncSession = Depends(get_db),
+    principal: Principal = Depends(require_principal("patient")),
 ):
-    patient = await get_patient(db, user["id"])
-    if not patient:
+    if principal.profile_id is None:
         raise HTTPException(status_code=404, detail="Patient profile not found")
 
-    query = select(Appointment.id).where(Appointment.patient_id == patient.id)
+    query = select(Appointment.id).where(Appointment.patient_id == principal.profile_id)
     result = await db.execute(query)
     appointment_ids = [row[0] for row in result.all()]
 
@@ -43,14 +43,16 @@ async def list_my_invoices(
 
 @router.get("/{invoice_id}", response_model=InvoicePublic)
 async def get_invoice_endpoint(
-    invoice_id: UUID, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)
+    invoice_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    principal: Principal = Depends(get_principal),
 ):
     invoice = await get_invoice(db, invoice_id)
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
-    if user["role"] != "admin":
-        if user["role"] != "patient":
+    if principal.role != "admin":
+        if principal.role != "patient":
             raise HTTPException(
                 status_code=403, detail="Not authorized to access this invoice"
             )
@@ -61,8 +63,10 @@ async def get_invoice_endpoint(
         if not appointment:
             raise HTTPException(status_code=404, detail="Appointment not found")
 
-        patient = await get_patient(db, user["id"])
-        if not patient or appointment.patient_id != patient.id:
+        if (
+            principal.profile_id is None
+            or appointment.patient_id != principal.profile_id
+        ):
             raise HTTPException(
                 status_code=403, detail="Not authorized to access this invoice"
             )
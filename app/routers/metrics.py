@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.core.circuit_breaker import OPEN, breaker_states
+from app.core.observability import render_metrics
+from app.core.security import TOKEN_CACHE, require_admin
+from app.core.slot_cache import slot_cache
+from app.services.principal_service import PRINCIPAL_CACHE
+
+router = APIRouter()
+
+
+def _cache_gauges(prefix: str, stats: dict) -> dict:
+    return {
+        f"{prefix}_size": stats["size"],
+        f"{prefix}_hits_total": stats["hits"],
+        f"{prefix}_misses_total": stats["misses"],
+    }
+
+
+@router.get("", response_class=PlainTextResponse)
+async def metrics(admin=Depends(require_admin)):
+    """Prometheus text exposition of latency histograms and cache stats."""
+    gauges = {
+        **_cache_gauges("auth_token_cache", TOKEN_CACHE.stats()),
+        **_cache_gauges("auth_principal_cache", PRINCIPAL_CACHE.stats()),
+    }
+    slot_cache_stats = slot_cache.stats()
+    if slot_cache_stats:
+        gauges.update(_cache_gauges("slot_cache", slot_cache_stats))
+    for state in breaker_states():
+        gauges[f'circuit_breaker_open{{name="{state["name"]}"}}'] = int(
+            state["state"] == OPEN
+        )
+    return render_metrics(gauges)
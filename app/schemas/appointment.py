@@ -1,8 +1,9 @@
+import enum
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class AppointmentBase(BaseModel):
@@ -28,3 +29,68 @@ class AppointmentPublic(AppointmentBase):
     patient_id: UUID
     status: str
     model_config = {"from_attributes": True}
+
+
+class SeriesMode(str, enum.Enum):
+    # Book nothing unless every occurrence is free
+    all_or_nothing = "all_or_nothing"
+    # Book the free occurrences and report the others
+    skip_conflicts = "skip_conflicts"
+
+
+class AppointmentSeriesCreate(AppointmentBase):
+    """Weekly recurrence: `occurrences` sessions, `interval_weeks` apart."""
+
+    occurrences: int = Field(ge=1, le=52)
+    interval_weeks: int = Field(default=1, ge=1, le=4)
+    mode: SeriesMode = SeriesMode.all_or_nothing
+
+
+class SeriesOccurrence(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    reason: str  # "unavailable", "conflict" or "held"
+
+
+class AppointmentSeriesPublic(BaseModel):
+    booked: list[AppointmentPublic]
+    skipped: list[SeriesOccurrence]
+
+
+class AppointmentBatchItem(AppointmentBase):
+    patient_id: UUID
+
+
+class AppointmentBatchCreate(BaseModel):
+    items: list[AppointmentBatchItem] = Field(min_length=1, max_length=1000)
+
+
+class AppointmentBatchItemResult(BaseModel):
+    index: int
+    # "created", "treatment_not_found", "therapist_not_found",
+    # "patient_not_found", "unavailable", "conflict", "held" or "batch_conflict"
+    status: str
+    appointment_id: Optional[UUID] = None
+
+
+class AppointmentBatchPublic(BaseModel):
+    created: int
+    results: list[AppointmentBatchItemResult]
+
+
+class SlotHoldCreate(BaseModel):
+    therapist_id: UUID
+    treatment_id: UUID
+    start_time: datetime
+
+
+class SlotHoldPublic(SlotHoldCreate):
+    id: UUID
+    patient_id: UUID
+    end_time: datetime
+    expires_at: datetime
+    model_config = {"from_attributes": True}
+
+
+class SlotHoldConfirm(BaseModel):
+    notes: Optional[str] = None
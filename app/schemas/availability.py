@@ -1,7 +1,10 @@
-from datetime import time
+from datetime import datetime, time
+from typing import Optional
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from app.models.therapist_availability import WEEKDAYS, weekday_number
 
 
 class AvailabilityCreate(BaseModel):
@@ -9,13 +12,49 @@ class AvailabilityCreate(BaseModel):
     start_time: time
     end_time: time
 
+    @field_validator("weekday")
+    @classmethod
+    def _known_weekday(cls, value: str) -> str:
+        return WEEKDAYS[weekday_number(value)]
+
+    @model_validator(mode="after")
+    def _ordered(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        return self
+
 
 class AvailabilityPublic(AvailabilityCreate):
     id: UUID
     model_config = {"from_attributes": True}
 
 
+class WeeklyTemplate(BaseModel):
+    """The whole weekly availability; overlapping blocks are merged."""
+
+    blocks: list[AvailabilityCreate] = Field(max_length=7 * 48)
+
+
 class AvailabilitySlot(BaseModel):
     start: time
     end: time
     available: bool
+
+
+class AvailabilityExceptionCreate(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    reason: Optional[str] = None
+    # Admins only; no therapist means the whole clinic (e.g. public holidays)
+    therapist_id: Optional[UUID] = None
+
+    @model_validator(mode="after")
+    def _ordered(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        return self
+
+
+class AvailabilityExceptionPublic(AvailabilityExceptionCreate):
+    id: UUID
+    model_config = {"from_attributes": True}
@@ -1,7 +1,7 @@
 from typing import Optional
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class TreatmentBase(BaseModel):
@@ -9,6 +9,8 @@ class TreatmentBase(BaseModel):
     description: Optional[str] = None
     duration_minutes: int
     price: float
+    # Patients per session; above 1 for group classes
+    capacity: int = Field(default=1, ge=1)
 
 
 class TreatmentCreate(TreatmentBase):
@@ -20,6 +22,7 @@ class TreatmentUpdate(TreatmentBase):
     description: Optional[str]
     duration_minutes: Optional[int]
     price: Optional[float]
+    capacity: Optional[int] = Field(default=None, ge=1)
 
 
 class TreatmentPublic(TreatmentBase):
@@ -0,0 +1,46 @@
+"""Merge overlapping and adjacent weekly availability blocks.
+
+    python -m app.scripts.normalize_availability [--dry-run]
+
+One-off cleanup for blocks written before availability was normalized on
+write. Rewrites only the weekdays that are not already canonical and
+rebuilds their slot calendar days; with --dry-run it only reports them.
+"""
+
+import argparse
+import asyncio
+
+from app.core.database import AsyncSessionLocal
+from app.models import (  # noqa: F401
+    appointment,
+    availability_exception,
+    device,
+    invoice,
+    patient,
+    slot_calendar,
+    therapist,
+    therapist_availability,
+    treatment,
+)
+from app.services.availability_service import normalize_availability
+
+
+async def _run(dry_run: bool) -> None:
+    async with AsyncSessionLocal() as db:
+        summary = await normalize_availability(db, dry_run=dry_run)
+    action = "Would remove" if dry_run else "Removed"
+    print(
+        f"{action} {summary['removed']} redundant blocks on {summary['weekdays']} "
+        f"weekdays of {summary['therapists']} therapists"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(_run(args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Rebuild or check the materialized slot calendar.
+
+    python -m app.scripts.slot_calendar rebuild [--days 60]
+    python -m app.scripts.slot_calendar check [--days 60] [--include-missing]
+
+`check` exits with status 1 when any materialized therapist day differs
+from the on-the-fly computation (or, with --include-missing, is not
+materialized at all).
+"""
+
+import argparse
+import asyncio
+import sys
+
+from app.core.database import AsyncSessionLocal
+from app.models import (  # noqa: F401
+    appointment,
+    device,
+    invoice,
+    patient,
+    slot_calendar,
+    therapist,
+    therapist_availability,
+    treatment,
+)
+from app.services.slot_calendar_service import (
+    SLOT_CALENDAR_HORIZON_DAYS,
+    check_consistency,
+    rebuild_calendar,
+)
+
+
+async def _run(command: str, days: int, include_missing: bool) -> int:
+    async with AsyncSessionLocal() as db:
+        if command == "rebuild":
+            summary = await rebuild_calendar(db, days=days)
+            print(
+                f"Rebuilt {summary['days']} days for {summary['therapists']} "
+                f"therapists ({summary['free_intervals']} free intervals)"
+            )
+            return 0
+
+        problems = await check_consistency(
+            db, days=days, include_missing=include_missing
+        )
+        for problem in problems:
+            print(f"{problem['therapist_id']} {problem['day']}: {problem['issue']}")
+        print(f"{len(problems)} inconsistent therapist days")
+        return 1 if problems else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--days", type=int, default=SLOT_CALENDAR_HORIZON_DAYS)
+    parser.add_argument("--include-missing", action="store_true")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run(args.command, args.days, args.include_missing)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+from bisect import bisect_right, insort
+from contextlib import AsyncExitStack
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import Optional, Sequence
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.booking_lock import therapist_booking_lock
+from app.core.slot_cache import slot_cache
+from app.core.slot_holds import slot_holds
+from app.models.appointment import Appointment
+from app.models.patient import Patient
+from app.models.therapist import Therapist
+from app.models.treatment import Treatment
+from app.schemas.appointment import AppointmentBatchItem
+from app.services.appointment_service import (
+    booking_lock,
+    group_session_key,
+    is_overlap_violation,
+)
+from app.services.free_slot_service import (
+    Interval,
+    load_exceptions,
+    load_sessions,
+    load_weekly_blocks,
+    merge_intervals,
+    naive_utc,
+    time_offset,
+    to_offset,
+)
+from app.services.slot_calendar_service import (
+    appointment_days,
+    refresh_for_appointment,
+)
+
+# (therapist_id, start, end) of a booking to validate
+Booking = tuple[UUID, datetime, datetime]
+# (treatment_id, start, end) of a session in seconds from the window start;
+# bookings of one-to-one treatments are keyed without a treatment_id, so
+# they never share a session
+SessionKey = tuple[Optional[UUID], int, int]
+
+
+def _within_availability(blocks: list[Interval], start: datetime, end: datetime):
+    # Same rule as is_within_availability, on the wall-clock time of day
+    start_second, end_second = time_offset(start.time()), time_offset(end.time())
+    return any(
+        block_start <= start_second and end_second <= block_end
+        for block_start, block_end in blocks
+    )
+
+
+def _overlaps(intervals: list[Interval], start: int, end: int) -> bool:
+    """Whether [start, end) hits any of the sorted, non-overlapping intervals."""
+    i = bisect_right(intervals, start, key=itemgetter(1))
+    return i < len(intervals) and intervals[i][0] < end
+
+
+def _session_conflict(
+    sessions: dict[SessionKey, int], key: SessionKey, capacity: int
+) -> bool:
+    """Whether a seat of session `key` cannot be taken among `sessions`: it
+    is full or another session overlaps it."""
+    _, start, end = key
+    return sessions.get(key, 0) >= capacity or any(
+        other != key and other[1] < end and other[2] > start for other in sessions
+    )
+
+
+async def validate_bookings(
+    db: AsyncSession,
+    bookings: Sequence[Booking],
+    patient_id: Optional[UUID] = None,
+    treatments: Optional[Sequence[Treatment]] = None,
+) -> list[Optional[str]]:
+    """Why each booking cannot be made, or None when it can.
+
+    Availability, exceptions and scheduled sessions for every therapist
+    involved are loaded with one query each over the window the bookings
+    span. A booking overlapping a live hold of anyone but `patient_id` is
+    "held", unless the hold is a seat of the group session it joins and
+    seats are left. Bookings are accepted in order, so one that overlaps an earlier
+    accepted booking of the same therapist is reported as "batch_conflict".
+
+    `treatments`, parallel to `bookings`, lets bookings of a group
+    treatment take seats of a session over the same span, as
+    `has_conflict` does, until its capacity is reached.
+    """
+    if not bookings:
+        return []
+    therapist_ids = list({therapist_id for therapist_id, _, _ in bookings})
+    first = min(naive_utc(start) for _, start, _ in bookings).date()
+    last = max(naive_utc(end) for _, _, end in bookings).date()
+    weekly_blocks = await load_weekly_blocks(db, therapist_ids)
+    sessions = await load_sessions(db, therapist_ids, first, last)
+    exceptions = await load_exceptions(db, therapist_ids, first, last)
+    window_start = datetime.combine(first, datetime.min.time())
+    booked: dict[UUID, dict[SessionKey, int]] = {
+        therapist_id: {
+            (treatment_id, start, end): seats
+            for treatment_id, start, end, seats in sessions.get(therapist_id, [])
+        }
+        for therapist_id in therapist_ids
+    }
+    busy = {
+        therapist_id: merge_intervals((start, end) for _, start, end in booked_keys)
+        for therapist_id, booked_keys in booked.items()
+    }
+    # Holds block the span for one-to-one bookings and take a seat of the
+    # session they are on for group ones
+    held_seats: dict[UUID, dict[SessionKey, int]] = {
+        therapist_id: {} for therapist_id in therapist_ids
+    }
+    for hold in await slot_holds.active(
+        db,
+        therapist_ids,
+        window_start,
+        window_start + timedelta(days=(last - first).days + 1),
+        exclude_patient_id=patient_id,
+    ):
+        seats = held_seats[hold.therapist_id]
+        key = (
+            hold.treatment_id,
+            to_offset(window_start, hold.start_time),
+            to_offset(window_start, hold.end_time),
+        )
+        seats[key] = seats.get(key, 0) + 1
+    held = {
+        therapist_id: merge_intervals((start, end) for _, start, end in seats)
+        for therapist_id, seats in held_seats.items()
+    }
+    accepted: dict[UUID, list[Interval]] = {
+        therapist_id: [] for therapist_id in therapist_ids
+    }
+    accepted_seats: dict[UUID, dict[SessionKey, int]] = {
+        therapist_id: {} for therapist_id in therapist_ids
+    }
+
+    reasons: list[Optional[str]] = []
+    for index, (therapist_id, start, end) in enumerate(bookings):
+        treatment = treatments[index] if treatments is not None else None
+        capacity = treatment.capacity if treatment is not None else 1
+        span = (to_offset(window_start, start), to_offset(window_start, end))
+        key = (treatment.id if capacity > 1 else None, *span)
+        blocks = weekly_blocks.get((therapist_id, start.weekday()), [])
+        if not _within_availability(blocks, start, end) or _overlaps(
+            exceptions.get(therapist_id, []), *span
+        ):
+            reasons.append("unavailable")
+        elif (
+            _session_conflict(booked[therapist_id], key, capacity)
+            if capacity > 1
+            else _overlaps(busy[therapist_id], *span)
+        ):
+            reasons.append("conflict")
+        elif (
+            _session_conflict(
+                held_seats[therapist_id],
+                key,
+                capacity - booked[therapist_id].get(key, 0),
+            )
+            if capacity > 1
+            else _overlaps(held[therapist_id], *span)
+        ):
+            reasons.append("held")
+        elif (
+            _session_conflict(
+                accepted_seats[therapist_id],
+                key,
+                capacity
+                - booked[therapist_id].get(key, 0)
+                - held_seats[therapist_id].get(key, 0),
+            )
+            if capacity > 1
+            else _overlaps(accepted[therapist_id], *span)
+        ):
+            reasons.append("batch_conflict")
+        else:
+            if key not in accepted_seats[therapist_id]:
+                insort(accepted[therapist_id], span)
+            seats = accepted_seats[therapist_id]
+            seats[key] = seats.get(key, 0) + 1
+            reasons.append(None)
+    return reasons
+
+
+async def _existing_ids(db: AsyncSession, column, ids: set[UUID]) -> set[UUID]:
+    if not ids:
+        return set()
+    result = await db.execute(select(column).where(column.in_(ids)))
+    return set(result.scalars().all())
+
+
+async def create_appointment_batch(
+    db: AsyncSession, items: Sequence[AppointmentBatchItem]
+) -> list[dict]:
+    """Validate and insert many appointments at once, reporting per item.
+
+    Treatments, therapists and patients are each resolved with one query,
+    bookings are validated with `validate_bookings` and the valid ones are
+    written with one bulk INSERT. Invalid items are skipped, not fatal.
+    Returns one `{"index", "status", "appointment_id"}` dict per item.
+    """
+    treatments = {
+        treatment.id: treatment
+        for treatment in (
+            await db.execute(
+                select(Treatment).where(
+                    Treatment.id.in_({item.treatment_id for item in items})
+                )
+            )
+        ).scalars()
+    }
+    therapist_ids = await _existing_ids(
+        db, Therapist.id, {item.therapist_id for item in items}
+    )
+    patient_ids = await _existing_ids(
+        db, Patient.id, {item.patient_id for item in items}
+    )
+
+    results: list[dict] = [
+        {"index": index, "status": None, "appointment_id": None}
+        for index in range(len(items))
+    ]
+    candidates: list[tuple[int, Booking]] = []
+    candidate_treatments: list[Treatment] = []
+    for index, item in enumerate(items):
+        treatment = treatments.get(item.treatment_id)
+        if treatment is None:
+            results[index]["status"] = "treatment_not_found"
+        elif item.therapist_id not in therapist_ids:
+            results[index]["status"] = "therapist_not_found"
+        elif item.patient_id not in patient_ids:
+            results[index]["status"] = "patient_not_found"
+        else:
+            end = item.start_time + timedelta(minutes=treatment.duration_minutes)
+            candidates.append((index, (item.therapist_id, item.start_time, end)))
+            candidate_treatments.append(treatment)
+
+    # The database cannot count seats, so group sessions always take the lock
+    grouped = {
+        booking[0]
+        for (_, booking), treatment in zip(candidates, candidate_treatments)
+        if treatment.capacity > 1
+    }
+    async with AsyncExitStack() as locks:
+        # A fixed order keeps concurrent batches from deadlocking
+        for therapist_id in sorted({booking[0] for _, booking in candidates}):
+            await locks.enter_async_context(
+                therapist_booking_lock(db, therapist_id)
+                if therapist_id in grouped
+                else booking_lock(db, therapist_id)
+            )
+
+        reasons = await validate_bookings(
+            db, [booking for _, booking in candidates], treatments=candidate_treatments
+        )
+        rows = []
+        spans: dict[UUID, list[tuple[datetime, datetime]]] = {}
+        for (index, (therapist_id, start, end)), treatment, reason in zip(
+            candidates, candidate_treatments, reasons
+        ):
+            if reason is not None:
+                results[index]["status"] = reason
+                continue
+            item = items[index]
+            row_id = uuid4()
+            rows.append(
+                {
+                    "id": row_id,
+                    "patient_id": item.patient_id,
+                    "therapist_id": therapist_id,
+                    "treatment_id": item.treatment_id,
+                    "start_time": start,
+                    "end_time": end,
+                    "notes": item.notes,
+                    "session_key": (
+                        group_session_key(therapist_id, treatment.id, start, end)
+                        if treatment.capacity > 1
+                        else None
+                    ),
+                }
+            )
+            spans.setdefault(therapist_id, []).append((start, end))
+            results[index].update(status="created", appointment_id=row_id)
+
+        if rows:
+            try:
+                await db.execute(insert(Appointment), rows)
+            except IntegrityError as e:
+                await db.rollback()
+                if is_overlap_violation(e):
+                    raise HTTPException(
+                        status_code=409,
+                        detail="Bookings changed during the batch; retry it.",
+                    ) from e
+                raise
+            for therapist_id, therapist_spans in spans.items():
+                await refresh_for_appointment(db, therapist_id, *therapist_spans)
+            await db.commit()
+
+    for therapist_id, therapist_spans in spans.items():
+        await slot_cache.bump_days(therapist_id, appointment_days(*therapist_spans))
+    return results
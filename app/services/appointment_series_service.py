@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.booking_lock import therapist_booking_lock
+from app.core.slot_cache import slot_cache
+from app.core.slot_holds import slot_holds
+from app.models.appointment import Appointment
+from app.models.patient import Patient
+from app.models.therapist import Therapist
+from app.models.treatment import Treatment
+from app.schemas.appointment import AppointmentSeriesCreate, SeriesMode
+from app.services.appointment_batch_service import validate_bookings
+from app.services.appointment_service import (
+    booking_lock,
+    group_session_key,
+    is_overlap_violation,
+)
+from app.services.email_notification_service import send_appointment_series
+from app.services.push_notification_service import send_push_to_user
+from app.services.slot_calendar_service import (
+    appointment_days,
+    refresh_for_appointment,
+)
+
+
+def expand_weekly(
+    start: datetime, occurrences: int, interval_weeks: int = 1
+) -> list[datetime]:
+    """Start times of a weekly recurrence."""
+    return [start + timedelta(weeks=n * interval_weeks) for n in range(occurrences)]
+
+
+async def create_appointment_series(
+    db: AsyncSession,
+    patient_id: UUID,
+    data: AppointmentSeriesCreate,
+    background_tasks: BackgroundTasks,
+) -> dict:
+    """Book a weekly series of appointments with one bulk insert.
+
+    Every occurrence is validated against availability and existing
+    bookings before anything is written. In `all_or_nothing` mode a single
+    bad occurrence rejects the series; in `skip_conflicts` mode the bad ones
+    are returned in `skipped` and the rest are booked. The patient gets one
+    notification for the whole series.
+    """
+    treatment = await db.get(Treatment, data.treatment_id)
+    if not treatment:
+        raise HTTPException(status_code=404, detail="Treatment not found.")
+    therapist = await db.get(Therapist, data.therapist_id)
+    if not therapist:
+        raise HTTPException(status_code=404, detail="Therapist not found.")
+
+    duration = timedelta(minutes=treatment.duration_minutes)
+    spans = [
+        (start, start + duration)
+        for start in expand_weekly(
+            data.start_time, data.occurrences, data.interval_weeks
+        )
+    ]
+
+    group = treatment.capacity > 1
+    # The database cannot count seats, so group sessions always take the lock
+    lock = (
+        therapist_booking_lock(db, data.therapist_id)
+        if group
+        else booking_lock(db, data.therapist_id)
+    )
+    async with lock:
+        reasons = await validate_bookings(
+            db,
+            [(data.therapist_id, start, end) for start, end in spans],
+            patient_id=patient_id,
+            treatments=[treatment] * len(spans),
+        )
+        skipped = [
+            {"start_time": start, "end_time": end, "reason": reason}
+            for (start, end), reason in zip(spans, reasons)
+            if reason is not None
+        ]
+        if skipped and data.mode == SeriesMode.all_or_nothing:
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "message": "Some occurrences of the series cannot be booked.",
+                    "occurrences": [
+                        {
+                            **item,
+                            "start_time": item["start_time"].isoformat(),
+                            "end_time": item["end_time"].isoformat(),
+                        }
+                        for item in skipped
+                    ],
+                },
+            )
+        free_spans = [span for span, reason in zip(spans, reasons) if reason is None]
+        if not free_spans:
+            raise HTTPException(
+                status_code=400,
+                detail="No occurrence of the series can be booked.",
+            )
+
+        rows = [
+            {
+                "id": uuid4(),
+                "patient_id": patient_id,
+                "therapist_id": data.therapist_id,
+                "treatment_id": data.treatment_id,
+                "start_time": start,
+                "end_time": end,
+                "notes": data.notes,
+                "session_key": (
+                    group_session_key(data.therapist_id, treatment.id, start, end)
+                    if group
+                    else None
+                ),
+            }
+            for start, end in free_spans
+        ]
+        try:
+            await db.execute(insert(Appointment), rows)
+        except IntegrityError as e:
+            await db.rollback()
+            if is_overlap_violation(e):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Appointment conflicts with existing booking.",
+                ) from e
+            raise
+        await refresh_for_appointment(db, data.therapist_id, *free_spans)
+        await slot_holds.release_patient(db, patient_id)
+        await db.commit()
+    await slot_cache.bump_days(data.therapist_id, appointment_days(*free_spans))
+
+    result = await db.execute(
+        select(Appointment)
+        .where(Appointment.id.in_([row["id"] for row in rows]))
+        .order_by(Appointment.start_time)
+    )
+    booked = list(result.scalars().all())
+    patient = await db.get(Patient, patient_id)
+
+    background_tasks.add_task(
+        send_appointment_series,
+        patient=patient,
+        therapist=therapist,
+        treatment=treatment,
+        appointments=booked,
+    )
+    background_tasks.add_task(
+        send_push_to_user,
+        db,
+        patient_id,
+        "Serie de citas confirmada",
+        f"Tus {len(booked)} sesiones de {treatment.name} a partir del "
+        f"{booked[0].start_time.strftime('%Y-%m-%d %H:%M')} han sido confirmadas.",
+    )
+
+    return {"booked": booked, "skipped": skipped}
@@ -1,47 +1,208 @@
-from datetime import date, datetime, timedelta
-from typing import Optional
-from uuid import UUID
+from contextlib import nullcontext
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Sequence
+from uuid import NAMESPACE_OID, UUID, uuid4, uuid5
 
 from fastapi import BackgroundTasks, HTTPException
-from sqlalchemy import select
+from sqlalchemy import and_, case, exists, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.appointment import Appointment, AppointmentStatus
-from app.models.therapist_availability import TherapistAvailability
+from app.core.booking_lock import therapist_booking_lock
+from app.core.config import settings
+from app.core.slot_cache import slot_cache
+from app.core.slot_holds import Hold, slot_holds
+from app.models.appointment import (
+    NO_OVERLAP_CONSTRAINT,
+    Appointment,
+    AppointmentStatus,
+)
+from app.models.availability_exception import AvailabilityException
+from app.models.therapist_availability import TherapistAvailability, minute_of_day
 from app.models.treatment import Treatment
 from app.schemas.appointment import AppointmentCreate, AppointmentUpdate
 from app.schemas.availability import AvailabilitySlot
 from app.services.email_notification_service import send_appointment
+from app.services.free_slot_service import (
+    DAY_SECONDS,
+    grid_availability,
+    load_exceptions,
+    merge_intervals,
+    naive_utc,
+    subtract_intervals,
+    time_offset,
+    to_offset,
+)
 from app.services.push_notification_service import send_push_to_user
+from app.services.slot_calendar_service import (
+    appointment_days,
+    refresh_for_appointment,
+)
 
+DAILY_AVAILABILITY_STEP_MINUTES = 30
 
-@staticmethod
-async def has_conflict(
-    db: AsyncSession, therapist_id: UUID, start: datetime, end: datetime
-) -> bool:
-    query = select(Appointment).where(
+
+async def count_overlapping(
+    db: AsyncSession,
+    therapist_id: UUID,
+    start: datetime,
+    end: datetime,
+    treatment_id: Optional[UUID] = None,
+    exclude_id: Optional[UUID] = None,
+) -> tuple[int, int]:
+    """Scheduled appointments overlapping [start, end), and how many of them
+    are seats of the same session: `treatment_id` over exactly that span.
+
+    One aggregate query; no rows are loaded, however full the session is.
+    """
+    same_session = and_(
+        Appointment.treatment_id == treatment_id,
+        Appointment.start_time == start,
+        Appointment.end_time == end,
+    )
+    query = select(func.count(), func.count(case((same_session, 1)))).where(
         Appointment.therapist_id == therapist_id,
         Appointment.start_time < end,
         Appointment.end_time > start,
         Appointment.status == AppointmentStatus.scheduled,
     )
-    result = await db.execute(query)
-    return result.scalars().first() is not None
+    if exclude_id is not None:
+        query = query.where(Appointment.id != exclude_id)
+    overlapping, seats = (await db.execute(query)).one()
+    return overlapping, seats
+
+
+@staticmethod
+async def has_conflict(
+    db: AsyncSession,
+    therapist_id: UUID,
+    start: datetime,
+    end: datetime,
+    exclude_id: Optional[UUID] = None,
+    treatment_id: Optional[UUID] = None,
+    capacity: int = 1,
+) -> bool:
+    """Whether [start, end) cannot be booked for the therapist.
+
+    Any overlapping scheduled appointment conflicts, except the seats of a
+    group session of `treatment_id` over the same span, which share it
+    until `capacity` of them are taken.
+    """
+    overlapping, seats = await count_overlapping(
+        db, therapist_id, start, end, treatment_id, exclude_id
+    )
+    return overlapping > seats or seats >= capacity
+
+
+def group_session_key(
+    therapist_id: UUID, treatment_id: UUID, start: datetime, end: datetime
+) -> UUID:
+    """Key shared by every seat of a group session, derived from its span."""
+    name = f"{therapist_id}:{treatment_id}:{naive_utc(start)}:{naive_utc(end)}"
+    return uuid5(NAMESPACE_OID, name)
+
+
+def held_seats(
+    holds: Sequence[Hold], treatment: Treatment, start: datetime, end: datetime
+) -> Optional[int]:
+    """Seats that other patients' `holds` take in the group session of
+    `treatment` over [start, end), or None when a hold blocks the span.
+
+    Any hold blocks a one-to-one treatment, as does a hold on anything but
+    that session.
+    """
+    span = (naive_utc(start), naive_utc(end))
+    seats = sum(
+        1
+        for hold in holds
+        if hold.treatment_id == treatment.id
+        and (hold.start_time, hold.end_time) == span
+    )
+    if seats < len(holds) or (seats and treatment.capacity == 1):
+        return None
+    return seats
+
+
+async def _override_session_key(
+    db: AsyncSession, appointment: Appointment, start: datetime, end: datetime
+) -> UUID:
+    """Session key an admin-approved double booking shares with the
+    appointments it overlaps at [start, end).
+
+    Rows sharing a key may overlap each other, so the no-overlap constraint
+    keeps guarding every other booking. Overlapping one-to-one appointments
+    are given the key too; an overlap with two different sessions cannot be
+    expressed and is rejected.
+    """
+    result = await db.execute(
+        select(Appointment.id, Appointment.session_key).where(
+            Appointment.therapist_id == appointment.therapist_id,
+            Appointment.id != appointment.id,
+            Appointment.start_time < end,
+            Appointment.end_time > start,
+            Appointment.status == AppointmentStatus.scheduled,
+        )
+    )
+    overlapping = result.all()
+    keys = {key for _, key in overlapping if key is not None}
+    if len(keys) > 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Appointment overlaps more than one session",
+        )
+    shared = keys.pop() if keys else uuid4()
+    unkeyed = [row_id for row_id, key in overlapping if key is None]
+    if unkeyed:
+        await db.execute(
+            update(Appointment)
+            .where(Appointment.id.in_(unkeyed))
+            .values(session_key=shared)
+        )
+    return shared
+
+
+def is_overlap_violation(exc: IntegrityError) -> bool:
+    """Whether `exc` was raised by the no-overlap constraint or trigger."""
+    # 23P01 is PostgreSQL's exclusion_violation
+    if getattr(exc.orig, "sqlstate", None) == "23P01":
+        return True
+    return NO_OVERLAP_CONSTRAINT in str(exc.orig)
+
+
+def booking_lock(db: AsyncSession, therapist_id: UUID):
+    """Per-therapist lock around a booking write, when enabled in settings."""
+    if settings.booking_lock_enabled:
+        return therapist_booking_lock(db, therapist_id)
+    return nullcontext()
 
 
 async def is_within_availability(
     db: AsyncSession, therapist_id: UUID, start: datetime, end: datetime
 ) -> bool:
-    weekday = start.strftime("%A").lower()
-
-    query = select(TherapistAvailability).where(
-        TherapistAvailability.therapist_id == therapist_id,
-        TherapistAvailability.weekday == weekday,
-        TherapistAvailability.start_time <= start.time(),
-        TherapistAvailability.end_time >= end.time(),
+    """Whether a weekly block covers the span and no exception overlaps it."""
+    # Round the end up so an appointment ending mid-minute still needs that minute
+    end_minute = -(-time_offset(end.time()) // 60)
+    in_block = exists(
+        select(TherapistAvailability.therapist_id).where(
+            TherapistAvailability.therapist_id == therapist_id,
+            TherapistAvailability.day_of_week == start.weekday(),
+            TherapistAvailability.start_minute <= minute_of_day(start.time()),
+            TherapistAvailability.end_minute >= end_minute,
+        )
+    )
+    in_exception = exists(
+        select(AvailabilityException.id).where(
+            or_(
+                AvailabilityException.therapist_id == therapist_id,
+                AvailabilityException.therapist_id.is_(None),
+            ),
+            AvailabilityException.end_time > naive_utc(start),
+            AvailabilityException.start_time < naive_utc(end),
+        )
     )
+    query = select(and_(in_block, ~in_exception))
     result = await db.execute(query)
-    return result.scalars().first() is not None
+    return bool(result.scalar())
 
 
 async def create_appointment(
@@ -64,23 +225,84 @@ async def create_appointment(
             status_code=400, detail="Therapist not available at this time."
         )
 
-    if await has_conflict(db, data.therapist_id, start, end):
-        raise HTTPException(
-            status_code=400, detail="Appointment conflicts with existing booking."
-        )
-
-    appointment = Appointment(
-        patient_id=patient_id,
-        therapist_id=data.therapist_id,
-        treatment_id=data.treatment_id,
-        start_time=start,
-        end_time=end,
-        notes=data.notes,
+    holds = await slot_holds.active(
+        db,
+        [data.therapist_id],
+        naive_utc(start),
+        naive_utc(end),
+        exclude_patient_id=patient_id,
     )
+    seats_held = held_seats(holds, treatment, start, end)
+    if seats_held is None:
+        raise HTTPException(status_code=409, detail="Slot is held by another patient.")
+
+    group = treatment.capacity > 1
+    # The database cannot count seats, so group sessions always take the lock
+    lock = (
+        therapist_booking_lock(db, data.therapist_id)
+        if group
+        else booking_lock(db, data.therapist_id)
+    )
+    async with lock:
+        # With the lock held the check cannot race another booking; without
+        # it the database constraint rejects the overlap on flush
+        if (settings.booking_lock_enabled or group) and await has_conflict(
+            db,
+            data.therapist_id,
+            start,
+            end,
+            treatment_id=treatment.id,
+            capacity=treatment.capacity,
+        ):
+            raise HTTPException(
+                status_code=400, detail="Appointment conflicts with existing booking."
+            )
+        # The seats left may all be held by other patients
+        if seats_held and await has_conflict(
+            db,
+            data.therapist_id,
+            start,
+            end,
+            treatment_id=treatment.id,
+            capacity=treatment.capacity - seats_held,
+        ):
+            raise HTTPException(
+                status_code=409, detail="Slot is held by another patient."
+            )
 
-    db.add(appointment)
-    await db.commit()
+        appointment = Appointment(
+            patient_id=patient_id,
+            therapist_id=data.therapist_id,
+            treatment_id=data.treatment_id,
+            start_time=start,
+            end_time=end,
+            notes=data.notes,
+            session_key=(
+                group_session_key(data.therapist_id, treatment.id, start, end)
+                if group
+                else None
+            ),
+        )
+
+        db.add(appointment)
+        try:
+            await db.flush()
+        except IntegrityError as e:
+            await db.rollback()
+            if is_overlap_violation(e):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Appointment conflicts with existing booking.",
+                ) from e
+            raise
+        await refresh_for_appointment(db, appointment.therapist_id, (start, end))
+        # The booking consumes the patient's hold, wherever it was
+        await slot_holds.release_patient(db, patient_id)
+        await db.commit()
+    await slot_cache.bump_days(data.therapist_id, appointment_days((start, end)))
     await db.refresh(appointment)
+    # Load what the notifications need here; lazy loads fail in async sessions
+    await db.refresh(appointment, ["patient", "therapist", "treatment"])
 
     background_tasks.add_task(
         send_appointment,
@@ -151,64 +373,133 @@ async def update_appointment(
     new_start = update_data.get("start_time", appointment.start_time)
     new_end = update_data.get("end_time", appointment.end_time)
 
-    if new_start != appointment.start_time or new_end != appointment.end_time:
-        if (
-            not await is_within_availability(
-                db, appointment.therapist_id, new_start, new_end
-            )
-            and not allow_override
-        ):
-            raise HTTPException(
-                status_code=400, detail="Therapist not available at this time"
+    therapist_id = appointment.therapist_id
+    async with booking_lock(db, therapist_id):
+        old_span = (appointment.start_time, appointment.end_time)
+        session_key = appointment.session_key
+        if new_start != appointment.start_time or new_end != appointment.end_time:
+            if (
+                not await is_within_availability(db, therapist_id, new_start, new_end)
+                and not allow_override
+            ):
+                raise HTTPException(
+                    status_code=400, detail="Therapist not available at this time"
+                )
+
+            treatment = await db.get(Treatment, appointment.treatment_id)
+            # A moved seat joins the session at its new time
+            session_key = (
+                group_session_key(therapist_id, treatment.id, new_start, new_end)
+                if treatment.capacity > 1
+                else None
             )
-
-        if (
-            await has_conflict(
+            if await has_conflict(
                 db,
-                appointment.therapist_id,
+                therapist_id,
                 new_start,
                 new_end,
-            )
-            and not allow_override
-        ):
-            raise HTTPException(
-                status_code=400,
-                detail="Appointment conflicts with existing booking",
-            )
-
-    for k, v in update_data.items():
-        setattr(appointment, k, v)
-
-    await db.commit()
+                appointment.id,
+                treatment_id=treatment.id,
+                capacity=treatment.capacity,
+            ):
+                if not allow_override:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Appointment conflicts with existing booking",
+                    )
+                session_key = await _override_session_key(
+                    db, appointment, new_start, new_end
+                )
+
+        for k, v in update_data.items():
+            setattr(appointment, k, v)
+        appointment.session_key = session_key
+        new_span = (appointment.start_time, appointment.end_time)
+
+        # Without the booking lock a concurrent booking can still take the slot
+        # after the check above; the constraint then rejects it
+        try:
+            await db.flush()
+        except IntegrityError as e:
+            await db.rollback()
+            if is_overlap_violation(e):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Appointment conflicts with existing booking",
+                ) from e
+            raise
+        await refresh_for_appointment(db, therapist_id, old_span, new_span)
+        await db.commit()
+    await slot_cache.bump_days(therapist_id, appointment_days(old_span, new_span))
     await db.refresh(appointment)
     return appointment
 
 
 async def delete_appointment(db: AsyncSession, appointment: Appointment) -> dict:
+    therapist_id = appointment.therapist_id
+    span = (appointment.start_time, appointment.end_time)
     await db.delete(appointment)
+    await db.flush()
+    await refresh_for_appointment(db, therapist_id, span)
     await db.commit()
+    await slot_cache.bump_days(therapist_id, appointment_days(span))
     return {"detail": "Appointment cancelled"}
 
 
 @staticmethod
 async def get_daily_availability(
-    db: AsyncSession, therapist_id: UUID, date: date
+    db: AsyncSession,
+    therapist_id: UUID,
+    date: date,
+    step_minutes: int = DAILY_AVAILABILITY_STEP_MINUTES,
+    window_start: Optional[time] = None,
+    window_end: Optional[time] = None,
 ) -> list[AvailabilitySlot]:
-    start = datetime.combine(date, datetime.min.time())
-    end = datetime.combine(date, datetime.max.time())
-
-    slots = []
-    current = start
-    while current < end:
-        next_slot = current + timedelta(minutes=30)
-        conflict = await has_conflict(db, therapist_id, current, next_slot)
-        slots.append(
-            AvailabilitySlot(
-                start=current,
-                end=next_slot,
-                available=not conflict,
-            )
-        )
-        current = next_slot
+    """Slots of `step_minutes` between `window_start` and `window_end`.
+
+    The whole day is used when no window is given. A slot is available when
+    it falls inside one of the therapist's availability blocks for that
+    weekday, outside their exceptions, and no scheduled appointment overlaps
+    it. Blocks, exceptions and appointments are fetched with one query each.
+    """
+    start_of_day = datetime.combine(date, time.min)
+    start = time_offset(window_start) if window_start else 0
+    end = time_offset(window_end) if window_end else DAY_SECONDS
+
+    blocks_query = select(
+        TherapistAvailability.start_minute, TherapistAvailability.end_minute
+    ).where(
+        TherapistAvailability.therapist_id == therapist_id,
+        TherapistAvailability.day_of_week == date.weekday(),
+    )
+    blocks_result = await db.execute(blocks_query)
+    blocks = merge_intervals(
+        (block_start * 60, block_end * 60)
+        for block_start, block_end in blocks_result.all()
+    )
+    removed = (await load_exceptions(db, [therapist_id], date, date)).get(therapist_id)
+    if removed:
+        blocks = subtract_intervals(blocks, removed)
+
+    appt_query = select(Appointment.start_time, Appointment.end_time).where(
+        Appointment.therapist_id == therapist_id,
+        Appointment.status == AppointmentStatus.scheduled,
+        Appointment.start_time < start_of_day + timedelta(seconds=end),
+        Appointment.end_time > start_of_day + timedelta(seconds=start),
+    )
+    appt_result = await db.execute(appt_query)
+    busy = merge_intervals(
+        (to_offset(start_of_day, appt_start), to_offset(start_of_day, appt_end))
+        for appt_start, appt_end in appt_result.all()
+    )
 
-    return slots
+    return [
+        AvailabilitySlot(
+            start=(start_of_day + timedelta(seconds=slot_start)).time(),
+            end=(start_of_day + timedelta(seconds=slot_end)).time(),
+            available=available,
+        )
+        for slot_start, slot_end, available in grid_availability(
+            (start, end), step_minutes * 60, blocks, busy
+        )
+    ]
@@ -1,10 +1,94 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional, Sequence
 from uuid import UUID
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.therapist_availability import TherapistAvailability
-from app.schemas.availability import AvailabilityCreate
+from app.core.slot_cache import slot_cache
+from app.models.availability_exception import AvailabilityException
+from app.models.therapist import Therapist
+from app.models.therapist_availability import (
+    WEEKDAYS,
+    TherapistAvailability,
+    minute_of_day,
+    weekday_number,
+)
+from app.schemas.availability import AvailabilityCreate, AvailabilityExceptionCreate
+from app.services.free_slot_service import Interval, merge_intervals, naive_utc
+from app.services.slot_calendar_service import (
+    refresh_for_exception,
+    refresh_for_weekday,
+    refresh_for_weekdays,
+)
+
+
+def canonical_blocks(blocks: Iterable[Interval]) -> list[Interval]:
+    """Sort-and-sweep blocks into the fewest non-touching intervals.
+
+    Overlapping and adjacent blocks are merged; empty or inverted ones are
+    dropped.
+    """
+    return merge_intervals(block for block in blocks if block[0] < block[1])
+
+
+def _block(row: TherapistAvailability) -> Interval:
+    return (row.start_minute, row.end_minute)
+
+
+async def _write_weekday(
+    db: AsyncSession,
+    therapist_id: UUID,
+    day_of_week: int,
+    rows: Sequence[TherapistAvailability],
+    blocks: list[Interval],
+) -> list[TherapistAvailability]:
+    """Make one weekday's rows match the canonical `blocks`.
+
+    Every existing row lies inside exactly one block, so a sweep over both
+    sorted lists finds the rows each block absorbs: the first one is
+    resized to the block and keeps its id, the others are deleted. Blocks
+    with no row are inserted. Does not flush or commit.
+    """
+    rows = sorted(rows, key=_block)
+    written: list[TherapistAvailability] = []
+    index = 0
+    for start, end in blocks:
+        absorbed = []
+        while index < len(rows) and rows[index].start_minute <= end:
+            absorbed.append(rows[index])
+            index += 1
+        if absorbed:
+            row = absorbed[0]
+            row.start_minute, row.end_minute = start, end
+            for duplicate in absorbed[1:]:
+                await db.delete(duplicate)
+        else:
+            row = TherapistAvailability(
+                therapist_id=therapist_id,
+                day_of_week=day_of_week,
+                start_minute=start,
+                end_minute=end,
+            )
+            db.add(row)
+        written.append(row)
+    # Past the last block: empty rows, or all of them when emptying the day
+    for row in rows[index:]:
+        await db.delete(row)
+    return written
+
+
+async def _availability_rows(
+    db: AsyncSession, therapist_id: UUID, day_of_week: Optional[int] = None
+) -> list[TherapistAvailability]:
+    q = select(TherapistAvailability).where(
+        TherapistAvailability.therapist_id == therapist_id
+    )
+    if day_of_week is not None:
+        q = q.where(TherapistAvailability.day_of_week == day_of_week)
+    result = await db.execute(q)
+    return list(result.scalars().all())
 
 
 async def create_availability(
@@ -12,30 +96,213 @@ async def create_availability(
     therapist_id: UUID,
     data: AvailabilityCreate,
 ) -> TherapistAvailability:
-    availability = TherapistAvailability(
-        therapist_id=therapist_id,
-        weekday=data.weekday.lower(),
-        start_time=data.start_time,
-        end_time=data.end_time,
+    """Add a weekly block, merged with the blocks it overlaps or touches.
+
+    Returns the block that now covers the requested one.
+    """
+    day_of_week = weekday_number(data.weekday)
+    block = (minute_of_day(data.start_time), minute_of_day(data.end_time))
+    rows = await _availability_rows(db, therapist_id, day_of_week)
+    written = await _write_weekday(
+        db,
+        therapist_id,
+        day_of_week,
+        rows,
+        canonical_blocks([*map(_block, rows), block]),
+    )
+    availability = next(
+        row for row in written if row.start_minute <= block[0] < row.end_minute
     )
-    db.add(availability)
+    await db.flush()
+    await refresh_for_weekday(db, therapist_id, day_of_week)
     await db.commit()
+    await slot_cache.bump_therapist(therapist_id)
     await db.refresh(availability)
     return availability
 
 
+async def set_weekly_template(
+    db: AsyncSession, therapist_id: UUID, blocks: Sequence[AvailabilityCreate]
+) -> list[TherapistAvailability]:
+    """Replace the therapist's whole weekly availability with `blocks`.
+
+    The blocks are normalized per weekday first; only the weekdays whose
+    blocks change are written and rebuilt in the slot calendar.
+    """
+    wanted: dict[int, list[Interval]] = defaultdict(list)
+    for data in blocks:
+        wanted[weekday_number(data.weekday)].append(
+            (minute_of_day(data.start_time), minute_of_day(data.end_time))
+        )
+    current: dict[int, list[TherapistAvailability]] = defaultdict(list)
+    for row in await _availability_rows(db, therapist_id):
+        current[row.day_of_week].append(row)
+
+    changed = set()
+    for day_of_week in range(len(WEEKDAYS)):
+        rows = current[day_of_week]
+        target = canonical_blocks(wanted[day_of_week])
+        if sorted(map(_block, rows)) != target:
+            await _write_weekday(db, therapist_id, day_of_week, rows, target)
+            changed.add(day_of_week)
+    if changed:
+        await db.flush()
+        await refresh_for_weekdays(db, therapist_id, changed)
+        await db.commit()
+        await slot_cache.bump_therapist(therapist_id)
+    return await list_therapist_availability(db, therapist_id)
+
+
+async def normalize_availability(
+    db: AsyncSession,
+    therapist_ids: Optional[Sequence[UUID]] = None,
+    dry_run: bool = False,
+) -> dict:
+    """Merge overlapping and adjacent blocks left by older writes.
+
+    Reads the blocks (every therapist's by default) in one query and
+    rewrites only the weekdays that are not canonical, rebuilding their slot
+    calendar days.
+    """
+    q = select(TherapistAvailability).order_by(
+        TherapistAvailability.therapist_id,
+        TherapistAvailability.day_of_week,
+        TherapistAvailability.start_minute,
+    )
+    if therapist_ids is not None:
+        q = q.where(TherapistAvailability.therapist_id.in_(therapist_ids))
+    groups: dict[tuple[UUID, int], list[TherapistAvailability]] = defaultdict(list)
+    for row in (await db.execute(q)).scalars():
+        groups[(row.therapist_id, row.day_of_week)].append(row)
+
+    changed: dict[UUID, set[int]] = defaultdict(set)
+    removed = 0
+    for (therapist_id, day_of_week), rows in groups.items():
+        target = canonical_blocks(map(_block, rows))
+        if [_block(row) for row in rows] == target:
+            continue
+        changed[therapist_id].add(day_of_week)
+        removed += len(rows) - len(target)
+        if not dry_run:
+            await _write_weekday(db, therapist_id, day_of_week, rows, target)
+
+    if changed and not dry_run:
+        await db.flush()
+        for therapist_id, days_of_week in changed.items():
+            await refresh_for_weekdays(db, therapist_id, days_of_week)
+        await db.commit()
+        for therapist_id in changed:
+            await slot_cache.bump_therapist(therapist_id)
+    return {
+        "therapists": len(changed),
+        "weekdays": sum(len(days) for days in changed.values()),
+        "removed": removed,
+    }
+
+
 async def list_therapist_availability(
     db: AsyncSession,
     therapist_id: UUID,
 ) -> list[TherapistAvailability]:
-    q = select(TherapistAvailability).where(
-        TherapistAvailability.therapist_id == therapist_id
+    q = (
+        select(TherapistAvailability)
+        .where(TherapistAvailability.therapist_id == therapist_id)
+        .order_by(TherapistAvailability.day_of_week, TherapistAvailability.start_minute)
     )
     result = await db.execute(q)
     return result.scalars().all()
 
 
 async def delete_availability_slot(db: AsyncSession, slot_id: UUID):
+    slot = await db.get(TherapistAvailability, slot_id)
     query = delete(TherapistAvailability).where(TherapistAvailability.id == slot_id)
     await db.execute(query)
+    if slot is not None:
+        await refresh_for_weekday(db, slot.therapist_id, slot.day_of_week)
+    await db.commit()
+    if slot is not None:
+        await slot_cache.bump_therapist(slot.therapist_id)
+
+
+async def _affected_therapists(
+    db: AsyncSession, therapist_id: Optional[UUID]
+) -> list[UUID]:
+    if therapist_id is not None:
+        return [therapist_id]
+    result = await db.execute(select(Therapist.id))
+    return list(result.scalars().all())
+
+
+async def _exception_changed(
+    db: AsyncSession, exception: AvailabilityException
+) -> list[UUID]:
+    """Refresh the slot calendar for the exception; returns who to bump."""
+    therapist_ids = await _affected_therapists(db, exception.therapist_id)
+    await refresh_for_exception(
+        db, therapist_ids, exception.start_time, exception.end_time
+    )
+    return therapist_ids
+
+
+async def create_availability_exception(
+    db: AsyncSession,
+    therapist_id: Optional[UUID],
+    data: AvailabilityExceptionCreate,
+) -> AvailabilityException:
+    """Take a time range out of the weekly availability.
+
+    Without a therapist the exception applies to all of them. The weekly
+    template is left alone, so only the days in the range are rebuilt.
+    """
+    exception = AvailabilityException(
+        therapist_id=therapist_id,
+        start_time=naive_utc(data.start_time),
+        end_time=naive_utc(data.end_time),
+        reason=data.reason,
+    )
+    db.add(exception)
+    await db.flush()
+    therapist_ids = await _exception_changed(db, exception)
+    await db.commit()
+    for affected in therapist_ids:
+        await slot_cache.bump_therapist(affected)
+    await db.refresh(exception)
+    return exception
+
+
+async def list_availability_exceptions(
+    db: AsyncSession,
+    therapist_id: UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> list[AvailabilityException]:
+    """A therapist's exceptions, clinic-wide ones included, by start time."""
+    q = select(AvailabilityException).where(
+        or_(
+            AvailabilityException.therapist_id == therapist_id,
+            AvailabilityException.therapist_id.is_(None),
+        )
+    )
+    if start is not None:
+        q = q.where(AvailabilityException.end_time > naive_utc(start))
+    if end is not None:
+        q = q.where(AvailabilityException.start_time < naive_utc(end))
+    result = await db.execute(q.order_by(AvailabilityException.start_time))
+    return result.scalars().all()
+
+
+async def get_availability_exception(
+    db: AsyncSession, exception_id: UUID
+) -> Optional[AvailabilityException]:
+    return await db.get(AvailabilityException, exception_id)
+
+
+async def delete_availability_exception(
+    db: AsyncSession, exception: AvailabilityException
+) -> None:
+    await db.delete(exception)
+    await db.flush()
+    therapist_ids = await _exception_changed(db, exception)
     await db.commit()
+    for affected in therapist_ids:
+        await slot_cache.bump_therapist(affected)
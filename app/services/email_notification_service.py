@@ -33,3 +33,33 @@ async def send_appointment(
         subject=f"Appointment {type.capitalize()}",
         html=html.body.decode(),
     )
+
+
+async def send_appointment_series(
+    patient: Patient,
+    therapist: Therapist,
+    treatment: Treatment,
+    appointments: list[Appointment],
+):
+    """One confirmation email listing every session of a booked series."""
+    sessions = [
+        {
+            "date": appointment.start_time.strftime("%d/%m/%Y"),
+            "time": appointment.start_time.strftime("%H:%M"),
+        }
+        for appointment in appointments
+    ]
+
+    html = templates.TemplateResponse(
+        "email/appointment_series_confirmation.html",
+        {
+            "therapist": therapist,
+            "treatment": treatment,
+            "sessions": sessions,
+        },
+    )
+    await send_email(
+        to=patient.email,
+        subject=f"Appointment Series Confirmation ({len(sessions)} sessions)",
+        html=html.body.decode(),
+    )
@@ -1,58 +1,746 @@
-from datetime import date, datetime, time, timedelta
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from operator import itemgetter
+from typing import Iterable, Optional, Sequence
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.slot_holds import Hold, slot_holds
 from app.models.appointment import Appointment, AppointmentStatus
+from app.models.availability_exception import AvailabilityException
+from app.models.slot_calendar import FreeInterval, SlotCalendarDay
+from app.models.therapist import Therapist
 from app.models.therapist_availability import TherapistAvailability
 
+# Intervals below are (start, end) offsets in whole seconds from midnight of the
+# requested day, half-open like the appointment overlap check.
+Interval = tuple[int, int]
 
-async def get_free_slots(
-    db: AsyncSession, therapist_id: UUID, day: date, duration_minutes: int
-) -> list[dict]:
-    weekday = day.strftime("%A").lower()
+DAY_SECONDS = 24 * 60 * 60
+
+
+def naive_utc(value: datetime) -> datetime:
+    # Appointment times are stored as naive UTC
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def to_offset(start_of_day: datetime, value: datetime) -> int:
+    return int((naive_utc(value) - start_of_day).total_seconds())
+
+
+def time_offset(value: time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> list[Interval]:
+    """Sort intervals once and merge the overlapping or touching ones."""
+    merged: list[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def sweep_free_slots(
+    blocks: Iterable[Interval], busy: list[Interval], duration: int, step: int
+) -> list[Interval]:
+    """Walk candidate slots and merged busy intervals together.
+
+    `busy` must come from `merge_intervals`. Each block is scanned left to
+    right with a single pointer into `busy`, starting at the first busy
+    interval that ends after the block starts; a slot that hits a busy
+    interval jumps straight to the first step past it, so the cost is linear
+    in slots + busy intervals instead of their product.
+    """
+    free: list[Interval] = []
+    busy_count = len(busy)
+    for block_start, block_end in sorted(blocks):
+        i = bisect_right(busy, block_start, key=itemgetter(1))
+        current = block_start
+        while current + duration <= block_end:
+            slot_end = current + duration
+            while i < busy_count and busy[i][1] <= current:
+                i += 1
+            if i < busy_count and busy[i][0] < slot_end:
+                # Every step that starts before the busy interval ends overlaps it
+                skip = busy[i][1] - current
+                current += -(-skip // step) * step
+                continue
+            free.append((current, slot_end))
+            current += step
+    return free
+
+
+def free_intervals(
+    blocks: Iterable[Interval], busy: list[Interval]
+) -> list[tuple[int, int, int]]:
+    """Subtract merged `busy` from each block.
+
+    Returns `(anchor, start, end)` triples where `anchor` is the start of the
+    block the free interval belongs to, so `slots_in_free_intervals` can
+    rebuild exactly the slots `sweep_free_slots` would produce.
+    """
+    return subtract_busy(((start, start, end) for start, end in blocks), busy)
+
+
+def subtract_busy(
+    intervals: Iterable[tuple[int, int, int]], busy: list[Interval]
+) -> list[tuple[int, int, int]]:
+    """Remove merged `busy` from `(anchor, start, end)` free intervals.
+
+    Anchors are kept, so the remaining slots stay on their block's grid.
+    """
+    free: list[tuple[int, int, int]] = []
+    busy_count = len(busy)
+    for anchor, start, end in sorted(intervals):
+        i = bisect_right(busy, start, key=itemgetter(1))
+        current = start
+        while i < busy_count and busy[i][0] < end:
+            if busy[i][0] > current:
+                free.append((anchor, current, busy[i][0]))
+            current = max(current, busy[i][1])
+            i += 1
+        if current < end:
+            free.append((anchor, current, end))
+    return free
+
+
+def slots_in_free_intervals(
+    intervals: Iterable[tuple[int, int, int]], duration: int, step: int
+) -> list[Interval]:
+    """Slots on each block's `step` grid that fit inside a free interval."""
+    slots: list[Interval] = []
+    for anchor, start, end in sorted(intervals):
+        current = anchor + -(-(start - anchor) // step) * step
+        while current + duration <= end:
+            slots.append((current, current + duration))
+            current += step
+    return slots
+
+
+def subtract_intervals(
+    blocks: Iterable[Interval], removed: list[Interval]
+) -> list[Interval]:
+    """Parts of `blocks` outside merged `removed`.
 
-    av_blocks_query = select(TherapistAvailability).where(
+    One sort plus a binary search into `removed` per block, so subtracting m
+    exceptions from n blocks is O((n + m) log(n + m)).
+    """
+    return [
+        (start, end)
+        for _, start, end in subtract_busy(
+            ((start, start, end) for start, end in blocks), removed
+        )
+    ]
+
+
+def blocks_on_day(
+    weekly_blocks: dict[tuple[UUID, int], list[Interval]],
+    exceptions: dict[UUID, list[Interval]],
+    therapist_id: UUID,
+    day: date,
+    day_offset: int = 0,
+) -> list[Interval]:
+    """Availability on `day`, which starts `day_offset` seconds into the window.
+
+    The weekly blocks for that weekday, shifted to the day, minus the
+    therapist's merged exceptions (in seconds from the window start).
+    """
+    blocks = [
+        (day_offset + start, day_offset + end)
+        for start, end in weekly_blocks.get((therapist_id, day.weekday()), [])
+    ]
+    removed = exceptions.get(therapist_id)
+    return subtract_intervals(blocks, removed) if removed and blocks else blocks
+
+
+def grid_availability(
+    window: Interval, step: int, blocks: list[Interval], busy: list[Interval]
+) -> list[tuple[int, int, bool]]:
+    """Split `window` into `step`-long slots and flag the bookable ones.
+
+    A slot is available when one availability block covers it and no busy
+    interval overlaps it. `blocks` and `busy` must come from
+    `merge_intervals`; both are walked with a forward-only pointer.
+    """
+    slots: list[tuple[int, int, bool]] = []
+    block_count, busy_count = len(blocks), len(busy)
+    b = i = 0
+    current, window_end = window
+    while current < window_end:
+        slot_end = min(current + step, window_end)
+        while b < block_count and blocks[b][1] < slot_end:
+            b += 1
+        while i < busy_count and busy[i][1] <= current:
+            i += 1
+        covered = b < block_count and blocks[b][0] <= current
+        conflict = i < busy_count and busy[i][0] < slot_end
+        slots.append((current, slot_end, covered and not conflict))
+        current = slot_end
+    return slots
+
+
+def _slot_dicts(start_of_day: datetime, slots: list[Interval]) -> list[dict]:
+    return [
+        {
+            "start_time": (start_of_day + timedelta(seconds=start)).isoformat(),
+            "end_time": (start_of_day + timedelta(seconds=end)).isoformat(),
+        }
+        for start, end in slots
+    ]
+
+
+async def read_calendar(
+    db: AsyncSession, therapist_id: UUID, day: date
+) -> Optional[list[tuple[int, int, int]]]:
+    """Materialized free intervals for a therapist's day.
+
+    Returns None when the day is not in the slot calendar, and an empty list
+    when it is but nothing is free.
+    """
+    query = (
+        select(
+            FreeInterval.anchor_offset,
+            FreeInterval.start_offset,
+            FreeInterval.end_offset,
+        )
+        .select_from(SlotCalendarDay)
+        .outerjoin(
+            FreeInterval,
+            and_(
+                FreeInterval.therapist_id == SlotCalendarDay.therapist_id,
+                FreeInterval.day == SlotCalendarDay.day,
+            ),
+        )
+        .where(SlotCalendarDay.therapist_id == therapist_id, SlotCalendarDay.day == day)
+    )
+    rows = (await db.execute(query)).all()
+    if not rows:
+        return None
+    return [tuple(row) for row in rows if row.anchor_offset is not None]
+
+
+def held_intervals(start_of_day: datetime, holds: Iterable[Hold]) -> list[Interval]:
+    return merge_intervals(
+        (
+            to_offset(start_of_day, hold.start_time),
+            to_offset(start_of_day, hold.end_time),
+        )
+        for hold in holds
+    )
+
+
+def with_held_seats(
+    sessions: Sequence[tuple[UUID, int, int, int]],
+    start_of_day: datetime,
+    holds: Iterable[Hold],
+) -> list[tuple[UUID, int, int, int]]:
+    """`sessions` with each hold taking one seat of the session over its span.
+
+    A hold on a session of its treatment leaves the other seats bookable;
+    anywhere else it is a one-seat session that overlaps, so blocks, the
+    slots around it.
+    """
+    seats: dict[tuple[UUID, int, int], int] = {
+        (treatment_id, start, end): taken
+        for treatment_id, start, end, taken in sessions
+    }
+    for hold in holds:
+        key = (
+            hold.treatment_id,
+            to_offset(start_of_day, hold.start_time),
+            to_offset(start_of_day, hold.end_time),
+        )
+        seats[key] = seats.get(key, 0) + 1
+    return [(*key, taken) for key, taken in seats.items()]
+
+
+async def _day_blocks(
+    db: AsyncSession, therapist_id: UUID, day: date
+) -> list[Interval]:
+    """The day's availability blocks minus its exceptions, in seconds."""
+    av_blocks_query = select(
+        TherapistAvailability.start_minute, TherapistAvailability.end_minute
+    ).where(
         TherapistAvailability.therapist_id == therapist_id,
-        TherapistAvailability.weekday == weekday,
+        TherapistAvailability.day_of_week == day.weekday(),
     )
     av_blocks_result = await db.execute(av_blocks_query)
-    availability_blocks = av_blocks_result.scalars().all()
-    if not availability_blocks:
+    blocks = [(start * 60, end * 60) for start, end in av_blocks_result.all()]
+    if not blocks:
         return []
+    removed = (await load_exceptions(db, [therapist_id], day, day)).get(therapist_id)
+    if removed:
+        blocks = subtract_intervals(blocks, removed)
+    return blocks
+
+
+def group_session_slots(
+    blocks: list[Interval],
+    sessions: Sequence[tuple[UUID, int, int, int]],
+    duration: int,
+    step: int,
+    treatment_id: UUID,
+    capacity: int,
+) -> list[tuple[int, int, int]]:
+    """`(start, end, seats left)` slots of a group treatment in `blocks`.
 
+    `sessions` are `(treatment_id, start, end, seats taken)` from
+    `load_sessions`, with holds added by `with_held_seats`, in the same
+    offsets as `blocks`. Empty slots offer every seat; a session of this
+    treatment that is not full, fits in a block and overlaps nothing else
+    is offered with the seats left.
+    """
+    spans = [(start, end) for _, start, end, _ in sessions]
+    slots = [
+        (start, end, capacity)
+        for start, end in sweep_free_slots(
+            blocks, merge_intervals(spans), duration, step
+        )
+    ]
+    for index, (session_treatment, start, end, seats) in enumerate(sessions):
+        if (
+            session_treatment != treatment_id
+            or seats >= capacity
+            or end - start != duration
+        ):
+            continue
+        others = spans[:index] + spans[index + 1 :]
+        if any(
+            other_start < end and other_end > start for other_start, other_end in others
+        ):
+            continue
+        if any(
+            block_start <= start and end <= block_end
+            for block_start, block_end in blocks
+        ):
+            slots.append((start, end, capacity - seats))
+    slots.sort()
+    return slots
+
+
+async def get_free_slots(
+    db: AsyncSession,
+    therapist_id: UUID,
+    day: date,
+    duration_minutes: int,
+    step_minutes: Optional[int] = None,
+    holds: Optional[Sequence[Hold]] = None,
+    treatment_id: Optional[UUID] = None,
+    capacity: int = 1,
+) -> list[dict]:
+    """Free `duration_minutes` slots for one therapist and day.
+
+    Slots start every `step_minutes` inside each availability block (every
+    `duration_minutes` when no step is given). Days in the slot calendar are
+    served from it with one indexed read; other days are computed from the
+    availability blocks minus the day's exceptions, and appointments. Slots
+    overlapping a live hold are left out; pass `holds` when the caller
+    already looked them up.
+
+    For a group treatment (`capacity` above 1) each slot also reports its
+    remaining `seats`, and sessions of `treatment_id` that still have room
+    are offered; a hold on such a session takes one seat rather than the
+    slot. The calendar only stores free time, so these days are always
+    computed.
+    """
     start_of_day = datetime.combine(day, time.min)
-    end_of_day = datetime.combine(day, time.max)
+    next_day = start_of_day + timedelta(days=1)
+    duration = duration_minutes * 60
+    step = (step_minutes or duration_minutes) * 60
+    if holds is None:
+        holds = await slot_holds.active(db, [therapist_id], start_of_day, next_day)
 
-    appt_query = select(Appointment).where(
+    if capacity > 1:
+        blocks = await _day_blocks(db, therapist_id, day)
+        if not blocks:
+            return []
+        sessions = with_held_seats(
+            (await load_sessions(db, [therapist_id], day, day))[therapist_id],
+            start_of_day,
+            holds,
+        )
+        slots = group_session_slots(
+            blocks, sessions, duration, step, treatment_id, capacity
+        )
+        return [
+            {**slot, "seats": seats}
+            for slot, (_, _, seats) in zip(
+                _slot_dicts(start_of_day, [(start, end) for start, end, _ in slots]),
+                slots,
+            )
+        ]
+
+    held = held_intervals(start_of_day, holds)
+    intervals = await read_calendar(db, therapist_id, day)
+    if intervals is not None:
+        return _slot_dicts(
+            start_of_day,
+            slots_in_free_intervals(subtract_busy(intervals, held), duration, step),
+        )
+
+    blocks = await _day_blocks(db, therapist_id, day)
+    if not blocks:
+        return []
+
+    appt_query = select(Appointment.start_time, Appointment.end_time).where(
         Appointment.therapist_id == therapist_id,
         Appointment.status == AppointmentStatus.scheduled,
-        Appointment.start_time >= start_of_day,
-        Appointment.end_time <= end_of_day,
+        Appointment.start_time < next_day,
+        Appointment.end_time > start_of_day,
     )
     appt_result = await db.execute(appt_query)
-    appointments = appt_result.scalars().all()
+    busy = merge_intervals(
+        [
+            (to_offset(start_of_day, start), to_offset(start_of_day, end))
+            for start, end in appt_result.all()
+        ]
+        + held
+    )
+    return _slot_dicts(start_of_day, sweep_free_slots(blocks, busy, duration, step))
 
-    free_slots: list[dict] = []
-    for block in availability_blocks:
-        current = datetime.combine(day, block.start_time)
-        block_end = datetime.combine(day, block.end_time)
 
-        while current + timedelta(minutes=duration_minutes) <= block_end:
-            slot_start = current
-            slot_end = current + timedelta(minutes=duration_minutes)
+async def load_weekly_blocks(
+    db: AsyncSession, therapist_ids: Sequence[UUID]
+) -> dict[tuple[UUID, int], list[Interval]]:
+    """`(therapist_id, day_of_week) -> blocks` in seconds from midnight, with
+    `day_of_week` as in `date.weekday()`, from one query."""
+    weekly_blocks: dict[tuple[UUID, int], list[Interval]] = defaultdict(list)
+    blocks_query = select(
+        TherapistAvailability.therapist_id,
+        TherapistAvailability.day_of_week,
+        TherapistAvailability.start_minute,
+        TherapistAvailability.end_minute,
+    ).where(TherapistAvailability.therapist_id.in_(therapist_ids))
+    for therapist_id, day_of_week, block_start, block_end in (
+        await db.execute(blocks_query)
+    ).all():
+        weekly_blocks[(therapist_id, day_of_week)].append(
+            (block_start * 60, block_end * 60)
+        )
+    return weekly_blocks
 
-            conflict = any(
-                appt.start_time < slot_end and appt.end_time > slot_start
-                for appt in appointments
+
+async def load_schedule(
+    db: AsyncSession,
+    therapist_ids: Sequence[UUID],
+    start_date: date,
+    end_date: date,
+) -> tuple[dict[tuple[UUID, int], list[Interval]], dict[UUID, list[Interval]]]:
+    """Weekly availability and scheduled appointments for several therapists.
+
+    Returns the blocks from `load_weekly_blocks` and
+    `therapist_id -> appointments` (unmerged) in seconds from midnight of
+    `start_date`, loaded with one query each.
+    """
+    weekly_blocks = await load_weekly_blocks(db, therapist_ids)
+
+    window_start = datetime.combine(start_date, time.min)
+    window_end = datetime.combine(end_date, time.min) + timedelta(days=1)
+    appointments: dict[UUID, list[Interval]] = defaultdict(list)
+    appt_query = select(
+        Appointment.therapist_id, Appointment.start_time, Appointment.end_time
+    ).where(
+        Appointment.therapist_id.in_(therapist_ids),
+        Appointment.status == AppointmentStatus.scheduled,
+        Appointment.start_time < window_end,
+        Appointment.end_time > window_start,
+    )
+    for therapist_id, appt_start, appt_end in (await db.execute(appt_query)).all():
+        appointments[therapist_id].append(
+            (to_offset(window_start, appt_start), to_offset(window_start, appt_end))
+        )
+    return weekly_blocks, appointments
+
+
+async def load_sessions(
+    db: AsyncSession,
+    therapist_ids: Sequence[UUID],
+    start_date: date,
+    end_date: date,
+) -> dict[UUID, list[tuple[UUID, int, int, int]]]:
+    """Scheduled appointments grouped into sessions, with their seat count.
+
+    Returns `therapist_id -> [(treatment_id, start, end, seats)]` in seconds
+    from midnight of `start_date`, from one aggregate query. One-to-one
+    appointments are sessions of one seat.
+    """
+    window_start = datetime.combine(start_date, time.min)
+    window_end = datetime.combine(end_date, time.min) + timedelta(days=1)
+    sessions: dict[UUID, list[tuple[UUID, int, int, int]]] = defaultdict(list)
+    sessions_query = (
+        select(
+            Appointment.therapist_id,
+            Appointment.treatment_id,
+            Appointment.start_time,
+            Appointment.end_time,
+            func.count(),
+        )
+        .where(
+            Appointment.therapist_id.in_(therapist_ids),
+            Appointment.status == AppointmentStatus.scheduled,
+            Appointment.start_time < window_end,
+            Appointment.end_time > window_start,
+        )
+        .group_by(
+            Appointment.therapist_id,
+            Appointment.treatment_id,
+            Appointment.start_time,
+            Appointment.end_time,
+        )
+    )
+    for therapist_id, treatment_id, start, end, seats in (
+        await db.execute(sessions_query)
+    ).all():
+        sessions[therapist_id].append(
+            (
+                treatment_id,
+                to_offset(window_start, start),
+                to_offset(window_start, end),
+                seats,
             )
-            if not conflict:
-                free_slots.append(
-                    {
-                        "start_time": slot_start.isoformat(),
-                        "end_time": slot_end.isoformat(),
-                    }
+        )
+    return sessions
+
+
+async def load_exceptions(
+    db: AsyncSession,
+    therapist_ids: Sequence[UUID],
+    start_date: date,
+    end_date: date,
+) -> dict[UUID, list[Interval]]:
+    """Merged availability exceptions per therapist, with one range query.
+
+    Offsets are seconds from midnight of `start_date`. Clinic-wide
+    exceptions (no therapist) are included for every therapist.
+    """
+    window_start = datetime.combine(start_date, time.min)
+    window_end = datetime.combine(end_date, time.min) + timedelta(days=1)
+    query = select(
+        AvailabilityException.therapist_id,
+        AvailabilityException.start_time,
+        AvailabilityException.end_time,
+    ).where(
+        or_(
+            AvailabilityException.therapist_id.in_(therapist_ids),
+            AvailabilityException.therapist_id.is_(None),
+        ),
+        AvailabilityException.end_time > window_start,
+        AvailabilityException.start_time < window_end,
+    )
+    spans: dict[Optional[UUID], list[Interval]] = defaultdict(list)
+    for therapist_id, start, end in (await db.execute(query)).all():
+        spans[therapist_id].append(
+            (to_offset(window_start, start), to_offset(window_start, end))
+        )
+    clinic_wide = spans.pop(None, [])
+    if not spans and not clinic_wide:
+        return {}
+    return {
+        therapist_id: merge_intervals(spans.get(therapist_id, []) + clinic_wide)
+        for therapist_id in therapist_ids
+    }
+
+
+async def find_next_free_slots(
+    db: AsyncSession,
+    duration_minutes: int,
+    start_date: date,
+    end_date: date,
+    therapist_ids: Optional[Sequence[UUID]] = None,
+    specialty: Optional[str] = None,
+    limit: int = 10,
+    step_minutes: Optional[int] = None,
+    not_before: Optional[datetime] = None,
+    treatment_id: Optional[UUID] = None,
+    capacity: int = 1,
+) -> list[dict]:
+    """Earliest `limit` free slots across therapists and days.
+
+    Candidates are the active therapists, optionally restricted to
+    `therapist_ids` and/or a case-insensitive `specialty`. Their weekly
+    availability, exceptions and the scheduled appointments in the date
+    window are loaded with one range query each, then every therapist's days
+    are swept in order until `limit` slots are found. Slots starting before
+    `not_before` and slots overlapping a live hold are skipped. Ties on start
+    time are broken by therapist name.
+
+    For a group treatment (`capacity` above 1) the appointments are loaded
+    as sessions and each slot reports its remaining `seats`, as in
+    `get_free_slots`.
+    """
+    therapist_query = select(Therapist.id, Therapist.name).where(
+        Therapist.active.is_(True)
+    )
+    if therapist_ids:
+        therapist_query = therapist_query.where(Therapist.id.in_(therapist_ids))
+    if specialty:
+        therapist_query = therapist_query.where(
+            func.lower(Therapist.specialty) == specialty.lower()
+        )
+    therapist_result = await db.execute(therapist_query)
+    therapists = sorted(therapist_result.all(), key=lambda row: row.name or "")
+    if not therapists or limit <= 0:
+        return []
+    candidate_ids = [row.id for row in therapists]
+
+    window_start = datetime.combine(start_date, time.min)
+    if capacity > 1:
+        weekly_blocks = await load_weekly_blocks(db, candidate_ids)
+        sessions = await load_sessions(db, candidate_ids, start_date, end_date)
+    else:
+        weekly_blocks, appointments = await load_schedule(
+            db, candidate_ids, start_date, end_date
+        )
+    exceptions = await load_exceptions(db, candidate_ids, start_date, end_date)
+
+    window_end = datetime.combine(end_date, time.min) + timedelta(days=1)
+    holds: dict[UUID, list[Hold]] = defaultdict(list)
+    for hold in await slot_holds.active(db, candidate_ids, window_start, window_end):
+        holds[hold.therapist_id].append(hold)
+
+    earliest = 0
+    if not_before is not None and not_before > window_start:
+        earliest = to_offset(window_start, not_before)
+    if capacity > 1:
+        sessions = {
+            therapist_id: with_held_seats(
+                sessions.get(therapist_id, []), window_start, holds[therapist_id]
+            )
+            for therapist_id in candidate_ids
+        }
+    else:
+        cutoff = [(0, earliest)] if earliest else []
+        busy = {
+            therapist_id: merge_intervals(
+                appointments.get(therapist_id, [])
+                + held_intervals(window_start, holds[therapist_id])
+                + cutoff
+            )
+            for therapist_id in candidate_ids
+        }
+
+    duration = duration_minutes * 60
+    step = (step_minutes or duration_minutes) * 60
+    found: list[tuple[int, int, str, UUID, int, int]] = []
+    day = start_date
+    day_offset = 0
+    while day <= end_date:
+        day_end = day_offset + DAY_SECONDS
+        for rank, row in enumerate(therapists):
+            day_blocks = blocks_on_day(
+                weekly_blocks, exceptions, row.id, day, day_offset
+            )
+            if not day_blocks:
+                continue
+            if capacity > 1:
+                todays = [
+                    session
+                    for session in sessions[row.id]
+                    if session[1] < day_end and session[2] > day_offset
+                ]
+                slots = [
+                    slot
+                    for slot in group_session_slots(
+                        day_blocks, todays, duration, step, treatment_id, capacity
+                    )
+                    if slot[0] >= earliest
+                ]
+            else:
+                slots = [
+                    (start, end, 1)
+                    for start, end in sweep_free_slots(
+                        day_blocks, busy[row.id], duration, step
+                    )
+                ]
+            for start, end, seats in slots:
+                found.append((start, rank, row.name, row.id, end, seats))
+        # Later days can only add later slots
+        if len(found) >= limit:
+            break
+        day += timedelta(days=1)
+        day_offset = day_end
+
+    found.sort()
+    return [
+        {
+            "therapist_id": therapist_id,
+            "therapist_name": name,
+            "start_time": (window_start + timedelta(seconds=start)).isoformat(),
+            "end_time": (window_start + timedelta(seconds=end)).isoformat(),
+            **({"seats": seats} if capacity > 1 else {}),
+        }
+        for start, _, name, therapist_id, end, seats in found[:limit]
+    ]
+
+
+async def count_free_slots_by_date(
+    db: AsyncSession,
+    therapist_id: UUID,
+    start_date: date,
+    end_date: date,
+    duration_minutes: int,
+    step_minutes: Optional[int] = None,
+    treatment_id: Optional[UUID] = None,
+    capacity: int = 1,
+) -> dict[date, int]:
+    """How many slots `get_free_slots` lists on each day of the range.
+
+    The weekly availability, the exceptions, the live holds and the
+    appointments in the range (as sessions for group treatments) are loaded
+    once; each day is then swept in memory with the same functions
+    `get_free_slots` uses, so the counts match it.
+    """
+    window_start = datetime.combine(start_date, time.min)
+    window_end = datetime.combine(end_date, time.min) + timedelta(days=1)
+    if capacity > 1:
+        weekly_blocks = await load_weekly_blocks(db, [therapist_id])
+        sessions = (await load_sessions(db, [therapist_id], start_date, end_date))[
+            therapist_id
+        ]
+    else:
+        weekly_blocks, schedule = await load_schedule(
+            db, [therapist_id], start_date, end_date
+        )
+    exceptions = await load_exceptions(db, [therapist_id], start_date, end_date)
+    holds = await slot_holds.active(db, [therapist_id], window_start, window_end)
+    if capacity > 1:
+        sessions = with_held_seats(sessions, window_start, holds)
+    else:
+        busy = merge_intervals(
+            schedule[therapist_id] + held_intervals(window_start, holds)
+        )
+
+    duration = duration_minutes * 60
+    step = (step_minutes or duration_minutes) * 60
+    counts: dict[date, int] = {}
+    day, day_offset = start_date, 0
+    while day <= end_date:
+        blocks = blocks_on_day(weekly_blocks, exceptions, therapist_id, day, day_offset)
+        if not blocks:
+            counts[day] = 0
+        elif capacity > 1:
+            day_end = day_offset + DAY_SECONDS
+            todays = [
+                session
+                for session in sessions
+                if session[1] < day_end and session[2] > day_offset
+            ]
+            counts[day] = len(
+                group_session_slots(
+                    blocks, todays, duration, step, treatment_id, capacity
                 )
-            current += timedelta(minutes=duration_minutes)
-    return free_slots
+            )
+        else:
+            counts[day] = len(sweep_free_slots(blocks, busy, duration, step))
+        day += timedelta(days=1)
+        day_offset += DAY_SECONDS
+    return counts
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.patient import Patient
 from app.schemas.patient import PatientCreate, PatientPublic, PatientUpdate
+from app.services.principal_service import invalidate_principal
 
 
 async def create_patient(db: AsyncSession, data: PatientCreate):
@@ -32,4 +33,5 @@ async def update_patient(db: AsyncSession, patient: PatientPublic, data: Patient
         setattr(patient, k, v)
     await db.commit()
     await db.refresh(patient)
+    invalidate_principal(patient.supabase_user_id)
     return patient
@@ -0,0 +1,93 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.models.patient import Patient
+from app.models.therapist import Therapist
+
+PRINCIPAL_CACHE_TTL = 60  # seconds; bounds staleness across workers
+PRINCIPAL_CACHE_MAX_SIZE = 4096
+
+# supabase_user_id -> (role, profile_id, active)
+PRINCIPAL_CACHE = TTLCache(max_size=PRINCIPAL_CACHE_MAX_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated user resolved to their patient or therapist profile."""
+
+    user_id: str
+    email: Optional[str]
+    role: str
+    profile_id: Optional[UUID]
+    active: bool
+    user_metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+def _cache_key(supabase_user_id) -> str:
+    return str(supabase_user_id)
+
+
+def invalidate_principal(supabase_user_id) -> None:
+    """Drop the cached profile mapping after a write that may change it."""
+    if supabase_user_id is not None:
+        PRINCIPAL_CACHE.discard(_cache_key(supabase_user_id))
+
+
+async def _load_profile(
+    db: AsyncSession, supabase_user_id: UUID, role: str
+) -> tuple[Optional[UUID], bool]:
+    if role == "patient":
+        query = select(Patient.id).where(Patient.supabase_user_id == supabase_user_id)
+        result = await db.execute(query)
+        return result.scalar_one_or_none(), True
+
+    # Therapists and admins both live in the therapists table
+    query = select(Therapist.id, Therapist.active).where(
+        Therapist.supabase_user_id == supabase_user_id
+    )
+    result = await db.execute(query)
+    row = result.one_or_none()
+    if row is None:
+        return None, False
+    return row.id, bool(row.active)
+
+
+async def resolve_principal(db: AsyncSession, user: Dict[str, Any]) -> Principal:
+    """Map the verified token's user to a `Principal`, using the TTL cache.
+
+    Patients and therapists are cached only once their profile exists, so a
+    profile created right after the first lookup is picked up on the next
+    request. Admins usually have no therapist profile, so for them the missing
+    profile is cached too; creating one invalidates the entry.
+    """
+    role = user["role"]
+    key = _cache_key(user["id"])
+
+    cached = PRINCIPAL_CACHE.get(key)
+    if cached is not None and cached[0] == role:
+        _, profile_id, active = cached
+    else:
+        try:
+            supabase_user_id = UUID(str(user["id"]))
+        except (TypeError, ValueError):
+            supabase_user_id = None
+
+        profile_id, active = None, False
+        if supabase_user_id is not None and role in ("patient", "therapist", "admin"):
+            profile_id, active = await _load_profile(db, supabase_user_id, role)
+        if profile_id is not None or role == "admin":
+            PRINCIPAL_CACHE.set(key, (role, profile_id, active))
+
+    return Principal(
+        user_id=str(user["id"]),
+        email=user.get("email"),
+        role=role,
+        profile_id=profile_id,
+        active=active,
+        user_metadata=user.get("user_metadata") or {},
+    )
@@ -0,0 +1,226 @@
+from datetime import date, timedelta
+from typing import Iterable, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.free_slot_service import (
+    DAY_SECONDS,
+    Interval,
+    blocks_on_day,
+    load_exceptions,
+    load_schedule,
+)
+
+try:  # Optional: vectorized counts over many therapist days at once
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on installed extras
+    np = None
+
+# A day is a row of 5-minute ticks; bit i covers [i * 300, (i + 1) * 300)
+TICK_MINUTES = 5
+TICK_SECONDS = TICK_MINUTES * 60
+TICKS_PER_DAY = DAY_SECONDS // TICK_SECONDS
+BYTES_PER_DAY = TICKS_PER_DAY // 8
+
+
+def tick_mask(start: int, end: int, inner: bool = False) -> int:
+    """Bits of the ticks touched by [start, end), in seconds from midnight.
+
+    With `inner` only ticks lying completely inside the interval are set,
+    which is how availability blocks are stored: a block never claims a
+    partially covered tick, while an appointment always blocks it.
+    """
+    start, end = max(start, 0), min(end, DAY_SECONDS)
+    if inner:
+        first, last = -(-start // TICK_SECONDS), end // TICK_SECONDS
+    else:
+        first, last = start // TICK_SECONDS, -(-end // TICK_SECONDS)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def to_ticks(seconds: int) -> int:
+    if seconds <= 0 or seconds % TICK_SECONDS:
+        raise ValueError(f"{seconds}s is not a positive multiple of {TICK_SECONDS}s")
+    return seconds // TICK_SECONDS
+
+
+def fitting_starts(free: int, length: int) -> int:
+    """Bit i is set when ticks i .. i + length - 1 are all set in `free`."""
+    fits, span = free, 1
+    while span < length:
+        shift = min(span, length - span)
+        fits &= fits >> shift
+        span += shift
+    return fits
+
+
+def _runs(bits: int) -> Iterable[tuple[int, int]]:
+    """(first tick, length) of each run of consecutive set bits."""
+    while bits:
+        first = (bits & -bits).bit_length() - 1
+        rest = bits >> first
+        length = (~rest & (rest + 1)).bit_length() - 1
+        yield first, length
+        bits &= ~(((1 << length) - 1) << first)
+
+
+class DayBitmap:
+    """One therapist day as two 288-bit masks: available ticks and busy ticks.
+
+    Python ints serve as the bit arrays, so conflict and availability checks
+    are a couple of AND operations and a day costs a few dozen bytes.
+    """
+
+    __slots__ = ("available", "busy")
+
+    def __init__(self, available: int = 0, busy: int = 0):
+        self.available = available
+        self.busy = busy
+
+    @classmethod
+    def from_intervals(
+        cls, blocks: Iterable[Interval], appointments: Iterable[Interval] = ()
+    ) -> "DayBitmap":
+        available = busy = 0
+        for start, end in blocks:
+            available |= tick_mask(start, end, inner=True)
+        for start, end in appointments:
+            busy |= tick_mask(start, end)
+        return cls(available, busy)
+
+    @property
+    def free(self) -> int:
+        return self.available & ~self.busy
+
+    def has_conflict(self, start: int, end: int) -> bool:
+        return bool(tick_mask(start, end) & self.busy)
+
+    def is_within_availability(self, start: int, end: int) -> bool:
+        mask = tick_mask(start, end)
+        return mask != 0 and mask & self.available == mask
+
+    def _slot_starts(self, duration: int, step: int) -> Iterable[int]:
+        # Slots follow the `step` grid of each availability run, as the
+        # sweep in free_slot_service does for each (merged) block
+        length, stride = to_ticks(duration), to_ticks(step)
+        fits = fitting_starts(self.free, length)
+        for first, run in _runs(self.available):
+            for tick in range(first, first + run - length + 1, stride):
+                if fits >> tick & 1:
+                    yield tick
+
+    def free_slots(self, duration: int, step: int) -> list[Interval]:
+        """Bookable (start, end) slots, in seconds from midnight."""
+        return [
+            (tick * TICK_SECONDS, tick * TICK_SECONDS + duration)
+            for tick in self._slot_starts(duration, step)
+        ]
+
+    def count_slots(self, duration: int, step: int) -> int:
+        return sum(1 for _ in self._slot_starts(duration, step))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DayBitmap):
+            return NotImplemented
+        return (self.available, self.busy) == (other.available, other.busy)
+
+    def __repr__(self) -> str:
+        return f"DayBitmap(available={self.available:#x}, busy={self.busy:#x})"
+
+
+def bitmap_matrix(masks: Sequence[int]) -> "np.ndarray":
+    """Unpack 288-bit masks into a (len(masks), 288) boolean array."""
+    raw = b"".join(mask.to_bytes(BYTES_PER_DAY, "little") for mask in masks)
+    packed = np.frombuffer(raw, dtype=np.uint8).reshape(len(masks), BYTES_PER_DAY)
+    return np.unpackbits(packed, axis=1, bitorder="little").astype(bool)
+
+
+def _count_slots_vectorized(
+    bitmaps: Sequence[DayBitmap], duration: int, step: int
+) -> list[int]:
+    length, stride = to_ticks(duration), to_ticks(step)
+    if length > TICKS_PER_DAY:
+        return [0] * len(bitmaps)
+    available = bitmap_matrix([bitmap.available for bitmap in bitmaps])
+    free = bitmap_matrix([bitmap.free for bitmap in bitmaps])
+
+    # A window of `length` ticks fits when all of them are free
+    cumulative = np.zeros((len(bitmaps), TICKS_PER_DAY + 1), dtype=np.int32)
+    np.cumsum(free, axis=1, out=cumulative[:, 1:])
+    fits = cumulative[:, length:] - cumulative[:, :-length] == length
+
+    # Start tick of the availability run each tick belongs to
+    ticks = np.arange(TICKS_PER_DAY)
+    run_start = available.copy()
+    run_start[:, 1:] &= ~available[:, :-1]
+    anchor = np.maximum.accumulate(np.where(run_start, ticks, 0), axis=1)
+    on_grid = (ticks - anchor) % stride == 0
+
+    starts = fits & on_grid[:, : fits.shape[1]]
+    return starts.sum(axis=1).tolist()
+
+
+def count_free_slots(
+    bitmaps: Sequence[DayBitmap], duration: int, step: int
+) -> list[int]:
+    """Bookable slot count per bitmap, vectorized when NumPy is installed."""
+    if np is not None and bitmaps:
+        return _count_slots_vectorized(bitmaps, duration, step)
+    return [bitmap.count_slots(duration, step) for bitmap in bitmaps]
+
+
+async def load_day_bitmaps(
+    db: AsyncSession,
+    therapist_ids: Sequence[UUID],
+    start_date: date,
+    end_date: date,
+) -> dict[tuple[UUID, date], DayBitmap]:
+    """Bitmaps for every therapist and day in the range, from three queries."""
+    weekly_blocks, appointments = await load_schedule(
+        db, therapist_ids, start_date, end_date
+    )
+    exceptions = await load_exceptions(db, therapist_ids, start_date, end_date)
+    day_count = (end_date - start_date).days + 1
+    bitmaps: dict[tuple[UUID, date], DayBitmap] = {}
+    for therapist_id in therapist_ids:
+        busy = [0] * day_count
+        for appt_start, appt_end in appointments.get(therapist_id, []):
+            first = max(appt_start // DAY_SECONDS, 0)
+            last = min((appt_end - 1) // DAY_SECONDS, day_count - 1)
+            for index in range(first, last + 1):
+                offset = index * DAY_SECONDS
+                busy[index] |= tick_mask(appt_start - offset, appt_end - offset)
+        for index in range(day_count):
+            day = start_date + timedelta(days=index)
+            offset = index * DAY_SECONDS
+            blocks = blocks_on_day(weekly_blocks, exceptions, therapist_id, day, offset)
+            bitmap = DayBitmap.from_intervals(
+                [(start - offset, end - offset) for start, end in blocks]
+            )
+            bitmap.busy = busy[index]
+            bitmaps[(therapist_id, day)] = bitmap
+    return bitmaps
+
+
+async def count_free_slots_by_day(
+    db: AsyncSession,
+    therapist_ids: Sequence[UUID],
+    start_date: date,
+    end_date: date,
+    duration_minutes: int,
+    step_minutes: Optional[int] = None,
+) -> dict[tuple[UUID, date], int]:
+    """Bookable slot counts per therapist day, for capacity planning.
+
+    Ordered by therapist, as in `therapist_ids`, then by day.
+    """
+    bitmaps = await load_day_bitmaps(db, therapist_ids, start_date, end_date)
+    counts = count_free_slots(
+        list(bitmaps.values()),
+        duration_minutes * 60,
+        (step_minutes or duration_minutes) * 60,
+    )
+    return dict(zip(bitmaps, counts))
@@ -0,0 +1,249 @@
+from datetime import date, datetime, time, timedelta
+from typing import Collection, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.slot_calendar import FreeInterval, SlotCalendarDay
+from app.models.therapist import Therapist
+from app.services.free_slot_service import (
+    DAY_SECONDS,
+    blocks_on_day,
+    free_intervals,
+    load_exceptions,
+    load_schedule,
+    merge_intervals,
+    naive_utc,
+)
+
+# Days from today that are kept materialized in the slot calendar
+SLOT_CALENDAR_HORIZON_DAYS = 60
+
+# (therapist_id, day) -> sorted [(anchor, start, end)] in seconds from midnight
+CalendarDays = dict[tuple[UUID, date], list[tuple[int, int, int]]]
+
+
+def horizon(today: Optional[date] = None, days: int = SLOT_CALENDAR_HORIZON_DAYS):
+    """First and last day of the rolling horizon."""
+    today = today or date.today()
+    return today, today + timedelta(days=days - 1)
+
+
+def _days(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=n) for n in range((end - start).days + 1)]
+
+
+async def _all_therapist_ids(db: AsyncSession) -> list[UUID]:
+    result = await db.execute(select(Therapist.id))
+    return list(result.scalars().all())
+
+
+async def compute_days(
+    db: AsyncSession, therapist_ids: Sequence[UUID], days: Sequence[date]
+) -> CalendarDays:
+    """Free intervals computed on the fly from availability, exceptions and
+    appointments."""
+    if not therapist_ids or not days:
+        return {}
+    first = min(days)
+    weekly_blocks, appointments = await load_schedule(
+        db, therapist_ids, first, max(days)
+    )
+    exceptions = await load_exceptions(db, therapist_ids, first, max(days))
+    computed: CalendarDays = {}
+    for therapist_id in therapist_ids:
+        busy = merge_intervals(appointments.get(therapist_id, []))
+        for day in days:
+            offset = (day - first).days * DAY_SECONDS
+            blocks = blocks_on_day(weekly_blocks, exceptions, therapist_id, day, offset)
+            computed[(therapist_id, day)] = [
+                (anchor - offset, start - offset, end - offset)
+                for anchor, start, end in free_intervals(blocks, busy)
+            ]
+    return computed
+
+
+async def build_days(
+    db: AsyncSession, therapist_ids: Sequence[UUID], days: Sequence[date]
+) -> int:
+    """Recompute and store the calendar for these therapists and days.
+
+    Runs in the caller's transaction and does not commit. Returns the number
+    of free intervals written.
+    """
+    computed = await compute_days(db, therapist_ids, days)
+    if not computed:
+        return 0
+
+    await db.execute(
+        delete(FreeInterval).where(
+            FreeInterval.therapist_id.in_(therapist_ids), FreeInterval.day.in_(days)
+        )
+    )
+    await db.execute(
+        delete(SlotCalendarDay).where(
+            SlotCalendarDay.therapist_id.in_(therapist_ids),
+            SlotCalendarDay.day.in_(days),
+        )
+    )
+    await db.execute(
+        insert(SlotCalendarDay),
+        [{"therapist_id": therapist_id, "day": day} for therapist_id, day in computed],
+    )
+    rows = [
+        {
+            "therapist_id": therapist_id,
+            "day": day,
+            "anchor_offset": anchor,
+            "start_offset": start,
+            "end_offset": end,
+        }
+        for (therapist_id, day), intervals in computed.items()
+        for anchor, start, end in intervals
+    ]
+    if rows:
+        await db.execute(insert(FreeInterval), rows)
+    return len(rows)
+
+
+def appointment_days(*spans: tuple[datetime, datetime]) -> set[date]:
+    """Days covered by appointment time spans."""
+    days: set[date] = set()
+    for start, end in spans:
+        start, end = naive_utc(start), naive_utc(end)
+        # An appointment ending at midnight does not touch the next day
+        end_day = max((end - timedelta(microseconds=1)).date(), start.date())
+        days.update(_days(start.date(), end_day))
+    return days
+
+
+async def refresh_for_appointment(
+    db: AsyncSession, therapist_id: UUID, *spans: tuple[datetime, datetime]
+) -> None:
+    """Rebuild the horizon days touched by appointment time spans.
+
+    Pass both the old and the new span when an appointment moves.
+    """
+    first, last = horizon()
+    touched = {day for day in appointment_days(*spans) if first <= day <= last}
+    if touched:
+        await build_days(db, [therapist_id], sorted(touched))
+
+
+async def refresh_for_exception(
+    db: AsyncSession, therapist_ids: Sequence[UUID], start: datetime, end: datetime
+) -> None:
+    """Rebuild the horizon days an availability exception touches."""
+    first, last = horizon()
+    # Clip first: an exception can span years
+    start = max(naive_utc(start), datetime.combine(first, time.min))
+    end = min(naive_utc(end), datetime.combine(last + timedelta(days=1), time.min))
+    if start < end:
+        await build_days(db, therapist_ids, sorted(appointment_days((start, end))))
+
+
+async def refresh_for_weekday(
+    db: AsyncSession, therapist_id: UUID, day_of_week: int
+) -> None:
+    """Rebuild every horizon day on `day_of_week` after an availability change."""
+    await refresh_for_weekdays(db, therapist_id, {day_of_week})
+
+
+async def refresh_for_weekdays(
+    db: AsyncSession, therapist_id: UUID, days_of_week: Collection[int]
+) -> None:
+    """Rebuild the horizon days on any of `days_of_week` in one pass."""
+    days = [day for day in _days(*horizon()) if day.weekday() in days_of_week]
+    if days:
+        await build_days(db, [therapist_id], days)
+
+
+async def rebuild_calendar(
+    db: AsyncSession,
+    therapist_ids: Optional[Sequence[UUID]] = None,
+    days: int = SLOT_CALENDAR_HORIZON_DAYS,
+    today: Optional[date] = None,
+) -> dict:
+    """Rebuild the whole horizon and drop days that fell out of it."""
+    first, last = horizon(today, days)
+    therapist_ids = therapist_ids or await _all_therapist_ids(db)
+
+    outside = or_(SlotCalendarDay.day < first, SlotCalendarDay.day > last)
+    await db.execute(delete(SlotCalendarDay).where(outside))
+    await db.execute(
+        delete(FreeInterval).where(
+            or_(FreeInterval.day < first, FreeInterval.day > last)
+        )
+    )
+    intervals = await build_days(db, therapist_ids, _days(first, last))
+    await db.commit()
+    return {
+        "therapists": len(therapist_ids),
+        "days": (last - first).days + 1,
+        "free_intervals": intervals,
+    }
+
+
+async def check_consistency(
+    db: AsyncSession,
+    therapist_ids: Optional[Sequence[UUID]] = None,
+    days: int = SLOT_CALENDAR_HORIZON_DAYS,
+    today: Optional[date] = None,
+    include_missing: bool = False,
+) -> list[dict]:
+    """Compare the stored calendar with the on-the-fly computation.
+
+    Returns one entry per materialized therapist day that differs. Days that
+    were never materialized are served by the on-the-fly path; they are only
+    reported when `include_missing` is set.
+    """
+    first, last = horizon(today, days)
+    therapist_ids = therapist_ids or await _all_therapist_ids(db)
+    if not therapist_ids:
+        return []
+    expected = await compute_days(db, therapist_ids, _days(first, last))
+
+    stored: CalendarDays = {}
+    markers = await db.execute(
+        select(SlotCalendarDay.therapist_id, SlotCalendarDay.day).where(
+            SlotCalendarDay.therapist_id.in_(therapist_ids),
+            SlotCalendarDay.day.between(first, last),
+        )
+    )
+    for therapist_id, day in markers.all():
+        stored[(therapist_id, day)] = []
+    rows = await db.execute(
+        select(
+            FreeInterval.therapist_id,
+            FreeInterval.day,
+            FreeInterval.anchor_offset,
+            FreeInterval.start_offset,
+            FreeInterval.end_offset,
+        ).where(
+            FreeInterval.therapist_id.in_(therapist_ids),
+            FreeInterval.day.between(first, last),
+        )
+    )
+    for therapist_id, day, anchor, start, end in rows.all():
+        stored.setdefault((therapist_id, day), []).append((anchor, start, end))
+
+    problems = []
+    for key, intervals in expected.items():
+        therapist_id, day = key
+        if key not in stored:
+            if include_missing:
+                problems.append(
+                    {"therapist_id": therapist_id, "day": day, "issue": "missing"}
+                )
+        elif sorted(stored[key]) != sorted(intervals):
+            problems.append(
+                {
+                    "therapist_id": therapist_id,
+                    "day": day,
+                    "issue": "mismatch",
+                    "expected": sorted(intervals),
+                    "stored": sorted(stored[key]),
+                }
+            )
+    return problems
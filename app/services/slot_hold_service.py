@@ -0,0 +1,120 @@
+from datetime import timedelta
+from typing import Optional
+from uuid import UUID
+
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.booking_lock import therapist_booking_lock
+from app.core.slot_holds import Hold, slot_holds
+from app.models.appointment import Appointment
+from app.models.treatment import Treatment
+from app.schemas.appointment import AppointmentCreate, SlotHoldCreate
+from app.services.appointment_service import (
+    create_appointment,
+    has_conflict,
+    held_seats,
+    is_within_availability,
+)
+from app.services.free_slot_service import naive_utc
+
+HOLD_NOT_FOUND_ERROR = "Hold not found or expired."
+
+
+async def hold_slot(db: AsyncSession, patient_id: UUID, data: SlotHoldCreate) -> Hold:
+    """Keep a slot for the patient while they confirm it.
+
+    The slot must be bookable: inside the therapist's availability, free of
+    appointments and not held by another patient; in a group session each
+    other patient's hold takes one seat instead. The check and the hold
+    run under the therapist's booking lock so two patients cannot hold the
+    same slot. Replaces the patient's previous hold.
+    """
+    treatment = await db.get(Treatment, data.treatment_id)
+    if not treatment:
+        raise HTTPException(status_code=404, detail="Treatment not found.")
+
+    start = naive_utc(data.start_time)
+    end = start + timedelta(minutes=treatment.duration_minutes)
+
+    if not await is_within_availability(db, data.therapist_id, start, end):
+        raise HTTPException(
+            status_code=400, detail="Therapist not available at this time."
+        )
+
+    async with therapist_booking_lock(db, data.therapist_id):
+        if await has_conflict(
+            db,
+            data.therapist_id,
+            start,
+            end,
+            treatment_id=treatment.id,
+            capacity=treatment.capacity,
+        ):
+            raise HTTPException(
+                status_code=400, detail="Appointment conflicts with existing booking."
+            )
+        seats_held = held_seats(
+            await slot_holds.active(
+                db, [data.therapist_id], start, end, exclude_patient_id=patient_id
+            ),
+            treatment,
+            start,
+            end,
+        )
+        if seats_held is None or (
+            seats_held
+            and await has_conflict(
+                db,
+                data.therapist_id,
+                start,
+                end,
+                treatment_id=treatment.id,
+                capacity=treatment.capacity - seats_held,
+            )
+        ):
+            raise HTTPException(
+                status_code=409, detail="Slot is held by another patient."
+            )
+        hold = await slot_holds.place(
+            db, patient_id, data.therapist_id, data.treatment_id, start, end
+        )
+        await db.commit()
+    return hold
+
+
+async def _own_hold(db: AsyncSession, patient_id: UUID, hold_id: UUID) -> Hold:
+    hold = await slot_holds.get(db, hold_id)
+    # Other patients' holds are reported as missing rather than forbidden
+    if hold is None or hold.patient_id != patient_id:
+        raise HTTPException(status_code=404, detail=HOLD_NOT_FOUND_ERROR)
+    return hold
+
+
+async def confirm_hold(
+    db: AsyncSession,
+    patient_id: UUID,
+    hold_id: UUID,
+    background_tasks: BackgroundTasks,
+    notes: Optional[str] = None,
+) -> Appointment:
+    """Book the held slot; the booking releases the hold."""
+    hold = await _own_hold(db, patient_id, hold_id)
+    return await create_appointment(
+        db,
+        patient_id,
+        AppointmentCreate(
+            therapist_id=hold.therapist_id,
+            treatment_id=hold.treatment_id,
+            start_time=hold.start_time,
+            notes=notes,
+        ),
+        background_tasks,
+    )
+
+
+async def release_hold(db: AsyncSession, patient_id: UUID, hold_id: UUID) -> dict:
+    await _own_hold(db, patient_id, hold_id)
+    await slot_holds.release(db, hold_id)
+    await db.commit()
+    return {"detail": "Hold released"}
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.therapist import Therapist
 from app.schemas.therapist import TherapistCreate
+from app.services.principal_service import invalidate_principal
 
 
 async def create_therapist(db: AsyncSession, data: TherapistCreate):
@@ -13,6 +14,7 @@ async def create_therapist(db: AsyncSession, data: TherapistCreate):
     db.add(therapist)
     await db.commit()
     await db.refresh(therapist)
+    invalidate_principal(therapist.supabase_user_id)
     return therapist
 
 
@@ -30,8 +32,11 @@ async def list_therapists(db: AsyncSession):
 async def update_therapist(
     db: AsyncSession, therapist: Therapist, data: TherapistCreate
 ):
+    previous_user_id = therapist.supabase_user_id
     for k, v in data.model_dump(exclude_unset=True).items():
         setattr(therapist, k, v)
     await db.commit()
     await db.refresh(therapist)
+    invalidate_principal(previous_user_id)
+    invalidate_principal(therapist.supabase_user_id)
     return therapist
@@ -14,6 +14,7 @@ async def create_treatment(db: AsyncSession, data: TreatmentCreate) -> Treatment
         description=data.description,
         duration_minutes=data.duration_minutes,
         price=data.price,
+        capacity=data.capacity,
     )
 
     db.add(treatment)
@@ -1,19 +1,21 @@
 import asyncio
 from uuid import UUID
 
-from app.core.supabase_client import supabase
+from app.core.supabase_client import supabase, supabase_auth_breaker
 
 
 async def update_role(user_id: UUID, new_role: str):
     """Update the role for a supabase user using the admin API.
 
     Runs sync supabase client calls in a separate thread so callers can
-    await this function without blocking the event loop.
+    await this function without blocking the event loop. Raises
+    `CircuitOpenError` without calling Supabase while its breaker is open.
     """
 
     def _sync_update():
-        return supabase.auth.admin.update_user_by_id(
-            str(user_id), {"data": {"role": new_role}}
-        )
+        with supabase_auth_breaker.guard():
+            return supabase.auth.admin.update_user_by_id(
+                str(user_id), {"data": {"role": new_role}}
+            )
 
     return await asyncio.to_thread(_sync_update)
@@ -10,9 +10,12 @@ from sqlalchemy.ext.asyncio import create_async_engine
 from app.core.config import settings
 from app.models import (  # noqa: F401
     appointment,
+    availability_exception,
     device,
     invoice,
     patient,
+    slot_calendar,
+    slot_hold,
     therapist,
     therapist_availability,
     treatment,
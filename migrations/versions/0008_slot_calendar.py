@@ -0,0 +1,49 @@
+"""slot calendar
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 10:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        "slot_calendar_days",
+        sa.Column("therapist_id", sa.UUID(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("built_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["therapist_id"], ["therapists.id"]),
+        sa.PrimaryKeyConstraint("therapist_id", "day"),
+    )
+    op.create_table(
+        "free_intervals",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("therapist_id", sa.UUID(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("anchor_offset", sa.Integer(), nullable=False),
+        sa.Column("start_offset", sa.Integer(), nullable=False),
+        sa.Column("end_offset", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["therapist_id"], ["therapists.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_free_intervals_therapist_day",
+        "free_intervals",
+        ["therapist_id", "day", "start_offset"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_free_intervals_therapist_day", table_name="free_intervals")
+    op.drop_table("free_intervals")
+    op.drop_table("slot_calendar_days")
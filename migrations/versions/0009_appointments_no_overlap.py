@@ -0,0 +1,78 @@
+"""appointments no overlap
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 12:00:00.000000
+
+Rejects overlapping scheduled appointments for the same therapist in the
+database. Existing overlapping rows must be cancelled or flagged with
+`overlap_allowed` before upgrading, or the constraint cannot be created.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0009"
+down_revision: Union[str, Sequence[str], None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONSTRAINT = "appointments_no_overlap"
+
+SQLITE_OVERLAP_CHECK = f"""
+    WHEN NEW.status = 'scheduled' AND NOT NEW.overlap_allowed
+    BEGIN
+        SELECT RAISE(ABORT, '{CONSTRAINT}')
+        WHERE EXISTS (
+            SELECT 1 FROM appointments AS other
+            WHERE other.therapist_id = NEW.therapist_id
+              AND other.id != NEW.id
+              AND other.status = 'scheduled'
+              AND NOT other.overlap_allowed
+              AND other.start_time < NEW.end_time
+              AND other.end_time > NEW.start_time
+        );
+    END
+"""
+
+
+def upgrade():
+    op.add_column(
+        "appointments",
+        sa.Column(
+            "overlap_allowed",
+            sa.Boolean(),
+            nullable=False,
+            server_default=sa.false(),
+        ),
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        op.execute(
+            f"ALTER TABLE appointments ADD CONSTRAINT {CONSTRAINT} "
+            "EXCLUDE USING gist ("
+            "therapist_id WITH =, tsrange(start_time, end_time, '[)') WITH &&"
+            ") WHERE (status = 'scheduled' AND NOT overlap_allowed)"
+        )
+    else:
+        op.execute(
+            f"CREATE TRIGGER {CONSTRAINT}_insert BEFORE INSERT ON appointments "
+            f"FOR EACH ROW {SQLITE_OVERLAP_CHECK}"
+        )
+        op.execute(
+            f"CREATE TRIGGER {CONSTRAINT}_update BEFORE UPDATE OF therapist_id, "
+            "start_time, end_time, status, overlap_allowed ON appointments "
+            f"FOR EACH ROW {SQLITE_OVERLAP_CHECK}"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"ALTER TABLE appointments DROP CONSTRAINT {CONSTRAINT}")
+    else:
+        op.execute(f"DROP TRIGGER IF EXISTS {CONSTRAINT}_insert")
+        op.execute(f"DROP TRIGGER IF EXISTS {CONSTRAINT}_update")
+    op.drop_column("appointments", "overlap_allowed")
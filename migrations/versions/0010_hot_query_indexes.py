@@ -0,0 +1,58 @@
+"""hot query indexes
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 14:00:00.000000
+
+Secondary indexes for the queries in appointment_service, free_slot_service
+and invoice_service, which otherwise scan whole tables.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0010"
+down_revision: Union[str, Sequence[str], None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEDULED = sa.text("status = 'scheduled'")
+
+
+def upgrade():
+    op.create_index(
+        "ix_appointments_therapist_start",
+        "appointments",
+        ["therapist_id", "start_time"],
+    )
+    op.create_index(
+        "ix_appointments_patient_start",
+        "appointments",
+        ["patient_id", "start_time"],
+    )
+    op.create_index(
+        "ix_appointments_scheduled_therapist_span",
+        "appointments",
+        ["therapist_id", "start_time", "end_time"],
+        postgresql_where=SCHEDULED,
+        sqlite_where=SCHEDULED,
+    )
+    op.create_index("ix_invoices_appointment_id", "invoices", ["appointment_id"])
+    op.create_index(
+        "ix_therapist_availability_therapist_weekday",
+        "therapist_availability",
+        ["therapist_id", "weekday", "start_time"],
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_therapist_availability_therapist_weekday",
+        table_name="therapist_availability",
+    )
+    op.drop_index("ix_invoices_appointment_id", table_name="invoices")
+    op.drop_index("ix_appointments_scheduled_therapist_span", table_name="appointments")
+    op.drop_index("ix_appointments_patient_start", table_name="appointments")
+    op.drop_index("ix_appointments_therapist_start", table_name="appointments")
@@ -0,0 +1,133 @@
+"""availability integer schema
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 16:00:00.000000
+
+Replaces the weekday name and start/end times of therapist_availability
+with an integer day of week (0 = Monday, as Python's date.weekday()) and
+start/end minutes from midnight, backfilled from the existing rows.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0011"
+down_revision: Union[str, Sequence[str], None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+WEEKDAYS = (
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+)
+
+
+def _minute_of_day(column: str, dialect: str) -> str:
+    if dialect == "postgresql":
+        return (
+            f"(EXTRACT(HOUR FROM {column}) * 60 + EXTRACT(MINUTE FROM {column}))::int"
+        )
+    # SQLite stores times as 'HH:MM:SS[.ffffff]' text
+    return (
+        f"(CAST(substr({column}, 1, 2) AS INTEGER) * 60"
+        f" + CAST(substr({column}, 4, 2) AS INTEGER))"
+    )
+
+
+def _minute_to_time(column: str, dialect: str) -> str:
+    if dialect == "postgresql":
+        return f"(time '00:00' + make_interval(mins => {column}))"
+    return f"printf('%02d:%02d:00.000000', {column} / 60, {column} % 60)"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    with op.batch_alter_table("therapist_availability") as batch:
+        batch.add_column(sa.Column("day_of_week", sa.SmallInteger(), nullable=True))
+        batch.add_column(sa.Column("start_minute", sa.SmallInteger(), nullable=True))
+        batch.add_column(sa.Column("end_minute", sa.SmallInteger(), nullable=True))
+
+    cases = " ".join(
+        f"WHEN '{name}' THEN {number}" for number, name in enumerate(WEEKDAYS)
+    )
+    op.execute(
+        "UPDATE therapist_availability SET "
+        f"day_of_week = CASE lower(trim(weekday)) {cases} END, "
+        f"start_minute = {_minute_of_day('start_time', dialect)}, "
+        f"end_minute = {_minute_of_day('end_time', dialect)}"
+    )
+    unknown = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT DISTINCT weekday FROM therapist_availability "
+                "WHERE day_of_week IS NULL"
+            )
+        )
+        .scalars()
+        .all()
+    )
+    if unknown:
+        raise RuntimeError(
+            f"therapist_availability has unknown weekday values {unknown}; "
+            "fix or delete those rows before upgrading"
+        )
+
+    op.drop_index(
+        "ix_therapist_availability_therapist_weekday",
+        table_name="therapist_availability",
+    )
+    with op.batch_alter_table("therapist_availability") as batch:
+        batch.alter_column("day_of_week", nullable=False)
+        batch.alter_column("start_minute", nullable=False)
+        batch.alter_column("end_minute", nullable=False)
+        batch.drop_column("weekday")
+        batch.drop_column("start_time")
+        batch.drop_column("end_time")
+    op.create_index(
+        "ix_therapist_availability_lookup",
+        "therapist_availability",
+        ["therapist_id", "day_of_week", "start_minute", "end_minute"],
+    )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    op.drop_index(
+        "ix_therapist_availability_lookup", table_name="therapist_availability"
+    )
+    with op.batch_alter_table("therapist_availability") as batch:
+        batch.add_column(sa.Column("weekday", sa.String(), nullable=True))
+        batch.add_column(sa.Column("start_time", sa.Time(), nullable=True))
+        batch.add_column(sa.Column("end_time", sa.Time(), nullable=True))
+
+    cases = " ".join(
+        f"WHEN {number} THEN '{name}'" for number, name in enumerate(WEEKDAYS)
+    )
+    op.execute(
+        "UPDATE therapist_availability SET "
+        f"weekday = CASE day_of_week {cases} END, "
+        f"start_time = {_minute_to_time('start_minute', dialect)}, "
+        f"end_time = {_minute_to_time('end_minute', dialect)}"
+    )
+
+    with op.batch_alter_table("therapist_availability") as batch:
+        batch.alter_column("weekday", nullable=False)
+        batch.alter_column("start_time", nullable=False)
+        batch.alter_column("end_time", nullable=False)
+        batch.drop_column("day_of_week")
+        batch.drop_column("start_minute")
+        batch.drop_column("end_minute")
+    op.create_index(
+        "ix_therapist_availability_therapist_weekday",
+        "therapist_availability",
+        ["therapist_id", "weekday", "start_time"],
+    )
@@ -0,0 +1,47 @@
+"""slot holds
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 19:00:00.000000
+
+Table for the database slot-hold backend (SLOT_HOLD_BACKEND=database).
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0012"
+down_revision: Union[str, Sequence[str], None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        "slot_holds",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("therapist_id", sa.UUID(), nullable=False),
+        sa.Column("patient_id", sa.UUID(), nullable=False),
+        sa.Column("treatment_id", sa.UUID(), nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["therapist_id"], ["therapists.id"]),
+        sa.ForeignKeyConstraint(["patient_id"], ["patients.id"]),
+        sa.ForeignKeyConstraint(["treatment_id"], ["treatments.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_slot_holds_therapist_start", "slot_holds", ["therapist_id", "start_time"]
+    )
+    op.create_index("ix_slot_holds_patient", "slot_holds", ["patient_id"])
+    op.create_index("ix_slot_holds_expires_at", "slot_holds", ["expires_at"])
+
+
+def downgrade():
+    op.drop_index("ix_slot_holds_expires_at", table_name="slot_holds")
+    op.drop_index("ix_slot_holds_patient", table_name="slot_holds")
+    op.drop_index("ix_slot_holds_therapist_start", table_name="slot_holds")
+    op.drop_table("slot_holds")
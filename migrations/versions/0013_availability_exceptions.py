@@ -0,0 +1,45 @@
+"""availability exceptions
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17 21:00:00.000000
+
+Date-ranged time off and clinic-wide holidays, subtracted from the weekly
+availability template instead of deleting and re-creating its rows.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0013"
+down_revision: Union[str, Sequence[str], None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        "availability_exceptions",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("therapist_id", sa.UUID(), nullable=True),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=False),
+        sa.Column("reason", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["therapist_id"], ["therapists.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_availability_exceptions_therapist_end",
+        "availability_exceptions",
+        ["therapist_id", "end_time", "start_time"],
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_availability_exceptions_therapist_end",
+        table_name="availability_exceptions",
+    )
+    op.drop_table("availability_exceptions")
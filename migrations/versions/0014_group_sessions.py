@@ -0,0 +1,88 @@
+"""group sessions
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18 09:00:00.000000
+
+Treatments get a capacity, and the seats of one group session share a
+`session_key` so the no-overlap constraint lets them overlap each other.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0014"
+down_revision: Union[str, Sequence[str], None] = "0013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONSTRAINT = "appointments_no_overlap"
+
+SQLITE_OVERLAP_CHECK = """
+    WHEN NEW.status = 'scheduled' AND NOT NEW.overlap_allowed
+    BEGIN
+        SELECT RAISE(ABORT, '{constraint}')
+        WHERE EXISTS (
+            SELECT 1 FROM appointments AS other
+            WHERE other.therapist_id = NEW.therapist_id
+              AND other.id != NEW.id
+              AND other.status = 'scheduled'
+              AND NOT other.overlap_allowed
+              AND other.start_time < NEW.end_time
+              AND other.end_time > NEW.start_time
+              {sessions}
+        );
+    END
+"""
+SQLITE_SESSIONS = (
+    "AND COALESCE(other.session_key, other.id) != COALESCE(NEW.session_key, NEW.id)"
+)
+
+
+def _replace_constraint(sessions: bool) -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        session_column = ", COALESCE(session_key, id) WITH <>" if sessions else ""
+        op.execute(f"ALTER TABLE appointments DROP CONSTRAINT {CONSTRAINT}")
+        op.execute(
+            f"ALTER TABLE appointments ADD CONSTRAINT {CONSTRAINT} "
+            "EXCLUDE USING gist ("
+            "therapist_id WITH =, tsrange(start_time, end_time, '[)') WITH &&"
+            f"{session_column}"
+            ") WHERE (status = 'scheduled' AND NOT overlap_allowed)"
+        )
+        return
+
+    check = SQLITE_OVERLAP_CHECK.format(
+        constraint=CONSTRAINT, sessions=SQLITE_SESSIONS if sessions else ""
+    )
+    updated_columns = "start_time, end_time, status, overlap_allowed"
+    if sessions:
+        updated_columns += ", session_key"
+    op.execute(f"DROP TRIGGER IF EXISTS {CONSTRAINT}_insert")
+    op.execute(f"DROP TRIGGER IF EXISTS {CONSTRAINT}_update")
+    op.execute(
+        f"CREATE TRIGGER {CONSTRAINT}_insert BEFORE INSERT ON appointments "
+        f"FOR EACH ROW {check}"
+    )
+    op.execute(
+        f"CREATE TRIGGER {CONSTRAINT}_update BEFORE UPDATE OF therapist_id, "
+        f"{updated_columns} ON appointments FOR EACH ROW {check}"
+    )
+
+
+def upgrade():
+    op.add_column(
+        "treatments",
+        sa.Column("capacity", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.add_column("appointments", sa.Column("session_key", sa.UUID(), nullable=True))
+    _replace_constraint(sessions=True)
+
+
+def downgrade():
+    # Overlapping seats must be cancelled first, or the old constraint fails
+    _replace_constraint(sessions=False)
+    op.drop_column("appointments", "session_key")
+    op.drop_column("treatments", "capacity")
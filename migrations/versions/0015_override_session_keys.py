@@ -0,0 +1,156 @@
+"""override session keys
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19 09:00:00.000000
+
+Admin-approved double bookings were flagged with `overlap_allowed` and left
+out of the no-overlap constraint, so new bookings could land on them. They
+now share a `session_key` with the appointments they overlap, and the
+constraint covers every scheduled row again. An overridden appointment that
+overlaps two different group sessions cannot be converted; cancel or move it
+before upgrading.
+"""
+
+import uuid
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0015"
+down_revision: Union[str, Sequence[str], None] = "0014"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONSTRAINT = "appointments_no_overlap"
+
+SQLITE_OVERLAP_CHECK = """
+    WHEN NEW.status = 'scheduled' {flagged}
+    BEGIN
+        SELECT RAISE(ABORT, '{constraint}')
+        WHERE EXISTS (
+            SELECT 1 FROM appointments AS other
+            WHERE other.therapist_id = NEW.therapist_id
+              AND other.id != NEW.id
+              AND other.status = 'scheduled'
+              {other_flagged}
+              AND other.start_time < NEW.end_time
+              AND other.end_time > NEW.start_time
+              AND COALESCE(other.session_key, other.id)
+                  != COALESCE(NEW.session_key, NEW.id)
+        );
+    END
+"""
+
+appointments = sa.table(
+    "appointments",
+    sa.column("id", sa.Uuid()),
+    sa.column("therapist_id", sa.Uuid()),
+    sa.column("start_time", sa.DateTime()),
+    sa.column("end_time", sa.DateTime()),
+    sa.column("status", sa.String()),
+    sa.column("overlap_allowed", sa.Boolean()),
+    sa.column("session_key", sa.Uuid()),
+)
+
+
+def _drop_constraint() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"ALTER TABLE appointments DROP CONSTRAINT {CONSTRAINT}")
+    else:
+        op.execute(f"DROP TRIGGER IF EXISTS {CONSTRAINT}_insert")
+        op.execute(f"DROP TRIGGER IF EXISTS {CONSTRAINT}_update")
+
+
+def _create_constraint(flagged: bool) -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        predicate = " AND NOT overlap_allowed" if flagged else ""
+        op.execute(
+            f"ALTER TABLE appointments ADD CONSTRAINT {CONSTRAINT} "
+            "EXCLUDE USING gist ("
+            "therapist_id WITH =, tsrange(start_time, end_time, '[)') WITH &&, "
+            "COALESCE(session_key, id) WITH <>"
+            f") WHERE (status = 'scheduled'{predicate})"
+        )
+        return
+
+    check = SQLITE_OVERLAP_CHECK.format(
+        constraint=CONSTRAINT,
+        flagged="AND NOT NEW.overlap_allowed" if flagged else "",
+        other_flagged="AND NOT other.overlap_allowed" if flagged else "",
+    )
+    updated_columns = "start_time, end_time, status, session_key"
+    if flagged:
+        updated_columns += ", overlap_allowed"
+    op.execute(
+        f"CREATE TRIGGER {CONSTRAINT}_insert BEFORE INSERT ON appointments "
+        f"FOR EACH ROW {check}"
+    )
+    op.execute(
+        f"CREATE TRIGGER {CONSTRAINT}_update BEFORE UPDATE OF therapist_id, "
+        f"{updated_columns} ON appointments FOR EACH ROW {check}"
+    )
+
+
+def _share_overridden_sessions() -> None:
+    """Give each flagged appointment and what it overlaps one session key."""
+    bind = op.get_bind()
+    scheduled = appointments.c.status == "scheduled"
+    flagged_ids = bind.execute(
+        sa.select(appointments.c.id).where(
+            scheduled, appointments.c.overlap_allowed.is_(True)
+        )
+    ).scalars()
+    for flagged_id in list(flagged_ids):
+        row = bind.execute(
+            sa.select(appointments).where(appointments.c.id == flagged_id)
+        ).one()
+        overlapping = bind.execute(
+            sa.select(appointments.c.id, appointments.c.session_key).where(
+                appointments.c.therapist_id == row.therapist_id,
+                appointments.c.id != row.id,
+                appointments.c.start_time < row.end_time,
+                appointments.c.end_time > row.start_time,
+                scheduled,
+            )
+        ).all()
+        if not overlapping:
+            continue
+        keys = {key for _, key in overlapping if key is not None}
+        if row.session_key is not None:
+            keys.add(row.session_key)
+        if len(keys) > 1:
+            raise RuntimeError(
+                f"Appointment {row.id} overlaps more than one session; "
+                "cancel or move it before upgrading."
+            )
+        shared = keys.pop() if keys else uuid.uuid4()
+        unkeyed = [row_id for row_id, key in overlapping if key is None]
+        bind.execute(
+            sa.update(appointments)
+            .where(appointments.c.id.in_([row.id, *unkeyed]))
+            .values(session_key=shared)
+        )
+
+
+def upgrade():
+    _share_overridden_sessions()
+    _drop_constraint()
+    op.drop_column("appointments", "overlap_allowed")
+    _create_constraint(flagged=False)
+
+
+def downgrade():
+    # Shared session keys are kept; they still let the same rows overlap
+    _drop_constraint()
+    op.add_column(
+        "appointments",
+        sa.Column(
+            "overlap_allowed",
+            sa.Boolean(),
+            nullable=False,
+            server_default=sa.false(),
+        ),
+    )
+    _create_constraint(flagged=True)
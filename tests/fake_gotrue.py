@@ -0,0 +1,136 @@
+"""Servidor GoTrue (Supabase Auth) falso para tests y benchmarks.
+
+Implementa solo los endpoints que usa `app.routers.auth` y firma los tokens
+con HS256 y `SUPABASE_SECRET_KEY`, igual que un proyecto Supabase clásico.
+
+Uso en tests, sin sockets:
+
+    transport = httpx.ASGITransport(app=fake_gotrue.app)
+    client, _ = create_auth_client(transport=transport)
+
+Uso como servidor para benchmarks:
+
+    FAKE_GOTRUE_LATENCY_MS=40 uvicorn tests.fake_gotrue:app --port 9999
+    SUPABASE_URL=http://127.0.0.1:9999 uvicorn app.main:app
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from jose import jwt
+
+SECRET = os.environ.get("SUPABASE_SECRET_KEY", "secretkey")
+TOKEN_TTL = 3600
+# Simulated network round trip, to make event-loop blocking visible
+LATENCY = int(os.environ.get("FAKE_GOTRUE_LATENCY_MS", "0")) / 1000
+
+app = FastAPI(title="Fake GoTrue")
+
+# email -> {"password": str, "user": dict}
+USERS: dict[str, dict] = {}
+# "METHOD /path" -> number of calls, so tests can assert round trips
+CALLS: Counter = Counter()
+
+
+def reset() -> None:
+    USERS.clear()
+    CALLS.clear()
+
+
+def _error(status: int, code: str, msg: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status, content={"code": status, "error_code": code, "msg": msg}
+    )
+
+
+def _session(user: dict) -> dict:
+    now = int(time.time())
+    claims = {
+        "sub": user["id"],
+        "email": user["email"],
+        "aud": "authenticated",
+        "role": "authenticated",
+        "iat": now,
+        "exp": now + TOKEN_TTL,
+        "user_metadata": user["user_metadata"],
+        "app_metadata": user["app_metadata"],
+    }
+    return {
+        "access_token": jwt.encode(claims, SECRET, algorithm="HS256"),
+        "refresh_token": uuid.uuid4().hex,
+        "expires_in": TOKEN_TTL,
+        "expires_at": now + TOKEN_TTL,
+        "token_type": "bearer",
+        "user": user,
+    }
+
+
+@app.middleware("http")
+async def _count_and_delay(request: Request, call_next):
+    CALLS[f"{request.method} {request.url.path}"] += 1
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    return await call_next(request)
+
+
+@app.post("/auth/v1/signup")
+async def signup(request: Request):
+    body = await request.json()
+    email = body["email"]
+    if email in USERS:
+        return _error(422, "user_already_exists", "User already registered")
+
+    user = {
+        "id": str(uuid.uuid4()),
+        "aud": "authenticated",
+        "email": email,
+        "app_metadata": {"provider": "email"},
+        "user_metadata": body.get("data") or {},
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    USERS[email] = {"password": body["password"], "user": user}
+    return _session(user)
+
+
+@app.post("/auth/v1/token")
+async def token(request: Request, grant_type: str):
+    body = await request.json()
+    entry = USERS.get(body.get("email"))
+    if (
+        grant_type != "password"
+        or not entry
+        or entry["password"] != body.get("password")
+    ):
+        return _error(400, "invalid_credentials", "Invalid login credentials")
+    return _session(entry["user"])
+
+
+@app.get("/auth/v1/user")
+async def get_user(request: Request):
+    token = request.headers.get("authorization", "").removeprefix("Bearer ")
+    try:
+        claims = jwt.decode(
+            token, SECRET, algorithms=["HS256"], audience="authenticated"
+        )
+    except Exception:
+        return _error(401, "bad_jwt", "invalid JWT")
+    entry = USERS.get(claims.get("email"))
+    if not entry:
+        return _error(404, "user_not_found", "User not found")
+    return entry["user"]
+
+
+@app.post("/auth/v1/logout")
+async def logout(request: Request):
+    token = request.headers.get("authorization", "").removeprefix("Bearer ")
+    try:
+        jwt.decode(token, SECRET, algorithms=["HS256"], audience="authenticated")
+    except Exception:
+        return _error(401, "bad_jwt", "invalid JWT")
+    return Response(status_code=204)
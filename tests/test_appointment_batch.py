@@ -0,0 +1,152 @@
+"""Tests de la creación de citas en lote para recepción."""
+
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.models.appointment import Appointment
+from app.schemas.appointment import AppointmentBatchItem
+from app.schemas.availability import AvailabilityCreate
+from app.schemas.patient import PatientCreate
+from app.schemas.therapist import TherapistCreate
+from app.schemas.treatment import TreatmentCreate
+from app.services.appointment_batch_service import create_appointment_batch
+from app.services.availability_service import create_availability
+from app.services.patient_service import create_patient
+from app.services.slot_calendar_service import check_consistency
+from app.services.therapist_service import create_therapist
+from app.services.treatment_service import create_treatment
+
+THERAPISTS = 4
+DAYS = 5
+
+
+async def _clinic(db_session):
+    """Terapeutas con disponibilidad de 8 a 20 todos los días de la semana."""
+    treatment = await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"Ba-{uuid4().hex}", description="x", duration_minutes=30, price=1
+        ),
+    )
+    therapists = []
+    for n in range(THERAPISTS):
+        therapist = await create_therapist(
+            db_session,
+            TherapistCreate(name=f"Batch{n}", email=f"ba+{uuid4().hex}@example.com"),
+        )
+        for weekday in range(7):
+            await create_availability(
+                db_session,
+                therapist.id,
+                AvailabilityCreate(
+                    weekday=date(2024, 1, 1 + weekday).strftime("%A"),
+                    start_time=time(8),
+                    end_time=time(20),
+                ),
+            )
+        therapists.append(therapist.id)
+    patients = [
+        (
+            await create_patient(
+                db_session,
+                PatientCreate(
+                    first_name="B",
+                    last_name=str(n),
+                    email=f"bap+{uuid4().hex}@example.com",
+                    supabase_user_id=uuid4().hex,
+                ),
+            )
+        ).id
+        for n in range(10)
+    ]
+    return treatment.id, therapists, patients
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_each_item_with_constant_queries(db_session):
+    """Cientos de citas se validan e insertan con un número fijo de consultas."""
+    treatment_id, therapists, patients = await _clinic(db_session)
+    first = date.today() + timedelta(days=21)
+
+    items = [
+        AppointmentBatchItem(
+            patient_id=patients[n % len(patients)],
+            therapist_id=therapists[n % THERAPISTS],
+            treatment_id=treatment_id,
+            start_time=datetime.combine(
+                first + timedelta(days=(n // THERAPISTS) % DAYS), time(8)
+            )
+            + timedelta(minutes=30 * (n // (THERAPISTS * DAYS))),
+        )
+        for n in range(THERAPISTS * DAYS * 20)
+    ]
+    # Intra-batch overlap, unknown treatment, outside availability
+    clash = items[0].model_copy(
+        update={"start_time": items[0].start_time + timedelta(minutes=15)}
+    )
+    unknown = items[1].model_copy(update={"treatment_id": uuid4()})
+    late = items[2].model_copy(
+        update={"start_time": datetime.combine(first, time(19, 45))}
+    )
+    items += [clash, unknown, late]
+
+    statements = []
+    sync_engine = db_session.bind.sync_engine
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", _record)
+    try:
+        results = await create_appointment_batch(db_session, items)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _record)
+
+    statuses = [result["status"] for result in results]
+    assert statuses[:-3] == ["created"] * (len(items) - 3)
+    assert statuses[-3:] == ["batch_conflict", "treatment_not_found", "unavailable"]
+    assert [result["index"] for result in results] == list(range(len(items)))
+
+    inserts = [s for s in statements if s.startswith("INSERT INTO appointments")]
+    assert len(inserts) == 1
+    # Lookups and validation do not grow with the number of items
+    before_insert = statements[: statements.index(inserts[0])]
+    assert len(before_insert) <= 6
+
+    stored = await db_session.execute(
+        select(func.count())
+        .select_from(Appointment)
+        .where(Appointment.therapist_id.in_(therapists))
+    )
+    assert stored.scalar_one() == len(items) - 3
+    assert await check_consistency(db_session, therapists) == []
+
+    # Submitting the same batch again only reports conflicts
+    again = await create_appointment_batch(db_session, items[:10])
+    assert {result["status"] for result in again} == {"conflict"}
+
+
+def test_batch_endpoint_admin_only(client):
+    """El endpoint de lote acepta admins y devuelve resultados por elemento."""
+    payload = {
+        "items": [
+            {
+                "patient_id": str(uuid4()),
+                "therapist_id": str(uuid4()),
+                "treatment_id": str(uuid4()),
+                "start_time": datetime(2030, 1, 7, 10).isoformat(),
+            }
+        ]
+    }
+    resp = client.post("/appointments/batch", json=payload)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["created"] == 0
+    assert body["results"] == [
+        {"index": 0, "status": "treatment_not_found", "appointment_id": None}
+    ]
+
+    assert client.post("/appointments/batch", json={"items": []}).status_code == 422
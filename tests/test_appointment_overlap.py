@@ -0,0 +1,233 @@
+"""Tests de la restricción de no solapamiento de citas en base de datos."""
+
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from app.models.appointment import Appointment, AppointmentStatus
+from app.schemas.appointment import AppointmentCreate, AppointmentUpdate
+from app.schemas.availability import AvailabilityCreate
+from app.schemas.patient import PatientCreate
+from app.schemas.therapist import TherapistCreate
+from app.schemas.treatment import TreatmentCreate
+from app.services import appointment_service
+from app.services.appointment_service import (
+    create_appointment,
+    is_overlap_violation,
+    update_appointment,
+)
+from app.services.availability_service import create_availability
+from app.services.patient_service import create_patient
+from app.services.therapist_service import create_therapist
+from app.services.treatment_service import create_treatment
+
+
+async def _setup(db_session, day):
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="Overlap", email=f"ov+{uuid4().hex}@example.com"),
+    )
+    treatment = await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"Ov-{uuid4().hex}", description="x", duration_minutes=30, price=1
+        ),
+    )
+    patient = await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="O",
+            last_name="V",
+            email=f"ovp+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(
+            weekday=day.strftime("%A").lower(), start_time=time(9), end_time=time(17)
+        ),
+    )
+    return therapist, treatment, patient
+
+
+def _appointment(ids, day, start, end, **kwargs):
+    therapist_id, treatment_id, patient_id = ids
+    return Appointment(
+        patient_id=patient_id,
+        therapist_id=therapist_id,
+        treatment_id=treatment_id,
+        start_time=datetime.combine(day, start),
+        end_time=datetime.combine(day, end),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_database_rejects_overlapping_rows(db_session):
+    """Un insert directo solapado falla aunque no pase por el servicio."""
+    day = date.today() + timedelta(days=5)
+    therapist, treatment, patient = await _setup(db_session, day)
+    ids = (therapist.id, treatment.id, patient.id)
+    db_session.add(_appointment(ids, day, time(10), time(11)))
+    await db_session.commit()
+
+    db_session.add(_appointment(ids, day, time(10, 30), time(11, 30)))
+    with pytest.raises(IntegrityError) as exc_info:
+        await db_session.commit()
+    assert is_overlap_violation(exc_info.value)
+    await db_session.rollback()
+
+    # Back-to-back, cancelled and rows sharing a session key do not conflict
+    shared = uuid4()
+    db_session.add_all(
+        [
+            _appointment(ids, day, time(11), time(12)),
+            _appointment(
+                ids,
+                day,
+                time(10),
+                time(11),
+                status=AppointmentStatus.cancelled,
+            ),
+            _appointment(ids, day, time(14), time(15), session_key=shared),
+            _appointment(ids, day, time(14, 30), time(15, 30), session_key=shared),
+        ]
+    )
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_create_maps_violation_without_conflict_query(db_session, monkeypatch):
+    """La creación no consulta conflictos y traduce la violación a un 400."""
+    day = date.today() + timedelta(days=6)
+    therapist, treatment, patient = await _setup(db_session, day)
+
+    async def _no_query(*args, **kwargs):
+        raise AssertionError("create_appointment must not query for conflicts")
+
+    monkeypatch.setattr(appointment_service, "has_conflict", _no_query)
+    data = AppointmentCreate(
+        therapist_id=therapist.id,
+        treatment_id=treatment.id,
+        start_time=datetime.combine(day, time(10)),
+    )
+    await create_appointment(db_session, patient.id, data, BackgroundTasks())
+
+    overlapping = AppointmentCreate(
+        therapist_id=therapist.id,
+        treatment_id=treatment.id,
+        start_time=datetime.combine(day, time(10, 15)),
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        await create_appointment(db_session, patient.id, overlapping, BackgroundTasks())
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "Appointment conflicts with existing booking."
+
+
+@pytest.mark.asyncio
+async def test_update_override_shares_a_session_key(db_session):
+    """El override de admin une la cita a la sesión de las que solapa."""
+    day = date.today() + timedelta(days=8)
+    therapist, treatment, patient = await _setup(db_session, day)
+    first = await create_appointment(
+        db_session,
+        patient.id,
+        AppointmentCreate(
+            therapist_id=therapist.id,
+            treatment_id=treatment.id,
+            start_time=datetime.combine(day, time(10)),
+        ),
+        BackgroundTasks(),
+    )
+
+    # Moving an appointment over its own previous slot is not a conflict
+    moved = await update_appointment(
+        db_session,
+        first,
+        AppointmentUpdate(
+            start_time=datetime.combine(day, time(10, 15)),
+            end_time=datetime.combine(day, time(10, 45)),
+        ),
+    )
+    assert moved.session_key is None
+
+    second = await create_appointment(
+        db_session,
+        patient.id,
+        AppointmentCreate(
+            therapist_id=therapist.id,
+            treatment_id=treatment.id,
+            start_time=datetime.combine(day, time(12)),
+        ),
+        BackgroundTasks(),
+    )
+    update = AppointmentUpdate(
+        start_time=datetime.combine(day, time(10, 30)),
+        end_time=datetime.combine(day, time(11)),
+    )
+    with pytest.raises(HTTPException):
+        await update_appointment(db_session, second, update)
+    updated = await update_appointment(db_session, second, update, allow_override=True)
+    await db_session.refresh(first)
+    assert updated.session_key is not None
+    assert first.session_key == updated.session_key
+
+
+@pytest.mark.asyncio
+async def test_override_exempts_only_the_overridden_pair(db_session, monkeypatch):
+    """Tras un override, la restricción sigue rechazando reservas encima."""
+    day = date.today() + timedelta(days=10)
+    therapist, treatment, patient = await _setup(db_session, day)
+    # The rejected booking rolls the session back and expires loaded rows
+    patient_id, therapist_id, treatment_id = patient.id, therapist.id, treatment.id
+
+    def _at(hour, minute=0):
+        return AppointmentCreate(
+            therapist_id=therapist_id,
+            treatment_id=treatment_id,
+            start_time=datetime.combine(day, time(hour, minute)),
+        )
+
+    await create_appointment(db_session, patient_id, _at(10), BackgroundTasks())
+    second = await create_appointment(
+        db_session, patient_id, _at(12), BackgroundTasks()
+    )
+    overridden = await update_appointment(
+        db_session,
+        second,
+        AppointmentUpdate(
+            start_time=datetime.combine(day, time(10, 15)),
+            end_time=datetime.combine(day, time(10, 45)),
+        ),
+        allow_override=True,
+    )
+    assert overridden.session_key is not None
+
+    async def _no_query(*args, **kwargs):
+        raise AssertionError("create_appointment must not query for conflicts")
+
+    monkeypatch.setattr(appointment_service, "has_conflict", _no_query)
+    # 10:30-11:00 only overlaps the overridden appointment
+    with pytest.raises(HTTPException) as exc_info:
+        await create_appointment(db_session, patient_id, _at(10, 30), BackgroundTasks())
+    assert exc_info.value.status_code == 400
+    monkeypatch.undo()
+    await db_session.refresh(overridden)
+
+    # Moving out of the double booking drops the shared key
+    moved = await update_appointment(
+        db_session,
+        overridden,
+        AppointmentUpdate(
+            start_time=datetime.combine(day, time(14)),
+            end_time=datetime.combine(day, time(14, 30)),
+        ),
+    )
+    assert moved.session_key is None
+    with pytest.raises(HTTPException):
+        await create_appointment(db_session, patient_id, _at(14), BackgroundTasks())
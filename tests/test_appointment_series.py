@@ -0,0 +1,283 @@
+"""Tests de reservas de series de citas recurrentes."""
+
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from pydantic import ValidationError
+from sqlalchemy import event, func, select
+
+from app.models.appointment import Appointment
+from app.schemas.appointment import (
+    AppointmentCreate,
+    AppointmentSeriesCreate,
+    SeriesMode,
+)
+from app.schemas.availability import AvailabilityCreate
+from app.schemas.patient import PatientCreate
+from app.schemas.therapist import TherapistCreate
+from app.schemas.treatment import TreatmentCreate
+from app.services.appointment_series_service import (
+    create_appointment_series,
+    expand_weekly,
+)
+from app.services.appointment_service import create_appointment
+from app.services.availability_service import create_availability
+from app.services.patient_service import create_patient
+from app.services.slot_calendar_service import check_consistency
+from app.services.therapist_service import create_therapist
+from app.services.treatment_service import create_treatment
+
+
+async def _setup(db_session):
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="Series", email=f"se+{uuid4().hex}@example.com"),
+    )
+    treatment = await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"Se-{uuid4().hex}", description="x", duration_minutes=45, price=1
+        ),
+    )
+    patient = await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="S",
+            last_name="E",
+            email=f"sep+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+    first = date.today() + timedelta(days=14)
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(
+            weekday=first.strftime("%A"), start_time=time(9), end_time=time(13)
+        ),
+    )
+    return therapist, treatment, patient, first
+
+
+def _series(therapist, treatment, first, mode=SeriesMode.all_or_nothing, **kwargs):
+    return AppointmentSeriesCreate(
+        therapist_id=therapist.id,
+        treatment_id=treatment.id,
+        start_time=datetime.combine(first, time(10)),
+        occurrences=kwargs.pop("occurrences", 10),
+        mode=mode,
+        **kwargs,
+    )
+
+
+async def _count(db_session, therapist_id):
+    result = await db_session.execute(
+        select(func.count())
+        .select_from(Appointment)
+        .where(Appointment.therapist_id == therapist_id)
+    )
+    return result.scalar_one()
+
+
+def test_expand_weekly():
+    """La regla semanal genera fechas separadas por el intervalo."""
+    start = datetime(2026, 1, 5, 10)
+    assert expand_weekly(start, 3, 2) == [
+        start,
+        start + timedelta(weeks=2),
+        start + timedelta(weeks=4),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_series_is_validated_and_inserted_in_bulk(db_session):
+    """Diez sesiones se validan con una consulta de rango y un único INSERT."""
+    therapist, treatment, patient, first = await _setup(db_session)
+    background = BackgroundTasks()
+
+    statements = []
+    sync_engine = db_session.bind.sync_engine
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", _record)
+    try:
+        series = await create_appointment_series(
+            db_session, patient.id, _series(therapist, treatment, first), background
+        )
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _record)
+
+    assert len(series["booked"]) == 10 and series["skipped"] == []
+    assert [a.start_time for a in series["booked"]] == expand_weekly(
+        datetime.combine(first, time(10)), 10
+    )
+    inserts = [
+        i for i, s in enumerate(statements) if s.startswith("INSERT INTO appointments")
+    ]
+    assert len(inserts) == 1
+    # Validation, before the insert, reads existing bookings once
+    range_queries = [
+        s
+        for s in statements[: inserts[0]]
+        if s.lstrip().startswith("SELECT appointments.therapist_id")
+    ]
+    assert len(range_queries) == 1
+    # One consolidated email and one push for the whole series
+    assert len(background.tasks) == 2
+    assert await check_consistency(db_session, [therapist.id]) == []
+
+
+@pytest.mark.asyncio
+async def test_all_or_nothing_rejects_whole_series(db_session):
+    """Con un conflicto, el modo todo-o-nada no reserva ninguna sesión."""
+    therapist, treatment, patient, first = await _setup(db_session)
+    third = first + timedelta(weeks=2)
+    await create_appointment(
+        db_session,
+        patient.id,
+        AppointmentCreate(
+            therapist_id=therapist.id,
+            treatment_id=treatment.id,
+            start_time=datetime.combine(third, time(10, 30)),
+        ),
+        BackgroundTasks(),
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await create_appointment_series(
+            db_session,
+            patient.id,
+            _series(therapist, treatment, first),
+            BackgroundTasks(),
+        )
+    assert exc_info.value.status_code == 409
+    occurrences = exc_info.value.detail["occurrences"]
+    assert [o["reason"] for o in occurrences] == ["conflict"]
+    assert occurrences[0]["start_time"].startswith(third.isoformat())
+    assert await _count(db_session, therapist.id) == 1
+
+
+@pytest.mark.asyncio
+async def test_skip_conflicts_books_the_rest(db_session):
+    """El modo de omisión reserva las sesiones libres e informa del resto."""
+    therapist, treatment, patient, first = await _setup(db_session)
+    third = first + timedelta(weeks=2)
+    await create_appointment(
+        db_session,
+        patient.id,
+        AppointmentCreate(
+            therapist_id=therapist.id,
+            treatment_id=treatment.id,
+            start_time=datetime.combine(third, time(9, 30)),
+        ),
+        BackgroundTasks(),
+    )
+
+    series = await create_appointment_series(
+        db_session,
+        patient.id,
+        _series(therapist, treatment, first, SeriesMode.skip_conflicts),
+        BackgroundTasks(),
+    )
+    assert len(series["booked"]) == 9
+    assert [(s["start_time"].date(), s["reason"]) for s in series["skipped"]] == [
+        (third, "conflict")
+    ]
+    assert await _count(db_session, therapist.id) == 10
+
+    # Outside the availability block nothing can be booked
+    with pytest.raises(HTTPException) as exc_info:
+        await create_appointment_series(
+            db_session,
+            patient.id,
+            AppointmentSeriesCreate(
+                therapist_id=therapist.id,
+                treatment_id=treatment.id,
+                start_time=datetime.combine(first, time(12, 30)),
+                occurrences=3,
+                mode=SeriesMode.skip_conflicts,
+            ),
+            BackgroundTasks(),
+        )
+    assert exc_info.value.detail == "No occurrence of the series can be booked."
+
+
+@pytest.mark.asyncio
+async def test_all_or_nothing_conflict_response(client, db_session, monkeypatch):
+    """Por HTTP, una serie rechazada responde 409 con las sesiones en conflicto."""
+    from app.core import security
+    from app.main import app as _app
+    from app.services import appointment_series_service
+
+    async def _no_notification(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(
+        appointment_series_service, "send_appointment_series", _no_notification
+    )
+    monkeypatch.setattr(
+        appointment_series_service, "send_push_to_user", _no_notification
+    )
+    therapist, treatment, patient, first = await _setup(db_session)
+    third = first + timedelta(weeks=2)
+    await create_appointment(
+        db_session,
+        patient.id,
+        AppointmentCreate(
+            therapist_id=therapist.id,
+            treatment_id=treatment.id,
+            start_time=datetime.combine(third, time(10, 30)),
+        ),
+        BackgroundTasks(),
+    )
+
+    _app.dependency_overrides[security.get_current_user] = lambda: {
+        "id": patient.supabase_user_id,
+        "role": "patient",
+    }
+    resp = client.post(
+        "/appointments/series",
+        json={
+            "therapist_id": str(therapist.id),
+            "treatment_id": str(treatment.id),
+            "start_time": datetime.combine(first, time(10)).isoformat(),
+            "occurrences": 4,
+        },
+    )
+    assert resp.status_code == 409
+    assert resp.json()["detail"] == {
+        "message": "Some occurrences of the series cannot be booked.",
+        "occurrences": [
+            {
+                "start_time": datetime.combine(third, time(10)).isoformat(),
+                "end_time": datetime.combine(third, time(10, 45)).isoformat(),
+                "reason": "conflict",
+            }
+        ],
+    }
+    assert await _count(db_session, therapist.id) == 1
+
+
+def test_series_endpoint_requires_patient(client):
+    """El endpoint existe, exige paciente y valida el número de sesiones."""
+    resp = client.post(
+        "/appointments/series",
+        json={
+            "therapist_id": str(uuid4()),
+            "treatment_id": str(uuid4()),
+            "start_time": datetime(2030, 1, 7, 10).isoformat(),
+            "occurrences": 8,
+        },
+    )
+    assert resp.status_code in (401, 403, 404)
+    with pytest.raises(ValidationError):
+        AppointmentSeriesCreate(
+            therapist_id=uuid4(),
+            treatment_id=uuid4(),
+            start_time=datetime(2030, 1, 7, 10),
+            occurrences=0,
+        )
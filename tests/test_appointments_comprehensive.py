@@ -127,7 +127,7 @@ async def test_list_appointments_by_role(client, db_session):
 
     # Test como paciente - debe ver solo sus citas
     def fake_patient():
-        return {"id": patient.id, "role": "patient"}
+        return {"id": patient.supabase_user_id, "role": "patient"}
 
     _app.dependency_overrides[security.get_current_user] = fake_patient
     resp_patient = client.get("/appointments/")
@@ -172,7 +172,7 @@ async def test_appointment_access_control(client, db_session):
     )
 
     def fake_other_patient():
-        return {"id": other_patient.id, "role": "patient"}
+        return {"id": other_patient.supabase_user_id, "role": "patient"}
 
     _app.dependency_overrides[security.get_current_user] = fake_other_patient
 
@@ -182,7 +182,7 @@ async def test_appointment_access_control(client, db_session):
 
     # El paciente original SÍ debe poder ver su cita
     def fake_owner_patient():
-        return {"id": patient.id, "role": "patient"}
+        return {"id": patient.supabase_user_id, "role": "patient"}
 
     _app.dependency_overrides[security.get_current_user] = fake_owner_patient
     resp = client.get(f"/appointments/{appt_id}")
@@ -215,7 +215,7 @@ async def test_update_appointment(client, db_session):
 
     # El paciente propietario puede actualizar
     def fake_patient():
-        return {"id": patient.id, "role": "patient"}
+        return {"id": patient.supabase_user_id, "role": "patient"}
 
     _app.dependency_overrides[security.get_current_user] = fake_patient
 
@@ -249,7 +249,7 @@ async def test_cancel_appointment(client, db_session):
     )
 
     def fake_patient():
-        return {"id": patient.id, "role": "patient"}
+        return {"id": patient.supabase_user_id, "role": "patient"}
 
     _app.dependency_overrides[security.get_current_user] = fake_patient
 
@@ -0,0 +1,100 @@
+"""Tests del flujo de autenticación contra un GoTrue falso."""
+
+import time
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from app.core.security import TOKEN_CACHE
+from app.core.supabase_client import create_auth_client
+from app.routers import auth as auth_router
+from tests import fake_gotrue
+
+
+@pytest.fixture()
+def gotrue(monkeypatch):
+    """Redirige el cliente de auth al servidor GoTrue falso (ASGI, sin red)."""
+    fake_gotrue.reset()
+    transport = httpx.ASGITransport(app=fake_gotrue.app)
+    monkeypatch.setattr(
+        auth_router,
+        "get_auth_client",
+        lambda: create_auth_client(transport=transport)[0],
+    )
+    return fake_gotrue
+
+
+def test_signup_sends_metadata_in_single_call(client, gotrue):
+    email = f"signup+{uuid4().hex}@example.com"
+    resp = client.post(
+        "/auth/signup",
+        json={
+            "email": email,
+            "password": "secret123",
+            "first_name": "Ana",
+            "last_name": "López",
+        },
+    )
+    assert resp.status_code == 200
+    assert resp.json()["role"] == "patient"
+
+    user = gotrue.USERS[email]["user"]
+    assert user["user_metadata"]["first_name"] == "Ana"
+    assert sum(gotrue.CALLS.values()) == 1
+
+
+def test_login_reads_role_without_extra_round_trip(client, gotrue):
+    email = f"login+{uuid4().hex}@example.com"
+    client.post(
+        "/auth/signup",
+        json={
+            "email": email,
+            "password": "secret123",
+            "first_name": "Luis",
+            "last_name": "Pérez",
+        },
+    )
+    gotrue.CALLS.clear()
+
+    resp = client.post("/auth/login", json={"email": email, "password": "secret123"})
+    assert resp.status_code == 200
+    assert resp.json()["role"] == "patient"
+    assert gotrue.CALLS == {"POST /auth/v1/token": 1}
+
+
+def test_login_invalid_credentials(client, gotrue):
+    resp = client.post(
+        "/auth/login", json={"email": "nobody@example.com", "password": "nope"}
+    )
+    assert resp.status_code == 401
+
+
+def test_logout_revokes_bearer_token(client, gotrue):
+    email = f"logout+{uuid4().hex}@example.com"
+    token = client.post(
+        "/auth/signup",
+        json={
+            "email": email,
+            "password": "secret123",
+            "first_name": "Eva",
+            "last_name": "Ruiz",
+        },
+    ).json()["access_token"]
+
+    resp = client.post("/auth/logout", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200
+    assert gotrue.CALLS["POST /auth/v1/logout"] == 1
+
+    assert client.post("/auth/logout").status_code == 200
+
+
+def test_logout_with_rejected_token_still_succeeds(client, gotrue):
+    """Un token caducado o revocado que GoTrue rechaza no impide cerrar sesión."""
+    TOKEN_CACHE.set("expired", {"exp": time.time() + 60}, {"id": "user-1"})
+    assert TOKEN_CACHE.get("expired") is not None
+
+    resp = client.post("/auth/logout", headers={"Authorization": "Bearer expired"})
+    assert resp.status_code == 200
+    assert gotrue.CALLS["POST /auth/v1/logout"] == 1
+    assert TOKEN_CACHE.get("expired") is None
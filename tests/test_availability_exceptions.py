@@ -0,0 +1,285 @@
+"""Tests de excepciones de disponibilidad (vacaciones y festivos)."""
+
+import random
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from pydantic import ValidationError
+from sqlalchemy import event
+
+from app.models.availability_exception import AvailabilityException
+from app.schemas.appointment import AppointmentCreate
+from app.schemas.availability import AvailabilityCreate, AvailabilityExceptionCreate
+from app.schemas.patient import PatientCreate
+from app.schemas.therapist import TherapistCreate
+from app.schemas.treatment import TreatmentCreate
+from app.services.appointment_service import (
+    create_appointment,
+    get_daily_availability,
+    is_within_availability,
+)
+from app.services.availability_service import (
+    create_availability,
+    create_availability_exception,
+    delete_availability_exception,
+    list_availability_exceptions,
+)
+from app.services.free_slot_service import (
+    find_next_free_slots,
+    get_free_slots,
+    load_exceptions,
+    merge_intervals,
+    subtract_intervals,
+)
+from app.services.patient_service import create_patient
+from app.services.slot_calendar_service import check_consistency
+from app.services.therapist_service import create_therapist
+from app.services.treatment_service import create_treatment
+
+MINUTE = 60
+
+
+def _brute_force(blocks, removed):
+    minutes = {m for start, end in blocks for m in range(start, end)}
+    minutes -= {m for start, end in removed for m in range(start, end)}
+    return minutes
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_subtract_intervals_matches_brute_force(seed):
+    """La resta por barrido coincide con la resta minuto a minuto."""
+    rng = random.Random(seed)
+    blocks = []
+    for _ in range(rng.randrange(1, 6)):
+        start = rng.randrange(0, 1300)
+        blocks.append((start, start + rng.randrange(1, 240)))
+    removed = []
+    for _ in range(rng.randrange(0, 8)):
+        start = rng.randrange(0, 1400)
+        removed.append((start, start + rng.randrange(1, 120)))
+    result = subtract_intervals(blocks, merge_intervals(removed))
+    assert {m for start, end in result for m in range(start, end)} == _brute_force(
+        blocks, removed
+    )
+
+
+def test_subtract_intervals_with_a_year_of_exceptions():
+    """De un año de excepciones, solo la del día del bloque lo recorta."""
+    removed = [(day * 1440 + 600, day * 1440 + 660) for day in range(365)]
+    blocks = [(100 * 1440 + 540, 100 * 1440 + 780)]
+    assert subtract_intervals(blocks, removed) == [
+        (100 * 1440 + 540, 100 * 1440 + 600),
+        (100 * 1440 + 660, 100 * 1440 + 780),
+    ]
+
+
+async def _setup(db_session, day):
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="TimeOff", email=f"off+{uuid4().hex}@example.com"),
+    )
+    treatment = await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"Off-{uuid4().hex}", description="x", duration_minutes=30, price=1
+        ),
+    )
+    patient = await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="T",
+            last_name="O",
+            email=f"to+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(
+            weekday=day.strftime("%A"), start_time=time(9), end_time=time(12)
+        ),
+    )
+    return therapist, treatment, patient
+
+
+def _starts(slots):
+    return [slot["start_time"][11:16] for slot in slots]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("days_ahead", [10, 200])
+async def test_exception_is_subtracted_everywhere(db_session, days_ahead):
+    """Una excepción se resta en slots, disponibilidad diaria y reservas.
+
+    A 10 días el día está en el calendario materializado; a 200 se calcula al
+    vuelo.
+    """
+    day = date.today() + timedelta(days=days_ahead)
+    therapist, treatment, patient = await _setup(db_session, day)
+    assert len(await get_free_slots(db_session, therapist.id, day, 30)) == 6
+
+    exception = await create_availability_exception(
+        db_session,
+        therapist.id,
+        AvailabilityExceptionCreate(
+            start_time=datetime.combine(day, time(9, 30)),
+            end_time=datetime.combine(day, time(10, 30)),
+            reason="Médico",
+        ),
+    )
+    slots = await get_free_slots(db_session, therapist.id, day, 30)
+    assert _starts(slots) == ["09:00", "10:30", "11:00", "11:30"]
+    found = await find_next_free_slots(
+        db_session, 30, day, day, therapist_ids=[therapist.id]
+    )
+    assert _starts(found) == _starts(slots)
+    daily = await get_daily_availability(db_session, therapist.id, day)
+    assert [slot.start for slot in daily if slot.available] == [
+        time(9),
+        time(10, 30),
+        time(11),
+        time(11, 30),
+    ]
+    assert not await is_within_availability(
+        db_session,
+        therapist.id,
+        datetime.combine(day, time(10)),
+        datetime.combine(day, time(10, 30)),
+    )
+    with pytest.raises(HTTPException) as exc:
+        await create_appointment(
+            db_session,
+            patient.id,
+            AppointmentCreate(
+                therapist_id=therapist.id,
+                treatment_id=treatment.id,
+                start_time=datetime.combine(day, time(10)),
+            ),
+            BackgroundTasks(),
+        )
+    assert exc.value.status_code == 400
+    assert await check_consistency(db_session, [therapist.id]) == []
+    assert [
+        e.id for e in await list_availability_exceptions(db_session, therapist.id)
+    ] == [exception.id]
+
+    await delete_availability_exception(db_session, exception)
+    assert len(await get_free_slots(db_session, therapist.id, day, 30)) == 6
+    assert await check_consistency(db_session, [therapist.id]) == []
+
+
+@pytest.mark.asyncio
+async def test_clinic_wide_holiday_applies_to_every_therapist(db_session):
+    """Un festivo sin terapeuta cierra el día para todos."""
+    day = date.today() + timedelta(days=300)
+    therapist, _, _ = await _setup(db_session, day)
+    other, _, _ = await _setup(db_session, day)
+    holiday = await create_availability_exception(
+        db_session,
+        None,
+        AvailabilityExceptionCreate(
+            start_time=datetime.combine(day, time.min),
+            end_time=datetime.combine(day + timedelta(days=1), time.min),
+            reason="Festivo",
+        ),
+    )
+    try:
+        for therapist_id in (therapist.id, other.id):
+            assert await get_free_slots(db_session, therapist_id, day, 30) == []
+        exceptions = await load_exceptions(
+            db_session, [therapist.id, other.id], day, day
+        )
+        assert exceptions == {
+            therapist.id: [(0, 24 * 3600)],
+            other.id: [(0, 24 * 3600)],
+        }
+    finally:
+        await delete_availability_exception(db_session, holiday)
+    assert len(await get_free_slots(db_session, therapist.id, day, 30)) == 6
+
+
+@pytest.mark.asyncio
+async def test_day_lookup_ignores_a_year_of_other_exceptions(db_session):
+    """Con un año de excepciones, la consulta de un día solo trae las suyas."""
+    day = date.today() + timedelta(days=400)
+    therapist, _, _ = await _setup(db_session, day)
+    for n in range(-180, 185):
+        other_day = day + timedelta(days=n)
+        db_session.add(
+            AvailabilityException(
+                therapist_id=therapist.id,
+                start_time=datetime.combine(other_day, time(11)),
+                end_time=datetime.combine(other_day, time(11, 30)),
+            )
+        )
+    await db_session.commit()
+
+    rows = []
+    sync_engine = db_session.bind.sync_engine
+
+    def _rows(conn, cursor, statement, parameters, context, executemany):
+        if "availability_exceptions" in statement:
+            rows.append(statement)
+
+    event.listen(sync_engine, "after_cursor_execute", _rows)
+    try:
+        exceptions = await load_exceptions(db_session, [therapist.id], day, day)
+    finally:
+        event.remove(sync_engine, "after_cursor_execute", _rows)
+    assert len(rows) == 1
+    assert exceptions == {therapist.id: [(11 * 3600, 11 * 3600 + 30 * MINUTE)]}
+    slots = await get_free_slots(db_session, therapist.id, day, 30)
+    assert _starts(slots) == ["09:00", "09:30", "10:00", "10:30", "11:30"]
+
+
+def test_exception_range_must_be_ordered():
+    """El fin de la excepción debe ser posterior al inicio."""
+    start = datetime(2030, 8, 1)
+    with pytest.raises(ValidationError):
+        AvailabilityExceptionCreate(start_time=start, end_time=start)
+
+
+@pytest.mark.asyncio
+async def test_exception_endpoints(client, db_session):
+    """El terapeuta gestiona sus excepciones y no las de otros."""
+    from app.core import security
+    from app.main import app as _app
+
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(
+            name="OffTh",
+            email=f"offth+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+    _app.dependency_overrides[security.get_current_user] = lambda: {
+        "id": therapist.supabase_user_id,
+        "role": "therapist",
+    }
+    start = datetime.combine(date.today() + timedelta(days=500), time(9))
+    payload = {
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(days=7)).isoformat(),
+        "reason": "Vacaciones",
+    }
+    resp = client.post("/availability/exceptions", json=payload)
+    assert resp.status_code == 200
+    created = resp.json()
+    assert created["therapist_id"] == str(therapist.id)
+
+    other = {**payload, "therapist_id": str(uuid4())}
+    assert client.post("/availability/exceptions", json=other).status_code == 403
+
+    listed = client.get(
+        "/availability/exceptions", params={"therapist_id": str(therapist.id)}
+    )
+    assert [item["id"] for item in listed.json()] == [created["id"]]
+
+    resp = client.delete(f"/availability/exceptions/{created['id']}")
+    assert resp.status_code == 200
+    resp = client.delete(f"/availability/exceptions/{created['id']}")
+    assert resp.status_code == 404
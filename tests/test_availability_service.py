@@ -1,16 +1,25 @@
 """Tests para el servicio de disponibilidad de terapeutas."""
 
-from datetime import time
+import random
+from datetime import date, time, timedelta
 from uuid import uuid4
 
 import pytest
+from pydantic import ValidationError
+from sqlalchemy import insert
 
+from app.models.therapist_availability import TherapistAvailability
 from app.schemas.availability import AvailabilityCreate
 from app.schemas.therapist import TherapistCreate
 from app.services.availability_service import (
+    canonical_blocks,
     create_availability,
     list_therapist_availability,
+    normalize_availability,
+    set_weekly_template,
 )
+from app.services.free_slot_service import get_free_slots
+from app.services.slot_calendar_service import check_consistency
 from app.services.therapist_service import create_therapist
 
 
@@ -31,6 +40,7 @@ async def test_create_availability(db_session):
     assert av.start_time == time(9, 0)
     assert av.end_time == time(12, 0)
     assert av.therapist_id == therapist.id
+    assert (av.day_of_week, av.start_minute, av.end_minute) == (0, 9 * 60, 12 * 60)
 
 
 @pytest.mark.asyncio
@@ -61,3 +71,212 @@ async def test_list_therapist_availability(db_session):
     # Verificar que todas las creadas están en la lista
     for created in created_avs:
         assert any(x.id == created.id for x in lst)
+
+
+def test_weekday_names_are_validated():
+    """Los nombres de día se normalizan y los desconocidos se rechazan."""
+    data = AvailabilityCreate(
+        weekday=" Sunday ", start_time=time(8, 0), end_time=time(9, 0)
+    )
+    assert data.weekday == "sunday"
+    with pytest.raises(ValidationError):
+        AvailabilityCreate(weekday="lunes", start_time=time(8), end_time=time(9))
+
+
+def test_availability_block_must_be_ordered():
+    """El fin del bloque debe ser posterior al inicio."""
+    with pytest.raises(ValidationError):
+        AvailabilityCreate(weekday="monday", start_time=time(9), end_time=time(9))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_canonical_blocks_matches_brute_force(seed):
+    """La normalización cubre los mismos minutos con bloques que no se tocan."""
+    rng = random.Random(seed)
+    blocks = []
+    for _ in range(rng.randrange(0, 10)):
+        start = rng.randrange(0, 1400)
+        blocks.append((start, start + rng.randrange(-10, 120)))
+    result = canonical_blocks(blocks)
+    assert {m for start, end in result for m in range(start, end)} == {
+        m for start, end in blocks for m in range(start, end)
+    }
+    assert all(start < end for start, end in result)
+    assert all(prev[1] < nxt[0] for prev, nxt in zip(result, result[1:]))
+
+
+async def _therapist(db_session):
+    return await create_therapist(
+        db_session,
+        TherapistCreate(name="Merge", email=f"merge+{uuid4().hex}@example.com"),
+    )
+
+
+def _spans(blocks):
+    return [(b.weekday, b.start_time, b.end_time) for b in blocks]
+
+
+@pytest.mark.asyncio
+async def test_create_availability_merges_overlapping_and_adjacent(db_session):
+    """Los bloques que se solapan o se tocan se fusionan al escribir."""
+    therapist = await _therapist(db_session)
+    first = await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(weekday="Tuesday", start_time=time(9), end_time=time(12)),
+    )
+    for start, end in [
+        (time(11), time(14)),
+        (time(14), time(15)),
+        (time(10), time(11)),
+    ]:
+        merged = await create_availability(
+            db_session,
+            therapist.id,
+            AvailabilityCreate(weekday="Tuesday", start_time=start, end_time=end),
+        )
+        # The block keeps its id as it grows
+        assert merged.id == first.id
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(weekday="Tuesday", start_time=time(16), end_time=time(17)),
+    )
+    bridge = await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(weekday="Tuesday", start_time=time(15), end_time=time(16)),
+    )
+
+    blocks = await list_therapist_availability(db_session, therapist.id)
+    assert [b.id for b in blocks] == [bridge.id]
+    assert _spans(blocks) == [("tuesday", time(9), time(17))]
+    day = date.today() + timedelta(days=(1 - date.today().weekday()) % 7 + 7)
+    assert len(await get_free_slots(db_session, therapist.id, day, 60)) == 8
+    assert await check_consistency(db_session, [therapist.id]) == []
+
+
+@pytest.mark.asyncio
+async def test_set_weekly_template_replaces_the_week(db_session):
+    """La plantilla semanal reemplaza todos los bloques, ya normalizados."""
+    therapist = await _therapist(db_session)
+    monday = await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(weekday="Monday", start_time=time(9), end_time=time(13)),
+    )
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(weekday="Friday", start_time=time(9), end_time=time(13)),
+    )
+    template = [
+        AvailabilityCreate(weekday="Monday", start_time=time(9), end_time=time(13)),
+        AvailabilityCreate(weekday="Wednesday", start_time=time(14), end_time=time(16)),
+        AvailabilityCreate(weekday="Wednesday", start_time=time(15), end_time=time(18)),
+        AvailabilityCreate(weekday="Wednesday", start_time=time(8), end_time=time(9)),
+    ]
+    blocks = await set_weekly_template(db_session, therapist.id, template)
+    assert _spans(blocks) == [
+        ("monday", time(9), time(13)),
+        ("wednesday", time(8), time(9)),
+        ("wednesday", time(14), time(18)),
+    ]
+    # Unchanged weekdays are not rewritten
+    assert blocks[0].id == monday.id
+    assert await check_consistency(db_session, [therapist.id]) == []
+
+    assert await set_weekly_template(db_session, therapist.id, []) == []
+
+
+@pytest.mark.asyncio
+async def test_normalize_availability_merges_existing_blocks(db_session):
+    """La normalización de datos existentes deja el mínimo de bloques."""
+    therapist = await _therapist(db_session)
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(weekday="Sunday", start_time=time(18), end_time=time(19)),
+    )
+    rows = [(540, 600), (570, 660), (660, 720), (540, 600), (800, 800), (900, 960)]
+    await db_session.execute(
+        insert(TherapistAvailability),
+        [
+            {
+                "therapist_id": therapist.id,
+                "day_of_week": 3,
+                "start_minute": start,
+                "end_minute": end,
+            }
+            for start, end in rows
+        ],
+    )
+    await db_session.commit()
+    day = date.today() + timedelta(days=(3 - date.today().weekday()) % 7 + 7)
+    slots = await get_free_slots(db_session, therapist.id, day, 60)
+
+    assert await normalize_availability(db_session, [therapist.id], dry_run=True) == {
+        "therapists": 1,
+        "weekdays": 1,
+        "removed": 4,
+    }
+    assert len(await list_therapist_availability(db_session, therapist.id)) == 7
+    summary = await normalize_availability(db_session, [therapist.id])
+    assert summary["removed"] == 4
+    blocks = await list_therapist_availability(db_session, therapist.id)
+    assert _spans(blocks) == [
+        ("thursday", time(9), time(12)),
+        ("thursday", time(15), time(16)),
+        ("sunday", time(18), time(19)),
+    ]
+    # The overlapping 9:30 block no longer adds its own grid of slots
+    normalized = await get_free_slots(db_session, therapist.id, day, 60)
+    assert len(slots) > len(normalized)
+    assert [slot["start_time"][11:16] for slot in normalized] == [
+        "09:00",
+        "10:00",
+        "11:00",
+        "15:00",
+    ]
+    assert await check_consistency(db_session, [therapist.id]) == []
+    assert (await normalize_availability(db_session, [therapist.id]))["removed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_weekly_template_endpoint(client, db_session):
+    """El terapeuta sube su plantilla semanal en una sola petición."""
+    from app.core import security
+    from app.main import app as _app
+
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(
+            name="Template",
+            email=f"tpl+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+    _app.dependency_overrides[security.get_current_user] = lambda: {
+        "id": therapist.supabase_user_id,
+        "role": "therapist",
+    }
+    payload = {
+        "blocks": [
+            {"weekday": "monday", "start_time": "09:00", "end_time": "12:00"},
+            {"weekday": "monday", "start_time": "12:00", "end_time": "14:00"},
+            {"weekday": "thursday", "start_time": "16:00", "end_time": "20:00"},
+        ]
+    }
+    resp = client.put("/availability/template", json=payload)
+    assert resp.status_code == 200
+    assert [(b["weekday"], b["start_time"], b["end_time"]) for b in resp.json()] == [
+        ("monday", "09:00:00", "14:00:00"),
+        ("thursday", "16:00:00", "20:00:00"),
+    ]
+    resp = client.put(
+        "/availability/template",
+        json={
+            "blocks": [{"weekday": "friday", "start_time": "10:00", "end_time": "9:00"}]
+        },
+    )
+    assert resp.status_code == 422
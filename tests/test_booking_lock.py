@@ -0,0 +1,146 @@
+"""Tests del lock de reservas por terapeuta y su métrica de espera."""
+
+import asyncio
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.booking_lock import (
+    BOOKING_LOCK_WAIT_SECONDS,
+    LOCAL_BOOKING_LOCKS,
+    advisory_key,
+    therapist_booking_lock,
+)
+from app.core.config import settings
+from app.models.appointment import Appointment
+from app.models.patient import Patient
+from app.models.therapist import Therapist
+from app.schemas.appointment import AppointmentCreate
+from app.schemas.availability import AvailabilityCreate
+from app.schemas.patient import PatientCreate
+from app.schemas.therapist import TherapistCreate
+from app.schemas.treatment import TreatmentCreate
+from app.services import appointment_service
+from app.services.availability_service import create_availability
+from app.services.patient_service import create_patient
+from app.services.therapist_service import create_therapist
+from app.services.treatment_service import create_treatment
+
+PARALLEL_BOOKINGS = 200
+
+
+def test_advisory_key_is_signed_bigint():
+    """La clave del advisory lock cabe en un bigint con signo y es estable."""
+    for _ in range(100):
+        therapist_id = uuid4()
+        key = advisory_key(therapist_id)
+        assert -(2**63) <= key < 2**63
+        assert advisory_key(str(therapist_id)) == key
+
+
+@pytest.mark.asyncio
+async def test_different_therapists_never_wait(db_session):
+    """Un terapeuta bloqueado no retrasa las reservas de otro."""
+    busy, free = uuid4(), uuid4()
+    async with therapist_booking_lock(db_session, busy):
+        async with asyncio.timeout(0.5):
+            async with therapist_booking_lock(db_session, free):
+                pass
+
+        waiter = asyncio.create_task(
+            therapist_booking_lock(db_session, busy).__aenter__()
+        )
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+    assert len(LOCAL_BOOKING_LOCKS) == 0
+
+
+@pytest.mark.asyncio
+async def test_parallel_bookings_for_one_slot(engine, db_session, monkeypatch):
+    """De cientos de reservas simultáneas del mismo hueco solo una prospera."""
+    day = date.today() + timedelta(days=9)
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="Stress", email=f"st+{uuid4().hex}@example.com"),
+    )
+    treatment = await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"St-{uuid4().hex}", description="x", duration_minutes=30, price=1
+        ),
+    )
+    patient = await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="S",
+            last_name="T",
+            email=f"stp+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+    therapist_id, patient_id = therapist.id, patient.id
+    await create_availability(
+        db_session,
+        therapist_id,
+        AvailabilityCreate(
+            weekday=day.strftime("%A").lower(), start_time=time(9), end_time=time(17)
+        ),
+    )
+
+    monkeypatch.setattr(settings, "booking_lock_enabled", True)
+    # Every rejection must come from the locked check, not from the constraint
+    constraint_hits = []
+
+    def _record_violation(exc):
+        constraint_hits.append(exc)
+        return True
+
+    monkeypatch.setattr(appointment_service, "is_overlap_violation", _record_violation)
+    waits_before = BOOKING_LOCK_WAIT_SECONDS.snapshot().get("local", {"count": 0})
+
+    sessions = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    data = AppointmentCreate(
+        therapist_id=therapist_id,
+        treatment_id=treatment.id,
+        start_time=datetime.combine(day, time(10)),
+    )
+
+    async def _book():
+        async with sessions() as session:
+            # The confirmation reads these relationships from the identity map,
+            # as the routers have them loaded by the time they book
+            loaded = [  # noqa: F841 - the identity map only holds weak refs
+                await session.get(Patient, patient_id),
+                await session.get(Therapist, therapist_id),
+            ]
+            try:
+                await appointment_service.create_appointment(
+                    session, patient_id, data, BackgroundTasks()
+                )
+            except HTTPException as e:
+                return e.status_code
+            return 201
+
+    results = await asyncio.gather(*(_book() for _ in range(PARALLEL_BOOKINGS)))
+
+    assert results.count(201) == 1
+    assert results.count(400) == PARALLEL_BOOKINGS - 1
+    assert constraint_hits == []
+    waits = BOOKING_LOCK_WAIT_SECONDS.snapshot()["local"]
+    assert waits["count"] - waits_before["count"] == PARALLEL_BOOKINGS
+    assert len(LOCAL_BOOKING_LOCKS) == 0
+
+    stored = await db_session.execute(
+        select(func.count())
+        .select_from(Appointment)
+        .where(Appointment.therapist_id == therapist_id)
+    )
+    assert stored.scalar_one() == 1
@@ -0,0 +1,98 @@
+"""Tests para el circuit breaker de dependencias de autenticación."""
+
+import pytest
+
+from app.core import circuit_breaker
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class Boom(Exception):
+    pass
+
+
+def _fail(breaker):
+    with pytest.raises(Boom):
+        with breaker.guard():
+            raise Boom("down")
+
+
+def test_breaker_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker("t", failure_threshold=2, negative_ttl=0)
+    _fail(breaker)
+    assert breaker.state == circuit_breaker.CLOSED
+    _fail(breaker)
+    assert breaker.state == circuit_breaker.OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        with breaker.guard():
+            calls.append(1)
+    assert calls == []
+    assert breaker.snapshot()["rejected"] == 1
+
+
+def test_breaker_half_open_allows_single_trial(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "time", lambda: now[0])
+    breaker = CircuitBreaker("t", failure_threshold=1, reset_timeout=30, negative_ttl=0)
+    _fail(breaker)
+    assert breaker.state == circuit_breaker.OPEN
+
+    now[0] += 31
+    breaker.before_call()
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    # Una segunda llamada mientras la prueba está en curso falla rápido
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == circuit_breaker.CLOSED
+
+
+def test_breaker_negative_cache_blocks_retries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "time", lambda: now[0])
+    breaker = CircuitBreaker("t", failure_threshold=5, negative_ttl=10)
+    _fail(breaker)
+    assert breaker.state == circuit_breaker.CLOSED
+
+    with pytest.raises(CircuitOpenError) as exc:
+        breaker.before_call()
+    assert exc.value.retry_after == pytest.approx(10)
+
+    now[0] += 11
+    with breaker.guard():
+        pass
+    assert breaker.snapshot()["consecutive_failures"] == 0
+
+
+def test_breaker_ignores_client_errors():
+    breaker = CircuitBreaker(
+        "t", failure_threshold=1, is_failure=lambda exc: not isinstance(exc, Boom)
+    )
+    _fail(breaker)
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.snapshot()["total_failures"] == 0
+
+
+def test_supabase_outage_classification():
+    from supabase_auth.errors import (
+        AuthApiError,
+        AuthInvalidCredentialsError,
+        AuthRetryableError,
+    )
+
+    from app.core.supabase_client import _is_supabase_outage
+
+    assert not _is_supabase_outage(AuthInvalidCredentialsError("bad"))
+    assert not _is_supabase_outage(AuthApiError("bad", 400, None))
+    assert _is_supabase_outage(AuthApiError("down", 503, None))
+    assert _is_supabase_outage(AuthRetryableError("timeout", 0))
+    assert _is_supabase_outage(ConnectionError("refused"))
+
+
+def test_breaker_states_endpoint(client):
+    resp = client.get("/admin/circuit-breakers")
+    assert resp.status_code == 200
+    names = {b["name"] for b in resp.json()}
+    assert {"jwks", "supabase_auth"} <= names
@@ -0,0 +1,422 @@
+"""Tests y benchmark del motor de barrido de `free_slot_service`."""
+
+import random
+import time as timer
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event
+
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.therapist_availability import TherapistAvailability
+from app.schemas.patient import PatientCreate
+from app.schemas.therapist import TherapistCreate
+from app.schemas.treatment import TreatmentCreate
+from app.services.appointment_service import get_daily_availability
+from app.services.free_slot_service import (
+    find_next_free_slots,
+    get_free_slots,
+    grid_availability,
+    merge_intervals,
+    sweep_free_slots,
+)
+from app.services.patient_service import create_patient
+from app.services.therapist_service import create_therapist
+from app.services.treatment_service import create_treatment
+
+MINUTE = 60
+
+
+def _naive_free_slots(blocks, appointments, duration, step):
+    # Reference: the previous O(slots x appointments) algorithm
+    free = []
+    for block_start, block_end in sorted(blocks):
+        current = block_start
+        while current + duration <= block_end:
+            slot_end = current + duration
+            conflict = any(
+                start < slot_end and end > current for start, end in appointments
+            )
+            if not conflict:
+                free.append((current, slot_end))
+            current += step
+    return free
+
+
+def _busy_day(count, seed=0):
+    """`count` citas de 10-40 minutos repartidas entre las 08:00 y las 20:00."""
+    rng = random.Random(seed)
+    appointments = []
+    for _ in range(count):
+        start = rng.randrange(8 * 60, 20 * 60, 5) * MINUTE
+        appointments.append((start, start + rng.choice((10, 15, 20, 30, 40)) * MINUTE))
+    return appointments
+
+
+def test_merge_intervals_joins_overlapping_and_touching():
+    """Los intervalos solapados o contiguos se fusionan tras ordenarlos."""
+    assert merge_intervals([(50, 60), (0, 10), (10, 20), (15, 30)]) == [
+        (0, 30),
+        (50, 60),
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("duration,step", [(30, 30), (30, 5), (45, 15), (10, 20)])
+def test_sweep_matches_naive_algorithm(seed, duration, step):
+    """El barrido devuelve exactamente los mismos slots que el algoritmo previo."""
+    appointments = _busy_day(40, seed)
+    blocks = [(8 * 60 * MINUTE, 13 * 60 * MINUTE), (15 * 60 * MINUTE, 21 * 60 * MINUTE)]
+    expected = _naive_free_slots(blocks, appointments, duration * MINUTE, step * MINUTE)
+
+    result = sweep_free_slots(
+        blocks, merge_intervals(appointments), duration * MINUTE, step * MINUTE
+    )
+
+    assert result == expected
+
+
+def test_sweep_matches_naive_on_busy_day():
+    """Con 48 citas al día y paso de 5 minutos ambos algoritmos coinciden."""
+    appointments = _busy_day(48)
+    blocks = [(7 * 60 * MINUTE, 21 * 60 * MINUTE)]
+    duration, step = 30 * MINUTE, 5 * MINUTE
+
+    expected = _naive_free_slots(blocks, appointments, duration, step)
+    assert expected
+    assert (
+        sweep_free_slots(blocks, merge_intervals(appointments), duration, step)
+        == expected
+    )
+
+
+@pytest.mark.benchmark
+def test_sweep_is_faster_than_naive_on_busy_day():
+    """Con 48 citas al día y paso de 5 minutos el barrido es varias veces más rápido."""
+    appointments = _busy_day(48)
+    blocks = [(7 * 60 * MINUTE, 21 * 60 * MINUTE)]
+    duration, step = 30 * MINUTE, 5 * MINUTE
+
+    def best_of(fn, repeat=5, number=20):
+        timings = []
+        for _ in range(repeat):
+            start = timer.perf_counter()
+            for _ in range(number):
+                fn()
+            timings.append(timer.perf_counter() - start)
+        return min(timings)
+
+    naive = best_of(lambda: _naive_free_slots(blocks, appointments, duration, step))
+    sweep = best_of(
+        lambda: sweep_free_slots(blocks, merge_intervals(appointments), duration, step)
+    )
+
+    assert sweep * 3 < naive, f"sweep={sweep:.6f}s naive={naive:.6f}s"
+
+
+@pytest.mark.asyncio
+async def test_get_free_slots_with_step_and_appointments(db_session):
+    """Paso configurable independiente de la duración y citas que bloquean slots."""
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="Sweep", email=f"sweep+{uuid4().hex}@example.com"),
+    )
+    treatment = await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"Sweep-{uuid4().hex}", description="x", duration_minutes=30, price=1
+        ),
+    )
+    patient = await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="S",
+            last_name="W",
+            email=f"sw+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+    day = date.today() + timedelta(days=30)
+    db_session.add(
+        TherapistAvailability(
+            therapist_id=therapist.id,
+            weekday=day.strftime("%A").lower(),
+            start_time=time(9, 0),
+            end_time=time(11, 0),
+        )
+    )
+    db_session.add_all(
+        Appointment(
+            patient_id=patient.id,
+            therapist_id=therapist.id,
+            treatment_id=treatment.id,
+            start_time=datetime.combine(day, start),
+            end_time=datetime.combine(day, end),
+            status=status,
+        )
+        for start, end, status in [
+            (time(9, 30), time(10, 0), AppointmentStatus.scheduled),
+            (time(10, 0), time(10, 15), AppointmentStatus.cancelled),
+        ]
+    )
+    await db_session.commit()
+
+    slots = await get_free_slots(db_session, therapist.id, day, 30, step_minutes=15)
+    starts = [slot["start_time"][11:16] for slot in slots]
+    assert starts == ["09:00", "10:00", "10:15", "10:30"]
+
+    # Sin paso explícito, los slots avanzan de 30 en 30 minutos
+    slots = await get_free_slots(db_session, therapist.id, day, 30)
+    assert [slot["start_time"][11:16] for slot in slots] == ["09:00", "10:00", "10:30"]
+
+
+def test_grid_availability_respects_blocks_and_busy():
+    """Un slot está libre solo si un bloque lo cubre y ninguna cita lo solapa."""
+    blocks = merge_intervals([(60, 120), (120, 180), (240, 300)])
+    busy = merge_intervals([(130, 150)])
+
+    slots = grid_availability((0, 300), 30, blocks, busy)
+
+    assert [available for _, _, available in slots] == [
+        False,  # 0-30 sin bloque
+        False,
+        True,  # 60-90
+        True,
+        False,  # 120-150 solapa la cita
+        True,  # 150-180
+        False,  # 180-210 fuera de bloque
+        False,
+        True,  # 240-270
+        True,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_daily_availability_uses_three_queries(db_session):
+    """`get_daily_availability` hace tres consultas y respeta la disponibilidad."""
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="Daily", email=f"daily+{uuid4().hex}@example.com"),
+    )
+    treatment = await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"Daily-{uuid4().hex}", description="x", duration_minutes=30, price=1
+        ),
+    )
+    patient = await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="D",
+            last_name="A",
+            email=f"da+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+    day = date.today() + timedelta(days=31)
+    db_session.add(
+        TherapistAvailability(
+            therapist_id=therapist.id,
+            weekday=day.strftime("%A").lower(),
+            start_time=time(9, 0),
+            end_time=time(11, 0),
+        )
+    )
+    db_session.add(
+        Appointment(
+            patient_id=patient.id,
+            therapist_id=therapist.id,
+            treatment_id=treatment.id,
+            start_time=datetime.combine(day, time(9, 30)),
+            end_time=datetime.combine(day, time(10, 0)),
+        )
+    )
+    await db_session.commit()
+
+    statements = []
+    sync_engine = db_session.bind.sync_engine
+
+    def _count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", _count)
+    try:
+        slots = await get_daily_availability(db_session, therapist.id, day)
+        window = await get_daily_availability(
+            db_session,
+            therapist.id,
+            day,
+            step_minutes=15,
+            window_start=time(8, 45),
+            window_end=time(11, 15),
+        )
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _count)
+
+    assert len(statements) == 6
+    assert len(slots) == 48
+    free = [slot.start for slot in slots if slot.available]
+    assert free == [time(9, 0), time(10, 0), time(10, 30)]
+
+    assert [(slot.start, slot.available) for slot in window] == [
+        (time(8, 45), False),
+        (time(9, 0), True),
+        (time(9, 15), True),
+        (time(9, 30), False),
+        (time(9, 45), False),
+        (time(10, 0), True),
+        (time(10, 15), True),
+        (time(10, 30), True),
+        (time(10, 45), True),
+        (time(11, 0), False),
+    ]
+
+
+def test_availability_endpoint_window_and_step(client):
+    """`GET /availability` acepta paso y ventana y valida que start < end."""
+    params = {"date": "2030-01-07", "therapist_id": str(uuid4())}
+
+    response = client.get(
+        "/availability",
+        params={**params, "step_minutes": 60, "start": "08:00", "end": "12:00"},
+    )
+    assert response.status_code == 200
+    assert [slot["start"] for slot in response.json()] == [
+        "08:00:00",
+        "09:00:00",
+        "10:00:00",
+        "11:00:00",
+    ]
+
+    response = client.get(
+        "/availability", params={**params, "start": "12:00", "end": "08:00"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_find_next_free_slots_across_therapists(db_session):
+    """Busca los primeros slots de varios terapeutas en pocas consultas."""
+    specialty = f"spec-{uuid4().hex}"
+    ana = await create_therapist(
+        db_session,
+        TherapistCreate(
+            name="Ana", specialty=specialty, email=f"ana+{uuid4().hex}@example.com"
+        ),
+    )
+    bea = await create_therapist(
+        db_session,
+        TherapistCreate(
+            name="Bea",
+            specialty=specialty.upper(),
+            email=f"bea+{uuid4().hex}@example.com",
+        ),
+    )
+    other = await create_therapist(
+        db_session,
+        TherapistCreate(name="Otro", email=f"otro+{uuid4().hex}@example.com"),
+    )
+    treatment = await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"Next-{uuid4().hex}", description="x", duration_minutes=60, price=1
+        ),
+    )
+    patient = await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="N",
+            last_name="X",
+            email=f"nx+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+    day = date.today() + timedelta(days=40)
+    next_day = day + timedelta(days=1)
+    for therapist, weekday_day, start, end in [
+        (ana, day, time(9, 0), time(11, 0)),
+        (bea, day, time(10, 0), time(11, 0)),
+        (bea, next_day, time(8, 0), time(9, 0)),
+        (other, day, time(7, 0), time(8, 0)),
+    ]:
+        db_session.add(
+            TherapistAvailability(
+                therapist_id=therapist.id,
+                weekday=weekday_day.strftime("%A").lower(),
+                start_time=start,
+                end_time=end,
+            )
+        )
+    db_session.add(
+        Appointment(
+            patient_id=patient.id,
+            therapist_id=ana.id,
+            treatment_id=treatment.id,
+            start_time=datetime.combine(day, time(9, 0)),
+            end_time=datetime.combine(day, time(10, 0)),
+        )
+    )
+    await db_session.commit()
+
+    statements = []
+    sync_engine = db_session.bind.sync_engine
+
+    def _count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", _count)
+    try:
+        slots = await find_next_free_slots(
+            db_session, 60, day, next_day, specialty=specialty, limit=5
+        )
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _count)
+
+    assert len(statements) == 4
+    assert [(s["therapist_name"], s["start_time"][11:16]) for s in slots] == [
+        ("Ana", "10:00"),
+        ("Bea", "10:00"),
+        ("Bea", "08:00"),
+    ]
+    assert slots[2]["start_time"].startswith(next_day.isoformat())
+
+    # Con límite se detiene en el primer día que ya lo cubre
+    slots = await find_next_free_slots(
+        db_session, 60, day, next_day, specialty=specialty, limit=1
+    )
+    assert [s["therapist_id"] for s in slots] == [ana.id]
+
+    # Filtro por terapeuta y corte temporal
+    slots = await find_next_free_slots(
+        db_session,
+        60,
+        day,
+        next_day,
+        therapist_ids=[bea.id],
+        step_minutes=30,
+        not_before=datetime.combine(day, time(10, 30)),
+    )
+    assert [s["start_time"] for s in slots] == [
+        datetime.combine(next_day, time(8, 0)).isoformat()
+    ]
+
+
+def test_next_free_slots_endpoint_validates_window(client):
+    """`GET /free-slots/next` valida la ventana de fechas y el tratamiento."""
+    params = {"treatment_id": str(uuid4())}
+
+    response = client.get(
+        "/free-slots/next",
+        params={**params, "start_date": "2030-01-10", "end_date": "2030-01-01"},
+    )
+    assert response.status_code == 400
+
+    response = client.get(
+        "/free-slots/next",
+        params={**params, "start_date": "2030-01-01", "end_date": "2030-12-31"},
+    )
+    assert response.status_code == 400
+
+    response = client.get("/free-slots/next", params=params)
+    assert response.status_code == 404
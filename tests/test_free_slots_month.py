@@ -0,0 +1,197 @@
+"""Tests del resumen mensual de slots libres para el selector de calendario."""
+
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event
+
+from app.core.slot_holds import InMemorySlotHoldBackend, slot_holds
+from app.models.appointment import Appointment
+from app.schemas.availability import AvailabilityCreate, AvailabilityExceptionCreate
+from app.schemas.patient import PatientCreate
+from app.schemas.therapist import TherapistCreate
+from app.schemas.treatment import TreatmentCreate
+from app.services.appointment_service import group_session_key
+from app.services.availability_service import (
+    create_availability,
+    create_availability_exception,
+)
+from app.services.free_slot_service import count_free_slots_by_date, get_free_slots
+from app.services.patient_service import create_patient
+from app.services.slot_calendar_service import refresh_for_appointment
+from app.services.therapist_service import create_therapist
+from app.services.treatment_service import create_treatment
+
+
+def _next_month(today: date) -> tuple[date, date]:
+    first = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+    last = (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    return first, last
+
+
+async def _setup(db_session, monkeypatch):
+    monkeypatch.setattr(slot_holds, "backend", InMemorySlotHoldBackend())
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="Month", email=f"month+{uuid4().hex}@example.com"),
+    )
+    for weekday, start, end in [
+        ("Monday", time(9), time(13)),
+        ("Wednesday", time(15), time(19)),
+    ]:
+        await create_availability(
+            db_session,
+            therapist.id,
+            AvailabilityCreate(weekday=weekday, start_time=start, end_time=end),
+        )
+    patient = await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="M",
+            last_name="O",
+            email=f"mo+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+    treatments = {}
+    for capacity in (1, 4):
+        treatments[capacity] = await create_treatment(
+            db_session,
+            TreatmentCreate(
+                name=f"Month-{uuid4().hex}",
+                description="x",
+                duration_minutes=45,
+                price=1,
+                capacity=capacity,
+            ),
+        )
+    return therapist, patient, treatments
+
+
+def _weekday(first: date, weekday: int, week: int) -> date:
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * week)
+
+
+async def _fill(db_session, therapist, patient, treatments, first):
+    """Citas, una clase a medias, una excepción y una retención en el mes."""
+    monday, wednesday = _weekday(first, 0, 0), _weekday(first, 2, 1)
+    single, group = treatments[1], treatments[4]
+    rows = [
+        (single, datetime.combine(monday, time(10, 7)), 45),
+        (single, datetime.combine(wednesday, time(16)), 90),
+    ]
+    group_start = datetime.combine(_weekday(first, 0, 1), time(9))
+    rows += [(group, group_start, 45)] * 2
+    spans = []
+    for treatment, start, minutes in rows:
+        end = start + timedelta(minutes=minutes)
+        spans.append((start, end))
+        db_session.add(
+            Appointment(
+                patient_id=patient.id,
+                therapist_id=therapist.id,
+                treatment_id=treatment.id,
+                start_time=start,
+                end_time=end,
+                session_key=(
+                    group_session_key(therapist.id, treatment.id, start, end)
+                    if treatment.capacity > 1
+                    else None
+                ),
+            )
+        )
+    await db_session.flush()
+    # Inserted directly, so the materialized days are rebuilt by hand
+    await refresh_for_appointment(db_session, therapist.id, *spans)
+    await db_session.commit()
+    await create_availability_exception(
+        db_session,
+        therapist.id,
+        AvailabilityExceptionCreate(
+            start_time=datetime.combine(_weekday(first, 0, 2), time(11)),
+            end_time=datetime.combine(_weekday(first, 2, 2), time(17)),
+        ),
+    )
+    hold_start = datetime.combine(_weekday(first, 2, 0), time(15, 30))
+    await slot_holds.place(
+        db_session,
+        patient.id,
+        therapist.id,
+        single.id,
+        hold_start,
+        hold_start + timedelta(minutes=45),
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("capacity", [1, 4])
+async def test_month_counts_match_free_slots(db_session, monkeypatch, capacity):
+    """Cada día del mes cuenta los mismos slots que /free-slots/ lista."""
+    therapist, patient, treatments = await _setup(db_session, monkeypatch)
+    first, last = _next_month(date.today())
+    await _fill(db_session, therapist, patient, treatments, first)
+    treatment = treatments[capacity]
+
+    statements = []
+    sync_engine = db_session.bind.sync_engine
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", _count)
+    try:
+        counts = await count_free_slots_by_date(
+            db_session,
+            therapist.id,
+            first,
+            last,
+            45,
+            15,
+            treatment_id=treatment.id,
+            capacity=capacity,
+        )
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _count)
+    # Availability, appointments and exceptions; holds are kept in memory
+    assert len(statements) == 3
+
+    assert list(counts) == [
+        first + timedelta(days=n) for n in range((last - first).days + 1)
+    ]
+    for day, count in counts.items():
+        slots = await get_free_slots(
+            db_session,
+            therapist.id,
+            day,
+            45,
+            15,
+            treatment_id=treatment.id,
+            capacity=capacity,
+        )
+        assert count == len(slots), day
+    assert any(counts.values()) and not all(counts.values())
+
+
+@pytest.mark.asyncio
+async def test_month_endpoint(client, db_session, monkeypatch):
+    """El endpoint devuelve un recuento por fecha y valida el mes."""
+    therapist, patient, treatments = await _setup(db_session, monkeypatch)
+    first, last = _next_month(date.today())
+    params = {
+        "therapist_id": str(therapist.id),
+        "treatment_id": str(treatments[1].id),
+    }
+    resp = client.get(
+        "/free-slots/month", params={**params, "month": first.strftime("%Y-%m")}
+    )
+    assert resp.status_code == 200
+    days = resp.json()
+    assert days[0]["date"] == first.isoformat()
+    assert days[-1]["date"] == last.isoformat()
+    monday = _weekday(first, 0, 0).isoformat()
+    listed = client.get("/free-slots/", params={**params, "day": monday}).json()
+    assert {"date": monday, "slots": len(listed)} in days
+
+    resp = client.get("/free-slots/month", params={**params, "month": "2026-13"})
+    assert resp.status_code == 400
@@ -0,0 +1,453 @@
+"""Tests de sesiones en grupo: capacidad por tratamiento y plazas libres."""
+
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from app.core.slot_holds import InMemorySlotHoldBackend, slot_holds
+from app.models.appointment import Appointment
+from app.schemas.appointment import (
+    AppointmentBatchItem,
+    AppointmentCreate,
+    AppointmentSeriesCreate,
+    AppointmentUpdate,
+    SlotHoldCreate,
+)
+from app.schemas.availability import AvailabilityCreate
+from app.schemas.patient import PatientCreate
+from app.schemas.therapist import TherapistCreate
+from app.schemas.treatment import TreatmentCreate
+from app.services import appointment_service
+from app.services.appointment_batch_service import (
+    create_appointment_batch,
+    validate_bookings,
+)
+from app.services.appointment_series_service import create_appointment_series
+from app.services.appointment_service import (
+    count_overlapping,
+    create_appointment,
+    group_session_key,
+    has_conflict,
+    update_appointment,
+)
+from app.services.availability_service import create_availability
+from app.services.free_slot_service import find_next_free_slots, get_free_slots
+from app.services.patient_service import create_patient
+from app.services.slot_hold_service import confirm_hold, hold_slot
+from app.services.therapist_service import create_therapist
+from app.services.treatment_service import create_treatment
+
+
+async def _treatment(db_session, capacity, duration=60):
+    return await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"Group-{uuid4().hex}",
+            description="x",
+            duration_minutes=duration,
+            price=1,
+            capacity=capacity,
+        ),
+    )
+
+
+async def _patient(db_session):
+    return await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="G",
+            last_name="S",
+            email=f"gs+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+
+
+async def _setup(db_session, days_ahead=9):
+    day = date.today() + timedelta(days=days_ahead)
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="Group", email=f"group+{uuid4().hex}@example.com"),
+    )
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(
+            weekday=day.strftime("%A"), start_time=time(9), end_time=time(12)
+        ),
+    )
+    return therapist, day
+
+
+async def _book(db_session, therapist, treatment, start, patient=None):
+    patient = patient or await _patient(db_session)
+    return await create_appointment(
+        db_session,
+        patient.id,
+        AppointmentCreate(
+            therapist_id=therapist.id, treatment_id=treatment.id, start_time=start
+        ),
+        BackgroundTasks(),
+    )
+
+
+def _seats(slots):
+    return [(slot["start_time"][11:16], slot["seats"]) for slot in slots]
+
+
+@pytest.fixture(autouse=True)
+def _no_notifications(monkeypatch):
+    async def _skip(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(appointment_service, "send_appointment", _skip)
+    monkeypatch.setattr(appointment_service, "send_push_to_user", _skip)
+
+
+@pytest.mark.asyncio
+async def test_group_session_fills_up_to_capacity(db_session):
+    """Una clase admite tantos pacientes como su capacidad y nada la solapa."""
+    therapist, day = await _setup(db_session)
+    pilates = await _treatment(db_session, capacity=3)
+    single = await _treatment(db_session, capacity=1)
+    start = datetime.combine(day, time(10))
+
+    seats = [await _book(db_session, therapist, pilates, start) for _ in range(3)]
+    # The one-to-one attempt fails on flush and rolls the session back
+    ids = (seats[0].patient_id, therapist.id, single.id)
+    assert len({seat.session_key for seat in seats}) == 1
+    assert seats[0].session_key == group_session_key(
+        therapist.id, pilates.id, start, start + timedelta(hours=1)
+    )
+    assert await count_overlapping(
+        db_session, therapist.id, start, start + timedelta(hours=1), pilates.id
+    ) == (3, 3)
+
+    for treatment, begins in [
+        (pilates, start),  # full
+        (pilates, start + timedelta(minutes=30)),  # another session, overlapping
+        (single, start + timedelta(minutes=30)),  # one-to-one, overlapping
+    ]:
+        with pytest.raises(HTTPException) as exc:
+            await _book(db_session, therapist, treatment, begins)
+        assert exc.value.status_code == 400
+
+    # Rows that skip the service still cannot overlap a session they are not in
+    patient_id, therapist_id, single_id = ids
+    intruder = Appointment(
+        patient_id=patient_id,
+        therapist_id=therapist_id,
+        treatment_id=single_id,
+        start_time=start,
+        end_time=start + timedelta(hours=1),
+    )
+    db_session.add(intruder)
+    with pytest.raises(IntegrityError):
+        await db_session.flush()
+    await db_session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_one_to_one_conflicts_are_unchanged(db_session):
+    """Sin capacidad, cualquier solape sigue siendo conflicto."""
+    therapist, day = await _setup(db_session)
+    single = await _treatment(db_session, capacity=1)
+    start = datetime.combine(day, time(9))
+    booked = await _book(db_session, therapist, single, start)
+    assert booked.session_key is None
+    end = start + timedelta(hours=1)
+    assert await has_conflict(db_session, therapist.id, start, end)
+    assert await has_conflict(
+        db_session, therapist.id, start, end, treatment_id=single.id
+    )
+    assert not await has_conflict(db_session, therapist.id, start, end, booked.id)
+
+
+@pytest.mark.asyncio
+async def test_free_slots_report_remaining_seats(db_session):
+    """Los slots de una clase indican las plazas que quedan."""
+    therapist, day = await _setup(db_session)
+    pilates = await _treatment(db_session, capacity=3)
+    other = await _treatment(db_session, capacity=2)
+
+    def _slots(treatment, step=None):
+        return get_free_slots(
+            db_session,
+            therapist.id,
+            day,
+            60,
+            step,
+            treatment_id=treatment.id,
+            capacity=treatment.capacity,
+        )
+
+    assert _seats(await _slots(pilates)) == [("09:00", 3), ("10:00", 3), ("11:00", 3)]
+    await _book(db_session, therapist, pilates, datetime.combine(day, time(10)))
+    assert _seats(await _slots(pilates)) == [("09:00", 3), ("10:00", 2), ("11:00", 3)]
+    # Another class cannot share the session, nor can slots that overlap it
+    assert _seats(await _slots(other)) == [("09:00", 2), ("11:00", 2)]
+    assert _seats(await _slots(pilates, step=30)) == [
+        ("09:00", 3),
+        ("10:00", 2),
+        ("11:00", 3),
+    ]
+    # One-to-one lookups keep seeing the session as busy
+    one_to_one = await get_free_slots(db_session, therapist.id, day, 60)
+    assert [slot["start_time"][11:16] for slot in one_to_one] == ["09:00", "11:00"]
+
+    for _ in range(2):
+        await _book(db_session, therapist, pilates, datetime.combine(day, time(10)))
+    assert _seats(await _slots(pilates)) == [("09:00", 3), ("11:00", 3)]
+
+
+@pytest.mark.asyncio
+async def test_next_free_slots_offer_seats_in_partly_filled_classes(db_session):
+    """La búsqueda de próximos huecos ofrece las plazas libres de una clase."""
+    therapist, day = await _setup(db_session)
+    pilates = await _treatment(db_session, capacity=3)
+    other = await _treatment(db_session, capacity=2)
+    await _book(db_session, therapist, pilates, datetime.combine(day, time(10)))
+
+    def _next(treatment):
+        return find_next_free_slots(
+            db_session,
+            60,
+            day,
+            day,
+            therapist_ids=[therapist.id],
+            treatment_id=treatment.id,
+            capacity=treatment.capacity,
+        )
+
+    pilates_slots = await _next(pilates)
+    assert _seats(pilates_slots) == [("09:00", 3), ("10:00", 2), ("11:00", 3)]
+    assert _seats(pilates_slots) == _seats(
+        await get_free_slots(
+            db_session,
+            therapist.id,
+            day,
+            60,
+            treatment_id=pilates.id,
+            capacity=pilates.capacity,
+        )
+    )
+    assert _seats(await _next(other)) == [("09:00", 2), ("11:00", 2)]
+    one_to_one = await find_next_free_slots(
+        db_session, 60, day, day, therapist_ids=[therapist.id]
+    )
+    assert [slot["start_time"][11:16] for slot in one_to_one] == ["09:00", "11:00"]
+    assert "seats" not in one_to_one[0]
+
+    # Slots already started are skipped; the class still has room
+    not_before = datetime.combine(day, time(9, 30))
+    later = await find_next_free_slots(
+        db_session,
+        60,
+        day,
+        day,
+        therapist_ids=[therapist.id],
+        not_before=not_before,
+        treatment_id=pilates.id,
+        capacity=pilates.capacity,
+    )
+    assert _seats(later) == [("10:00", 2), ("11:00", 3)]
+
+
+@pytest.mark.asyncio
+async def test_moved_seat_joins_the_session_at_its_new_time(db_session):
+    """Mover una plaza la une a la sesión del nuevo horario."""
+    therapist, day = await _setup(db_session)
+    pilates = await _treatment(db_session, capacity=2)
+    nine = datetime.combine(day, time(9))
+    eleven = datetime.combine(day, time(11))
+    await _book(db_session, therapist, pilates, eleven)
+    seat = await _book(db_session, therapist, pilates, nine)
+
+    moved = await update_appointment(
+        db_session,
+        seat,
+        AppointmentUpdate(start_time=eleven, end_time=eleven + timedelta(hours=1)),
+    )
+    assert moved.session_key == group_session_key(
+        therapist.id, pilates.id, eleven, eleven + timedelta(hours=1)
+    )
+    with pytest.raises(HTTPException):
+        await _book(db_session, therapist, pilates, eleven)
+
+
+@pytest.mark.asyncio
+async def test_booking_a_seat_costs_the_same_queries_when_nearly_full(db_session):
+    """Reservar la décima plaza cuesta las mismas consultas que la primera."""
+    therapist, day = await _setup(db_session, days_ahead=11)
+    pilates = await _treatment(db_session, capacity=10)
+    start = datetime.combine(day, time(9))
+    patients = [await _patient(db_session) for _ in range(10)]
+
+    statements = []
+    sync_engine = db_session.bind.sync_engine
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    counts = []
+    for patient in patients:
+        statements.clear()
+        event.listen(sync_engine, "before_cursor_execute", _count)
+        try:
+            await _book(db_session, therapist, pilates, start, patient)
+        finally:
+            event.remove(sync_engine, "before_cursor_execute", _count)
+        counts.append(len(statements))
+    assert len(set(counts)) == 1
+    seat_checks = [s for s in statements if "count(" in s.lower()]
+    assert len(seat_checks) == 1
+
+
+@pytest.mark.asyncio
+async def test_series_takes_seats_in_partly_filled_classes(db_session):
+    """Una serie ocupa plazas libres de una clase y sus sesiones admiten más."""
+    therapist, day = await _setup(db_session, days_ahead=12)
+    pilates = await _treatment(db_session, capacity=3)
+    start = datetime.combine(day, time(10))
+    hour = timedelta(hours=1)
+    for _ in range(2):
+        await _book(db_session, therapist, pilates, start)
+
+    def _series(patient):
+        return create_appointment_series(
+            db_session,
+            patient.id,
+            AppointmentSeriesCreate(
+                therapist_id=therapist.id,
+                treatment_id=pilates.id,
+                start_time=start,
+                occurrences=3,
+            ),
+            BackgroundTasks(),
+        )
+
+    series = await _series(await _patient(db_session))
+    assert series["skipped"] == []
+    assert [seat.session_key for seat in series["booked"]] == [
+        group_session_key(therapist.id, pilates.id, begins, begins + hour)
+        for begins in (start + timedelta(weeks=week) for week in range(3))
+    ]
+    assert await count_overlapping(
+        db_session, therapist.id, start, start + hour, pilates.id
+    ) == (3, 3)
+
+    # Later seats join the sessions the series opened
+    next_week = start + timedelta(weeks=1)
+    seat = await _book(db_session, therapist, pilates, next_week)
+    assert seat.session_key == series["booked"][1].session_key
+
+    # The first class is now full
+    with pytest.raises(HTTPException) as exc:
+        await _series(await _patient(db_session))
+    assert exc.value.status_code == 409
+    assert [o["reason"] for o in exc.value.detail["occurrences"]] == ["conflict"]
+
+
+@pytest.mark.asyncio
+async def test_batch_fills_the_seats_left_in_a_class(db_session):
+    """Un lote reserva las plazas que quedan y rechaza las que sobran."""
+    therapist, day = await _setup(db_session, days_ahead=13)
+    pilates = await _treatment(db_session, capacity=3)
+    single = await _treatment(db_session, capacity=1)
+    start = datetime.combine(day, time(10))
+    await _book(db_session, therapist, pilates, start)
+    patients = [(await _patient(db_session)).id for _ in range(4)]
+
+    def _item(patient_id, treatment, begins):
+        return AppointmentBatchItem(
+            patient_id=patient_id,
+            therapist_id=therapist.id,
+            treatment_id=treatment.id,
+            start_time=begins,
+        )
+
+    results = await create_appointment_batch(
+        db_session,
+        [
+            _item(patients[0], pilates, start),
+            _item(patients[1], pilates, start),
+            _item(patients[2], pilates, start),
+            _item(patients[3], single, start + timedelta(minutes=30)),
+            _item(patients[3], pilates, start + timedelta(hours=1)),
+        ],
+    )
+    assert [result["status"] for result in results] == [
+        "created",
+        "created",
+        "batch_conflict",
+        "conflict",
+        "created",
+    ]
+    booked = [
+        await db_session.get(Appointment, results[i]["appointment_id"]) for i in (0, 4)
+    ]
+    assert booked[0].session_key == group_session_key(
+        therapist.id, pilates.id, start, start + timedelta(hours=1)
+    )
+    assert booked[1].session_key is not None
+    assert await count_overlapping(
+        db_session, therapist.id, start, start + timedelta(hours=1), pilates.id
+    ) == (3, 3)
+    with pytest.raises(HTTPException):
+        await _book(db_session, therapist, pilates, start)
+
+
+@pytest.mark.asyncio
+async def test_hold_takes_one_seat_of_a_class(db_session, monkeypatch):
+    """Retener una plaza de una clase deja reservables las demás."""
+    monkeypatch.setattr(slot_holds, "backend", InMemorySlotHoldBackend())
+    therapist, day = await _setup(db_session, days_ahead=15)
+    pilates = await _treatment(db_session, capacity=3)
+    start = datetime.combine(day, time(10))
+    end = start + timedelta(hours=1)
+    holder, late = await _patient(db_session), await _patient(db_session)
+
+    def _hold(patient):
+        return hold_slot(
+            db_session,
+            patient.id,
+            SlotHoldCreate(
+                therapist_id=therapist.id, treatment_id=pilates.id, start_time=start
+            ),
+        )
+
+    hold = await _hold(holder)
+    slots = await get_free_slots(
+        db_session, therapist.id, day, 60, treatment_id=pilates.id, capacity=3
+    )
+    assert _seats(slots) == [("09:00", 3), ("10:00", 2), ("11:00", 3)]
+    # One-to-one lookups still see the held hour as taken
+    one_to_one = await get_free_slots(db_session, therapist.id, day, 60)
+    assert [slot["start_time"][11:16] for slot in one_to_one] == ["09:00", "11:00"]
+
+    await _book(db_session, therapist, pilates, start)
+    await _hold(await _patient(db_session))
+    # One seat booked and two held: the class looks full to everyone else
+    slots = await get_free_slots(
+        db_session, therapist.id, day, 60, treatment_id=pilates.id, capacity=3
+    )
+    assert _seats(slots) == [("09:00", 3), ("11:00", 3)]
+    with pytest.raises(HTTPException) as exc:
+        await _book(db_session, therapist, pilates, start, late)
+    assert exc.value.status_code == 409
+    with pytest.raises(HTTPException) as exc:
+        await _hold(late)
+    assert exc.value.status_code == 409
+    assert await validate_bookings(
+        db_session, [(therapist.id, start, end)], late.id, [pilates]
+    ) == ["held"]
+
+    seat = await confirm_hold(db_session, holder.id, hold.id, BackgroundTasks())
+    assert seat.session_key == group_session_key(therapist.id, pilates.id, start, end)
+    assert await count_overlapping(
+        db_session, therapist.id, start, end, pilates.id
+    ) == (2, 2)
@@ -139,7 +139,7 @@ async def test_list_patient_invoices(client, db_session, monkeypatch):
 
     # Simular paciente
     def fake_patient():
-        return {"id": patient.id, "role": "patient"}
+        return {"id": patient.supabase_user_id, "role": "patient"}
 
     monkeypatch.setattr(security, "get_current_user", fake_patient)
 
@@ -205,7 +205,7 @@ async def test_get_invoice_by_id(client, db_session, monkeypatch):
     invoice = await create_invoice_for_appointment(db_session, appt)
 
     def fake_patient():
-        return {"id": patient.id, "role": "patient"}
+        return {"id": patient.supabase_user_id, "role": "patient"}
 
     monkeypatch.setattr(security, "get_current_user", fake_patient)
 
@@ -273,7 +273,7 @@ async def test_mark_invoice_paid_as_admin(client, db_session, monkeypatch):
 
     # Paciente NO debe poder marcar como pagado
     def fake_patient():
-        return {"id": patient.id, "role": "patient"}
+        return {"id": patient.supabase_user_id, "role": "patient"}
 
     _app.dependency_overrides[security.get_current_user] = fake_patient
     resp = client.post(f"/invoices/{invoice.id}/mark-paid")
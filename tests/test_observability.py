@@ -0,0 +1,148 @@
+"""Tests de métricas de latencia de autenticación y logs estructurados."""
+
+import json
+import logging
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.core import observability, security
+from app.main import app
+
+
+def _hs256_token(**claims) -> str:
+    payload = {"sub": "user-obs", "exp": int(time.time()) + 60, **claims}
+    return jwt.encode(payload, security.settings.supabase_secret_key, "HS256")
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture()
+def captured_logger():
+    logger = logging.getLogger("tests.observability")
+    handler = _ListHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    yield logger, handler.records
+    logger.removeHandler(handler)
+
+
+def test_histogram_renders_cumulative_buckets():
+    """El histograma exporta buckets acumulados, suma y conteo por etiqueta."""
+    histogram = observability.Histogram(
+        "test_seconds", "Test", "stage", buckets=(0.1, 1.0)
+    )
+    histogram.observe("a", 0.05)
+    histogram.observe("a", 0.5)
+    histogram.observe("a", 5)
+
+    lines = histogram.render()
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="a"} 3' in lines
+    assert histogram.snapshot()["a"]["count"] == 3
+
+
+def test_timed_span_records_into_request_trace():
+    """Cada tramo medido se añade a la traza de la petición en curso."""
+    histogram = observability.Histogram("span_seconds", "Test", "stage")
+    token = observability.request_spans.set([])
+    try:
+        with observability.timed_span("auth.test", histogram, "test"):
+            pass
+        spans = observability.request_spans.get()
+    finally:
+        observability.request_spans.reset(token)
+
+    assert [name for name, _ in spans] == ["auth.test"]
+    assert histogram.snapshot()["test"]["count"] == 1
+    assert observability.server_timing_header(spans).startswith("auth.test;dur=")
+
+
+def test_log_event_sampling(captured_logger):
+    """Con muestreo 0 no se emite nada; con 1 siempre se emite con sus campos."""
+    logger, records = captured_logger
+    for _ in range(50):
+        observability.log_event(logger, "skipped", sample_rate=0.0)
+    observability.log_event(logger, "kept", sub="abc")
+
+    assert [r.getMessage() for r in records] == ["kept"]
+    line = json.loads(observability._JSONFormatter().format(records[0]))
+    assert line["event"] == "kept"
+    assert line["sub"] == "abc"
+
+
+@pytest.mark.asyncio
+async def test_auth_logs_never_include_token_payload(monkeypatch):
+    """Los eventos de autenticación no incluyen el payload ni claims sensibles."""
+    events = []
+    monkeypatch.setattr(
+        security,
+        "log_event",
+        lambda logger, event, level=logging.INFO, sample_rate=1.0, **fields: (
+            events.append((event, fields))
+        ),
+    )
+
+    token = _hs256_token(email="secret@example.com", user_metadata={"x": 1})
+    await security._verify_token(token)
+    with pytest.raises(Exception):
+        await security._verify_token(token[:-4] + "AAAA")
+
+    assert [event for event, _ in events] == ["token_verified", "token_rejected"]
+    for _, fields in events:
+        assert set(fields) <= {"alg", "kid", "sub", "reason"}
+        assert "secret@example.com" not in json.dumps(fields)
+
+
+def test_request_exposes_server_timing_and_metrics(monkeypatch):
+    """Una petición autenticada expone Server-Timing y alimenta /metrics."""
+    monkeypatch.setattr(app, "dependency_overrides", {})
+    security.TOKEN_CACHE.clear()
+
+    with TestClient(app) as tc:
+        response = tc.get(
+            "/admin/circuit-breakers",
+            headers={"Authorization": f"Bearer {_hs256_token(role='patient')}"},
+        )
+        metrics = tc.get(
+            "/metrics",
+            headers={"Authorization": f"Bearer {_hs256_token(role='admin')}"},
+        )
+
+    assert response.status_code == 403
+    timing = response.headers["Server-Timing"]
+    for stage in ("auth.bearer", "auth.token_cache", "auth.header", "auth.hs256"):
+        assert f"{stage};dur=" in timing
+
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert 'auth_stage_seconds_bucket{stage="hs256",le="+Inf"}' in metrics.text
+    assert "auth_token_cache_misses_total" in metrics.text
+
+
+def test_metrics_require_admin(monkeypatch):
+    """/metrics rechaza peticiones anónimas y de usuarios que no son admin."""
+    monkeypatch.setattr(app, "dependency_overrides", {})
+    security.TOKEN_CACHE.clear()
+
+    with TestClient(app) as tc:
+        anonymous = tc.get("/metrics")
+        patient = tc.get(
+            "/metrics",
+            headers={"Authorization": f"Bearer {_hs256_token(role='patient')}"},
+        )
+
+    assert anonymous.status_code in (401, 403)
+    assert "auth_stage_seconds" not in anonymous.text
+    assert patient.status_code == 403
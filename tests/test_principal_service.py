@@ -0,0 +1,111 @@
+"""Tests para la resolución de usuario autenticado → perfil (Principal)."""
+
+from uuid import uuid4
+
+import pytest
+
+from app.schemas.patient import PatientCreate, PatientUpdate
+from app.schemas.therapist import TherapistCreate
+from app.services.patient_service import create_patient, update_patient
+from app.services.principal_service import PRINCIPAL_CACHE, resolve_principal
+from app.services.therapist_service import create_therapist, update_therapist
+
+
+@pytest.mark.asyncio
+async def test_resolve_patient_principal_is_cached(db_session, monkeypatch):
+    patient = await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="Pri",
+            last_name="Cipal",
+            email=f"pr+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4(),
+        ),
+    )
+    user = {"id": str(patient.supabase_user_id), "role": "patient"}
+
+    principal = await resolve_principal(db_session, user)
+    assert principal.profile_id == patient.id
+    assert principal.active is True
+
+    async def _no_db(*args, **kwargs):
+        raise AssertionError("cached principal should not hit the database")
+
+    monkeypatch.setattr(db_session, "execute", _no_db)
+    again = await resolve_principal(db_session, user)
+    assert again == principal
+
+
+@pytest.mark.asyncio
+async def test_update_patient_invalidates_principal(db_session):
+    patient = await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="Inv",
+            last_name="Alid",
+            email=f"inv+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4(),
+        ),
+    )
+    user = {"id": str(patient.supabase_user_id), "role": "patient"}
+    await resolve_principal(db_session, user)
+    assert PRINCIPAL_CACHE.get(user["id"]) is not None
+
+    await update_patient(db_session, patient, PatientUpdate(phone="600000000"))
+    assert PRINCIPAL_CACHE.get(user["id"]) is None
+
+
+@pytest.mark.asyncio
+async def test_therapist_principal_tracks_active_flag(db_session):
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(
+            name="Act",
+            email=f"act+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4(),
+        ),
+    )
+    user = {"id": str(therapist.supabase_user_id), "role": "therapist"}
+    principal = await resolve_principal(db_session, user)
+    assert principal.profile_id == therapist.id
+    assert principal.active is True
+
+    await update_therapist(
+        db_session, therapist, TherapistCreate(name="Act", active=False)
+    )
+    principal = await resolve_principal(db_session, user)
+    assert principal.active is False
+
+
+@pytest.mark.asyncio
+async def test_missing_profile_is_not_cached(db_session):
+    user = {"id": str(uuid4()), "role": "patient"}
+    principal = await resolve_principal(db_session, user)
+    assert principal.profile_id is None
+    assert PRINCIPAL_CACHE.get(user["id"]) is None
+
+
+@pytest.mark.asyncio
+async def test_admin_without_profile_is_cached(db_session, monkeypatch):
+    user = {"id": str(uuid4()), "role": "admin"}
+    principal = await resolve_principal(db_session, user)
+    assert principal.profile_id is None
+
+    async def _no_db(*args, **kwargs):
+        raise AssertionError("cached admin should not hit the database")
+
+    with monkeypatch.context() as m:
+        m.setattr(db_session, "execute", _no_db)
+        assert await resolve_principal(db_session, user) == principal
+
+    # Creating a therapist profile for the admin drops the cached miss
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(
+            name="Adm",
+            email=f"adm+{uuid4().hex}@example.com",
+            supabase_user_id=user["id"],
+        ),
+    )
+    principal = await resolve_principal(db_session, user)
+    assert principal.profile_id == therapist.id
@@ -0,0 +1,288 @@
+"""Regresión de planes de consulta: las consultas calientes no recorren tablas.
+
+Cada test ejecuta funciones reales de los servicios sobre una base sembrada,
+captura las sentencias que emiten y pide su plan con EXPLAIN. Falla si alguna
+hace un recorrido secuencial de una tabla caliente.
+"""
+
+import random
+import re
+from contextlib import asynccontextmanager
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, insert, text
+
+from app.core.slot_holds import DatabaseSlotHoldBackend
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.availability_exception import AvailabilityException
+from app.models.invoice import Invoice
+from app.models.slot_hold import SlotHold
+from app.models.therapist_availability import TherapistAvailability
+from app.services.appointment_service import (
+    get_daily_availability,
+    has_conflict,
+    is_within_availability,
+    list_patient_appointments,
+    list_therapist_appointments,
+)
+from app.services.free_slot_service import (
+    find_next_free_slots,
+    get_free_slots,
+    load_schedule,
+)
+from app.services.invoice_service import list_patient_invoices
+
+HOT_TABLES = (
+    "appointments",
+    "therapist_availability",
+    "invoices",
+    "free_intervals",
+    "slot_holds",
+    "availability_exceptions",
+)
+SEED_THERAPISTS = 40
+SEED_APPOINTMENTS_PER_THERAPIST = 50
+
+
+def sequential_scans(dialect: str, plan: list[str]) -> list[str]:
+    """Plan lines that read a hot table without an index."""
+    if dialect == "postgresql":
+        pattern = re.compile(rf"Seq Scan on ({'|'.join(HOT_TABLES)})\b")
+    else:
+        # SQLite: "SCAN t" is a table scan, "SEARCH t USING INDEX" is not.
+        # A full index scan ("SCAN t USING INDEX") still reads every row.
+        pattern = re.compile(rf"\bSCAN ({'|'.join(HOT_TABLES)})\b")
+    return [line for line in plan if pattern.search(line)]
+
+
+async def explain(db, statement: str, parameters) -> list[str]:
+    conn = await db.connection()
+    if conn.dialect.name == "postgresql":
+        # With sequential scans priced out, a Seq Scan means no usable index
+        await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        return [row[0] for row in result.all()]
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return [row[-1] for row in result.all()]
+
+
+@asynccontextmanager
+async def captured_queries(db):
+    """Collect (statement, parameters) of the SELECTs run inside the block."""
+    captured = []
+    sync_engine = db.bind.sync_engine
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(sync_engine, "before_cursor_execute", _capture)
+    try:
+        yield captured
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _capture)
+
+
+async def assert_no_sequential_scans(db, captured):
+    assert captured, "no queries were captured"
+    dialect = db.bind.dialect.name
+    for statement, parameters in captured:
+        plan = await explain(db, statement, parameters)
+        scans = sequential_scans(dialect, plan)
+        assert not scans, f"sequential scan in:\n{statement}\nplan: {plan}"
+
+
+@pytest_asyncio.fixture()
+async def seeded(db_session):
+    """Therapists with availability, time off, appointments and invoices; ANALYZE."""
+    rng = random.Random(16)
+    therapist_ids = [uuid4() for _ in range(SEED_THERAPISTS)]
+    patient_ids = [uuid4() for _ in range(SEED_THERAPISTS * 5)]
+    treatment_id = uuid4()
+    start = datetime.combine(date.today() + timedelta(days=120), time(8))
+
+    availability = [
+        {
+            "therapist_id": therapist_id,
+            "day_of_week": day_of_week,
+            "start_minute": 9 * 60,
+            "end_minute": 17 * 60,
+        }
+        for therapist_id in therapist_ids
+        for day_of_week in range(5)
+    ]
+    appointments = []
+    for therapist_id in therapist_ids:
+        for n in range(SEED_APPOINTMENTS_PER_THERAPIST):
+            # One appointment per therapist and hour, so none overlap
+            begins = start + timedelta(hours=n)
+            appointments.append(
+                {
+                    "id": uuid4(),
+                    "patient_id": rng.choice(patient_ids),
+                    "therapist_id": therapist_id,
+                    "treatment_id": treatment_id,
+                    "start_time": begins,
+                    "end_time": begins + timedelta(minutes=45),
+                    "status": rng.choice(list(AppointmentStatus)),
+                }
+            )
+    invoices = [
+        {"appointment_id": row["id"], "amount": 30}
+        for row in appointments
+        if rng.random() < 0.5
+    ]
+    holds = [
+        {
+            "therapist_id": row["therapist_id"],
+            "patient_id": row["patient_id"],
+            "treatment_id": treatment_id,
+            "start_time": row["start_time"],
+            "end_time": row["end_time"],
+            "expires_at": start + timedelta(minutes=rng.randrange(-10, 10)),
+        }
+        for row in appointments
+        if rng.random() < 0.2
+    ]
+    # A year of past time off per therapist, and clinic-wide holidays before
+    # today so they do not close days other tests book. Lookups must only
+    # read the rows ending after the queried day
+    exceptions = [
+        {
+            "therapist_id": therapist_id,
+            "start_time": start - timedelta(days=days),
+            "end_time": start - timedelta(days=days, hours=-2),
+        }
+        for therapist_id in therapist_ids
+        for days in range(1, 366, 7)
+    ] + [
+        {
+            "therapist_id": None,
+            "start_time": start - timedelta(days=days),
+            "end_time": start - timedelta(days=days - 1),
+        }
+        for days in range(150, 486, 30)
+    ]
+    await db_session.execute(insert(TherapistAvailability), availability)
+    await db_session.execute(insert(AvailabilityException), exceptions)
+    await db_session.execute(insert(Appointment), appointments)
+    await db_session.execute(insert(Invoice), invoices)
+    await db_session.execute(insert(SlotHold), holds)
+    await db_session.commit()
+    if db_session.bind.dialect.name == "sqlite":
+        await db_session.execute(text("ANALYZE"))
+    else:
+        for table in HOT_TABLES:
+            await db_session.execute(text(f"ANALYZE {table}"))
+    await db_session.commit()
+    return {
+        "therapist_id": therapist_ids[0],
+        "therapist_ids": therapist_ids[:3],
+        "patient_id": appointments[0]["patient_id"],
+        "treatment_id": treatment_id,
+        "appointment_ids": [row["id"] for row in appointments[:20]],
+        "start": start,
+    }
+
+
+def test_sequential_scan_detection():
+    """El detector reconoce recorridos completos en ambos dialectos."""
+    assert sequential_scans("sqlite", ["SCAN appointments"])
+    assert sequential_scans("sqlite", ["SCAN appointments USING INDEX ix"])
+    assert not sequential_scans(
+        "sqlite", ["SEARCH appointments USING INDEX ix (therapist_id=?)"]
+    )
+    assert not sequential_scans("sqlite", ["SCAN patients"])
+    assert sequential_scans("postgresql", ["Seq Scan on invoices  (cost=0..1)"])
+    assert not sequential_scans("postgresql", ["Index Scan using ix on invoices"])
+
+
+@pytest.mark.asyncio
+async def test_appointment_service_queries_use_indexes(db_session, seeded):
+    """Conflictos, disponibilidad y listados usan índices."""
+    therapist_id = seeded["therapist_id"]
+    start = seeded["start"]
+    async with captured_queries(db_session) as captured:
+        await has_conflict(db_session, therapist_id, start, start + timedelta(hours=1))
+        await is_within_availability(
+            db_session, therapist_id, start, start + timedelta(hours=1)
+        )
+        await list_therapist_appointments(db_session, therapist_id)
+        await list_patient_appointments(db_session, seeded["patient_id"])
+        await get_daily_availability(db_session, therapist_id, start.date())
+    await assert_no_sequential_scans(db_session, captured)
+
+
+@pytest.mark.asyncio
+async def test_free_slot_queries_use_indexes(db_session, seeded):
+    """El cálculo de huecos libres, diario y multi-día, usa índices."""
+    day = seeded["start"].date()
+    async with captured_queries(db_session) as captured:
+        await get_free_slots(db_session, seeded["therapist_id"], day, 30)
+        # Group treatments group the day's appointments into sessions
+        await get_free_slots(
+            db_session,
+            seeded["therapist_id"],
+            day,
+            30,
+            treatment_id=seeded["treatment_id"],
+            capacity=5,
+        )
+        await find_next_free_slots(
+            db_session,
+            30,
+            day,
+            day + timedelta(days=6),
+            therapist_ids=seeded["therapist_ids"],
+        )
+    await assert_no_sequential_scans(db_session, captured)
+
+
+@pytest.mark.asyncio
+async def test_invoice_queries_use_indexes(db_session, seeded):
+    """Las facturas de un paciente se buscan por índice de cita."""
+    async with captured_queries(db_session) as captured:
+        await list_patient_invoices(db_session, seeded["appointment_ids"])
+    await assert_no_sequential_scans(db_session, captured)
+
+
+@pytest.mark.asyncio
+async def test_slot_hold_queries_use_indexes(db_session, seeded):
+    """Las retenciones compartidas se buscan por terapeuta, paciente e id."""
+    backend = DatabaseSlotHoldBackend()
+    start = seeded["start"]
+    async with captured_queries(db_session) as captured:
+        await backend.active(
+            db_session, seeded["therapist_ids"], start, start + timedelta(days=1)
+        )
+        await backend.get(db_session, uuid4())
+    await assert_no_sequential_scans(db_session, captured)
+
+
+@pytest.mark.asyncio
+async def test_availability_lookups_are_index_only(db_session, seeded):
+    """Las consultas de disponibilidad se resuelven solo con el índice."""
+    therapist_id = seeded["therapist_id"]
+    start = seeded["start"]
+    async with captured_queries(db_session) as captured:
+        await is_within_availability(
+            db_session, therapist_id, start, start + timedelta(hours=1)
+        )
+        await get_daily_availability(db_session, therapist_id, start.date())
+        await load_schedule(
+            db_session, seeded["therapist_ids"], start.date(), start.date()
+        )
+    if db_session.bind.dialect.name != "sqlite":
+        pytest.skip("covering-index check reads SQLite plans")
+    lookups = [
+        line
+        for statement, parameters in captured
+        for line in await explain(db_session, statement, parameters)
+        if "therapist_availability" in line
+    ]
+    assert len(lookups) >= 3
+    for line in lookups:
+        assert "COVERING INDEX ix_therapist_availability_lookup" in line, line
@@ -0,0 +1,292 @@
+"""Tests y benchmarks del horario en bitmap de ticks de 5 minutos."""
+
+import random
+import sys
+import time as timer
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import insert
+
+from app.core import security
+from app.main import app
+from app.models.appointment import Appointment
+from app.models.therapist_availability import TherapistAvailability
+from app.schemas.availability import AvailabilityCreate
+from app.schemas.therapist import TherapistCreate
+from app.services import schedule_bitmap
+from app.services.availability_service import create_availability
+from app.services.free_slot_service import (
+    get_free_slots,
+    merge_intervals,
+    sweep_free_slots,
+)
+from app.services.schedule_bitmap import (
+    TICK_SECONDS,
+    TICKS_PER_DAY,
+    DayBitmap,
+    count_free_slots,
+    count_free_slots_by_day,
+    fitting_starts,
+    load_day_bitmaps,
+    tick_mask,
+)
+from app.services.therapist_service import create_therapist
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+
+
+def _random_day(rng):
+    """Bloques separados y citas alineadas a la rejilla de 5 minutos."""
+    blocks, cursor = [], rng.randrange(6, 9) * HOUR
+    for _ in range(rng.randrange(1, 4)):
+        start = cursor + rng.randrange(1, 7) * 5 * MINUTE
+        end = start + rng.randrange(12, 60) * 5 * MINUTE
+        if end > 23 * HOUR:
+            break
+        blocks.append((start, end))
+        cursor = end
+    appointments = []
+    for _ in range(rng.randrange(0, 15)):
+        start = rng.randrange(6 * 12, 22 * 12) * TICK_SECONDS
+        appointments.append((start, start + rng.choice((15, 30, 45, 60)) * MINUTE))
+    return blocks, appointments
+
+
+def test_tick_mask_rounding():
+    """Las citas bloquean ticks parciales; la disponibilidad no los reclama."""
+    assert tick_mask(0, TICK_SECONDS) == 1
+    assert tick_mask(60, 2 * TICK_SECONDS) == 0b11
+    assert tick_mask(60, 2 * TICK_SECONDS, inner=True) == 0b10
+    assert tick_mask(0, 24 * HOUR) == (1 << TICKS_PER_DAY) - 1
+    assert tick_mask(-HOUR, 0) == 0
+    assert fitting_starts(0b0111_1110, 3) == 0b0000_1111 << 1
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_bitmap_matches_interval_engine(seed):
+    """Huecos, conflictos y disponibilidad coinciden con el motor de intervalos."""
+    rng = random.Random(seed)
+    blocks, appointments = _random_day(rng)
+    bitmap = DayBitmap.from_intervals(blocks, appointments)
+    busy = merge_intervals(appointments)
+
+    for duration, step in [(30, 30), (30, 15), (60, 5), (45, 20)]:
+        expected = sweep_free_slots(blocks, busy, duration * MINUTE, step * MINUTE)
+        assert bitmap.free_slots(duration * MINUTE, step * MINUTE) == expected
+        assert bitmap.count_slots(duration * MINUTE, step * MINUTE) == len(expected)
+
+    for _ in range(50):
+        start = rng.randrange(0, 23 * 12) * TICK_SECONDS
+        end = start + rng.randrange(1, 24) * TICK_SECONDS
+        assert bitmap.has_conflict(start, end) == any(
+            s < end and e > start for s, e in busy
+        )
+        assert bitmap.is_within_availability(start, end) == any(
+            s <= start and end <= e for s, e in blocks
+        )
+
+
+def test_rejects_durations_off_the_tick_grid():
+    """Duraciones que no son múltiplo de 5 minutos no se aceptan."""
+    with pytest.raises(ValueError):
+        DayBitmap.from_intervals([(0, HOUR)]).free_slots(7 * MINUTE, 5 * MINUTE)
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_count_free_slots_paths_agree(use_numpy, monkeypatch):
+    """El conteo vectorizado y el de Python puro dan el mismo resultado."""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(schedule_bitmap, "np", None)
+    rng = random.Random(17)
+    bitmaps = [DayBitmap.from_intervals(*_random_day(rng)) for _ in range(200)]
+    bitmaps.append(DayBitmap())
+    for duration, step in [(30, 30), (60, 15), (45, 5)]:
+        assert count_free_slots(bitmaps, duration * MINUTE, step * MINUTE) == [
+            bitmap.count_slots(duration * MINUTE, step * MINUTE) for bitmap in bitmaps
+        ]
+
+
+@pytest.mark.asyncio
+async def test_load_day_bitmaps_spans_midnight(db_session):
+    """Las citas que cruzan la medianoche ocupan los dos días."""
+    therapist_id, day = uuid4(), date.today() + timedelta(days=200)
+    await db_session.execute(
+        insert(TherapistAvailability),
+        [
+            {
+                "therapist_id": therapist_id,
+                "day_of_week": d.weekday(),
+                "start_minute": 0,
+                "end_minute": 23 * 60 + 55,
+            }
+            for d in (day, day + timedelta(days=1))
+        ],
+    )
+    await db_session.execute(
+        insert(Appointment),
+        [
+            {
+                "patient_id": uuid4(),
+                "therapist_id": therapist_id,
+                "treatment_id": uuid4(),
+                "start_time": datetime.combine(day, time(23, 30)),
+                "end_time": datetime.combine(day + timedelta(days=1), time(0, 30)),
+            }
+        ],
+    )
+    await db_session.commit()
+
+    bitmaps = await load_day_bitmaps(
+        db_session, [therapist_id], day, day + timedelta(days=1)
+    )
+    assert bitmaps[(therapist_id, day)].busy == tick_mask(23 * HOUR + 1800, 24 * HOUR)
+    assert bitmaps[(therapist_id, day + timedelta(days=1))].busy == tick_mask(0, 1800)
+
+    counts = await count_free_slots_by_day(
+        db_session, [therapist_id], day, day + timedelta(days=1), 60
+    )
+    # Hourly grid from 00:00: 23:00 never fits before 23:55, 00:00 is taken on day 2
+    assert counts == {(therapist_id, day): 23, (therapist_id, day + timedelta(1)): 22}
+
+
+@pytest.mark.asyncio
+async def test_capacity_endpoint(client, db_session):
+    """El endpoint de capacidad cuenta los huecos libres por terapeuta y día."""
+    day = date.today() + timedelta(days=210)
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="Capacity", email=f"cap+{uuid4().hex}@example.com"),
+    )
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(
+            weekday=day.strftime("%A"), start_time=time(9), end_time=time(12)
+        ),
+    )
+    await db_session.execute(
+        insert(Appointment),
+        [
+            {
+                "patient_id": uuid4(),
+                "therapist_id": therapist.id,
+                "treatment_id": uuid4(),
+                "start_time": datetime.combine(day, time(10)),
+                "end_time": datetime.combine(day, time(11)),
+            }
+        ],
+    )
+    await db_session.commit()
+
+    params = {
+        "therapist_id": str(therapist.id),
+        "start_date": day.isoformat(),
+        "end_date": (day + timedelta(days=1)).isoformat(),
+        "duration_minutes": 60,
+    }
+    resp = client.get("/free-slots/capacity", params=params)
+    assert resp.status_code == 200
+    listed = await get_free_slots(db_session, therapist.id, day, 60)
+    assert resp.json() == [
+        {
+            "therapist_id": str(therapist.id),
+            "therapist_name": "Capacity",
+            "date": day.isoformat(),
+            "slots": len(listed),
+        },
+        {
+            "therapist_id": str(therapist.id),
+            "therapist_name": "Capacity",
+            "date": (day + timedelta(days=1)).isoformat(),
+            "slots": 0,
+        },
+    ]
+    assert len(listed) == 2
+
+    # Durations off the 5-minute grid and reversed windows are rejected
+    resp = client.get("/free-slots/capacity", params={**params, "duration_minutes": 7})
+    assert resp.status_code == 422
+    resp = client.get(
+        "/free-slots/capacity",
+        params={**params, "end_date": (day - timedelta(days=1)).isoformat()},
+    )
+    assert resp.status_code == 400
+
+    app.dependency_overrides[security.get_current_user] = lambda: {
+        "id": str(uuid4()),
+        "role": "therapist",
+    }
+    assert client.get("/free-slots/capacity", params=params).status_code == 403
+
+
+def test_memory_footprint():
+    """Un día ocupa unas decenas de bytes frente a una lista de intervalos."""
+    rng = random.Random(3)
+    blocks, appointments = _random_day(rng)
+    bitmap = DayBitmap.from_intervals(blocks, appointments)
+    bitmap_bytes = (
+        sys.getsizeof(bitmap)
+        + sys.getsizeof(bitmap.available)
+        + sys.getsizeof(bitmap.busy)
+    )
+    intervals = blocks + appointments
+    interval_bytes = sys.getsizeof(intervals) + sum(
+        sys.getsizeof(pair) + sys.getsizeof(pair[0]) + sys.getsizeof(pair[1])
+        for pair in intervals
+    )
+    assert not hasattr(bitmap, "__dict__")
+    assert bitmap_bytes <= 160
+    assert bitmap_bytes < interval_bytes
+
+
+def _dense_day():
+    """Un día lleno: una cita de 10 minutos cada cuarto de hora de 8:00 a 20:00."""
+    rng = random.Random(5)
+    appointments = [
+        (start, start + 10 * MINUTE) for start in range(8 * HOUR, 20 * HOUR, 900)
+    ]
+    bitmap = DayBitmap.from_intervals([(7 * HOUR, 21 * HOUR)], appointments)
+    queries = [
+        (start, start + 5 * MINUTE)
+        for start in (rng.randrange(7 * 12, 21 * 12) * TICK_SECONDS for _ in range(500))
+    ]
+    return appointments, bitmap, queries
+
+
+def _scan_conflicts(appointments, queries):
+    return [
+        any(s < end and e > start for s, e in appointments) for start, end in queries
+    ]
+
+
+def test_conflict_checks_match_interval_scan():
+    """El bitmap detecta exactamente los mismos conflictos que recorrer la lista."""
+    appointments, bitmap, queries = _dense_day()
+    expected = _scan_conflicts(appointments, queries)
+    assert [bitmap.has_conflict(start, end) for start, end in queries] == expected
+    assert any(expected) and not all(expected)
+
+
+@pytest.mark.benchmark
+def test_benchmark_conflict_checks():
+    """Benchmark: comprobaciones de conflicto por segundo, bitmap vs lista."""
+    appointments, bitmap, queries = _dense_day()
+
+    def best_of(fn, repeat=7):
+        timings = []
+        for _ in range(repeat):
+            started = timer.perf_counter()
+            fn()
+            timings.append(timer.perf_counter() - started)
+        return min(timings)
+
+    scan = best_of(lambda: _scan_conflicts(appointments, queries))
+    bits = best_of(lambda: [bitmap.has_conflict(start, end) for start, end in queries])
+    ops_per_second = len(queries) / bits
+    assert ops_per_second > 100_000
+    assert bits * 2 < scan
@@ -0,0 +1,286 @@
+"""Tests para la verificación de tokens JWT en app.core.security."""
+
+import asyncio
+import base64
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+
+from app.core import jwks as jwks_module
+from app.core import security
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.jwks import JWKSFetchError, JWKSManager, jwks_manager
+
+
+def _b64url_int(value: int) -> str:
+    data = value.to_bytes(32, "big")
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _make_ec_key(kid: str):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    numbers = private_key.public_key().public_numbers()
+    jwk_data = {
+        "kty": "EC",
+        "crv": "P-256",
+        "kid": kid,
+        "alg": "ES256",
+        "use": "sig",
+        "x": _b64url_int(numbers.x),
+        "y": _b64url_int(numbers.y),
+    }
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    return pem, jwk_data
+
+
+def _sign(pem: bytes, kid: str, **claims) -> str:
+    payload = {"sub": "user-1", "exp": int(time.time()) + 60, **claims}
+    return jwt.encode(payload, pem, algorithm="ES256", headers={"kid": kid})
+
+
+def _make_jwks(*kids):
+    keys = {kid: _make_ec_key(kid) for kid in kids}
+    data = {"keys": [jwk_data for _, jwk_data in keys.values()]}
+    return data, {kid: pem for kid, (pem, _) in keys.items()}
+
+
+@pytest.fixture()
+def jwks():
+    """Carga un JWKS con dos claves EC en la caché sin acceso a red."""
+    data, pems = _make_jwks("k1", "k2")
+    jwks_manager.load(data)
+    yield pems
+    jwks_manager.clear()
+
+
+def test_build_key_store_indexes_by_kid(jwks):
+    store = jwks_manager.key_store
+    assert set(store) == {"k1", "k2"}
+    assert all(alg == "ES256" for alg, _ in store.values())
+
+
+@pytest.mark.asyncio
+async def test_verify_token_jwks_uses_key_from_header(jwks, monkeypatch):
+    def _fail(*args, **kwargs):
+        raise AssertionError("JWK should not be re-parsed per request")
+
+    monkeypatch.setattr(jwks_module, "jwk_to_pem", _fail)
+    monkeypatch.setattr(jwks_module, "jwk_to_public_key", _fail)
+
+    token = _sign(jwks["k2"], "k2", email="a@example.com")
+    payload = await security._verify_token_jwks(token)
+    assert payload["sub"] == "user-1"
+
+
+@pytest.mark.asyncio
+async def test_verify_token_jwks_rejects_wrong_key(jwks):
+    # Firmado con la clave de k1 pero anunciando k2
+    token = _sign(jwks["k1"], "k2")
+    with pytest.raises(HTTPException) as exc:
+        await security._verify_token_jwks(token)
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_verify_token_jwks_unknown_kid_refreshes_once(jwks, monkeypatch):
+    calls = []
+
+    async def _fake_refresh():
+        calls.append(True)
+        return jwks_manager.key_store
+
+    monkeypatch.setattr(jwks_manager, "refresh", _fake_refresh)
+    monkeypatch.setattr(jwks_manager, "fetched_at", time.time() - 60)
+
+    token = _sign(jwks["k1"], "rotated")
+    with pytest.raises(HTTPException) as exc:
+        await security._verify_token_jwks(token)
+    assert exc.value.status_code == 401
+    assert calls == [True]
+
+
+@pytest.mark.asyncio
+async def test_jwks_manager_collapses_concurrent_refreshes(monkeypatch):
+    data, _ = _make_jwks("k1")
+    manager = JWKSManager("https://example.supabase.co")
+    fetched = []
+
+    async def _fake_fetch_url(client, url):
+        fetched.append(url)
+        await asyncio.sleep(0.01)
+        return data
+
+    monkeypatch.setattr(manager, "_fetch_url", _fake_fetch_url)
+
+    stores = await asyncio.gather(*(manager.get_key_store() for _ in range(20)))
+    assert len(fetched) == 1
+    assert all(set(store) == {"k1"} for store in stores)
+
+
+@pytest.mark.asyncio
+async def test_jwks_manager_serves_stale_keys_while_refreshing(monkeypatch):
+    old, _ = _make_jwks("old")
+    new, _ = _make_jwks("new")
+    manager = JWKSManager("https://example.supabase.co", ttl=300, refresh_ahead=60)
+    manager.load(old)
+    manager.fetched_at = time.time() - 250
+    release = asyncio.Event()
+
+    async def _slow_fetch_url(client, url):
+        await release.wait()
+        return new
+
+    monkeypatch.setattr(manager, "_fetch_url", _slow_fetch_url)
+
+    store = await manager.get_key_store()
+    assert set(store) == {"old"}
+
+    release.set()
+    await manager._refresh_task
+    assert set(await manager.get_key_store()) == {"new"}
+
+
+@pytest.mark.asyncio
+async def test_jwks_manager_remembers_working_endpoint(monkeypatch):
+    data, _ = _make_jwks("k1")
+    manager = JWKSManager("https://example.supabase.co")
+    working = manager.candidates[2]
+    tried = []
+
+    async def _fake_fetch_url(client, url):
+        tried.append(url)
+        if url != working:
+            raise ValueError("not here")
+        return data
+
+    monkeypatch.setattr(manager, "_fetch_url", _fake_fetch_url)
+
+    await manager.refresh()
+    assert manager.endpoint == working
+    assert len(tried) == 3
+
+    tried.clear()
+    await manager.refresh()
+    assert tried == [working]
+
+
+def _hs256_token(exp_delta: int = 60, **claims) -> str:
+    payload = {"sub": "user-hs", "exp": int(time.time()) + exp_delta, **claims}
+    return jwt.encode(payload, security.settings.supabase_secret_key, "HS256")
+
+
+def _bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_caches_verified_token(monkeypatch):
+    security.TOKEN_CACHE.clear()
+    calls = []
+    original = security._verify_token_hs256
+
+    def _counting_verify(token):
+        calls.append(token)
+        return original(token)
+
+    monkeypatch.setattr(security, "_verify_token_hs256", _counting_verify)
+
+    token = _hs256_token(role="therapist")
+    first = await security.get_current_user(_bearer(token))
+    second = await security.get_current_user(_bearer(token))
+
+    assert first == second
+    assert first["role"] == "therapist"
+    assert len(calls) == 1
+    stats = security.TOKEN_CACHE.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_token_cache_expires_with_token():
+    cache = security.VerifiedTokenCache(max_size=4)
+    expired_at = int(time.time()) - security.LEEWAY - 1
+    cache.set("tok", {"exp": expired_at}, {"id": "u"})
+    assert cache.get("tok") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = security.VerifiedTokenCache(max_size=2)
+    exp = {"exp": int(time.time()) + 60}
+    cache.set("a", exp, {"id": "a"})
+    cache.set("b", exp, {"id": "b"})
+    assert cache.get("a") == {"id": "a"}
+    cache.set("c", exp, {"id": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"id": "a"}
+    assert cache.get("c") == {"id": "c"}
+
+
+@pytest.mark.asyncio
+async def test_jwks_manager_keeps_last_known_keys_during_outage(monkeypatch):
+    data, _ = _make_jwks("k1")
+    manager = JWKSManager("https://example.supabase.co", max_stale=60)
+    manager.load(data)
+    manager.fetched_at = time.time() - 120
+    monkeypatch.setattr(manager, "breaker", CircuitBreaker("test-jwks"))
+
+    async def _down(client, url):
+        raise ConnectionError("supabase unreachable")
+
+    monkeypatch.setattr(manager, "_fetch_url", _down)
+
+    assert set(await manager.get_key_store()) == {"k1"}
+    # El fallo queda en caché negativa: el siguiente intento no llega a la red
+    monkeypatch.setattr(manager, "_fetch_url", None)
+    assert set(await manager.get_key_store()) == {"k1"}
+
+
+@pytest.mark.asyncio
+async def test_jwks_manager_cold_cache_fails_fast_when_open(monkeypatch):
+    manager = JWKSManager("https://example.supabase.co")
+    breaker = CircuitBreaker("test-jwks", failure_threshold=1)
+    breaker.record_failure()
+    monkeypatch.setattr(manager, "breaker", breaker)
+
+    with pytest.raises(JWKSFetchError):
+        await manager.get_key_store()
+
+
+@pytest.mark.asyncio
+async def test_asymmetric_token_skips_hs256(jwks, monkeypatch):
+    def _fail(token):
+        raise AssertionError("HS256 should not be attempted for ES256 tokens")
+
+    monkeypatch.setattr(security, "_verify_token_hs256", _fail)
+
+    payload = await security._verify_token(_sign(jwks["k1"], "k1"))
+    assert payload["sub"] == "user-1"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "mode, accepted",
+    [("hs256", {"HS256"}), ("jwks", {"ES256"}), ("both", {"HS256", "ES256"})],
+)
+async def test_verification_mode_allow_list(jwks, monkeypatch, mode, accepted):
+    monkeypatch.setattr(security.settings, "jwt_verification_mode", mode)
+    tokens = {"HS256": _hs256_token(), "ES256": _sign(jwks["k1"], "k1")}
+
+    for alg, token in tokens.items():
+        if alg in accepted:
+            assert (await security._verify_token(token))["sub"]
+        else:
+            with pytest.raises(HTTPException) as exc:
+                await security._verify_token(token)
+            assert exc.value.detail == "Unsupported token algorithm"
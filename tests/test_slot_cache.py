@@ -0,0 +1,166 @@
+"""Tests de la caché versionada de slots libres y sus ETags."""
+
+from datetime import date, time, timedelta
+from uuid import uuid4
+
+import pytest
+
+from app.core.slot_cache import (
+    InMemorySlotCacheBackend,
+    RedisSlotCacheBackend,
+    SlotCache,
+    slot_cache,
+)
+from app.routers import free_slots as free_slots_router
+from app.schemas.availability import AvailabilityCreate
+from app.schemas.therapist import TherapistCreate
+from app.schemas.treatment import TreatmentCreate
+from app.services.availability_service import create_availability
+from app.services.therapist_service import create_therapist
+from app.services.treatment_service import create_treatment
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value).encode()
+        return True
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b"0")) + 1).encode()
+        return int(self.data[key])
+
+
+def _redis_backend():
+    backend = RedisSlotCacheBackend.__new__(RedisSlotCacheBackend)
+    backend.client = _FakeRedis()
+    backend.prefix = "test"
+    return backend
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("make_backend", [InMemorySlotCacheBackend, _redis_backend])
+async def test_bump_invalidates_only_affected_entries(make_backend):
+    """Un cambio en un día solo invalida ese día; uno de disponibilidad, todos."""
+    cache = SlotCache(make_backend())
+    therapist_id = uuid4()
+    monday, tuesday = date(2030, 1, 7), date(2030, 1, 8)
+    calls = []
+
+    async def cached(day):
+        version = await cache.version(therapist_id, day)
+        etag = cache.etag(version, "free-slots", therapist_id, day, 30, None)
+
+        async def _compute():
+            calls.append(day)
+            return [{"day": str(day)}]
+
+        return etag, await cache.get_or_compute(etag, _compute)
+
+    etag_monday, value = await cached(monday)
+    assert value == [{"day": "2030-01-07"}]
+    assert (await cached(monday))[0] == etag_monday
+    etag_tuesday, _ = await cached(tuesday)
+    assert calls == [monday, tuesday]
+
+    await cache.bump_days(therapist_id, [monday])
+    assert (await cached(monday))[0] != etag_monday
+    assert (await cached(tuesday))[0] == etag_tuesday
+    assert calls == [monday, tuesday, monday]
+
+    await cache.bump_therapist(therapist_id)
+    assert (await cached(tuesday))[0] != etag_tuesday
+    assert calls == [monday, tuesday, monday, tuesday]
+
+
+@pytest.mark.asyncio
+async def test_free_slots_endpoint_caches_and_revalidates(
+    client, db_session, monkeypatch
+):
+    """El endpoint responde con ETag, 304 al revalidar y se invalida al escribir."""
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="Cache", email=f"cache+{uuid4().hex}@example.com"),
+    )
+    treatment = await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"Cache-{uuid4().hex}", description="x", duration_minutes=60, price=1
+        ),
+    )
+    day = date.today() + timedelta(days=5)
+    weekday = day.strftime("%A").lower()
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(weekday=weekday, start_time=time(9), end_time=time(11)),
+    )
+
+    calls = []
+    original = free_slots_router.get_free_slots
+
+    async def _counting(*args, **kwargs):
+        calls.append(args)
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(free_slots_router, "get_free_slots", _counting)
+    params = {
+        "therapist_id": str(therapist.id),
+        "treatment_id": str(treatment.id),
+        "day": day.isoformat(),
+    }
+
+    first = client.get("/free-slots/", params=params)
+    second = client.get("/free-slots/", params=params)
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert len(first.json()) == 2
+    etag = first.headers["ETag"]
+    assert second.headers["ETag"] == etag
+    assert len(calls) == 1
+
+    revalidated = client.get(
+        "/free-slots/", params=params, headers={"If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+
+    # Another step is another representation
+    stepped = client.get("/free-slots/", params={**params, "step_minutes": 30})
+    assert stepped.headers["ETag"] != etag
+    assert len(stepped.json()) == 3
+
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(weekday=weekday, start_time=time(15), end_time=time(16)),
+    )
+    refreshed = client.get(
+        "/free-slots/", params=params, headers={"If-None-Match": etag}
+    )
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != etag
+    assert len(refreshed.json()) == 3
+
+
+def test_availability_endpoint_sends_etag(client):
+    """`GET /availability` también expone ETag y responde 304 si no cambió."""
+    params = {"date": "2030-01-07", "therapist_id": str(uuid4())}
+    response = client.get("/availability", params=params)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get(
+        "/availability", params=params, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    stats = slot_cache.stats()
+    assert stats["size"] >= 1
@@ -0,0 +1,180 @@
+"""Tests del calendario de slots materializado y su mantenimiento incremental."""
+
+import random
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import BackgroundTasks
+from sqlalchemy import event
+
+from app.models.appointment import Appointment
+from app.schemas.appointment import AppointmentCreate, AppointmentUpdate
+from app.schemas.availability import AvailabilityCreate
+from app.schemas.patient import PatientCreate
+from app.schemas.therapist import TherapistCreate
+from app.schemas.treatment import TreatmentCreate
+from app.services.appointment_service import (
+    create_appointment,
+    delete_appointment,
+    update_appointment,
+)
+from app.services.availability_service import (
+    create_availability,
+    delete_availability_slot,
+)
+from app.services.free_slot_service import (
+    free_intervals,
+    get_free_slots,
+    merge_intervals,
+    read_calendar,
+    slots_in_free_intervals,
+    sweep_free_slots,
+)
+from app.services.patient_service import create_patient
+from app.services.slot_calendar_service import check_consistency, rebuild_calendar
+from app.services.therapist_service import create_therapist
+from app.services.treatment_service import create_treatment
+
+MINUTE = 60
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_free_intervals_reproduce_sweep(seed):
+    """Los intervalos libres materializados generan los mismos slots que el barrido."""
+    rng = random.Random(seed)
+    busy = []
+    for _ in range(30):
+        start = rng.randrange(6 * 60, 22 * 60, 5) * MINUTE
+        busy.append((start, start + rng.choice((15, 30, 45)) * MINUTE))
+    busy = merge_intervals(busy)
+    blocks = [(8 * 60 * MINUTE, 12 * 60 * MINUTE), (13 * 60 * MINUTE, 20 * 60 * MINUTE)]
+
+    intervals = free_intervals(blocks, busy)
+    for duration, step in [(30, 30), (30, 5), (60, 15), (45, 20)]:
+        assert slots_in_free_intervals(
+            intervals, duration * MINUTE, step * MINUTE
+        ) == sweep_free_slots(blocks, busy, duration * MINUTE, step * MINUTE)
+
+
+async def _setup(db_session):
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="Calendar", email=f"cal+{uuid4().hex}@example.com"),
+    )
+    treatment = await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"Cal-{uuid4().hex}", description="x", duration_minutes=30, price=1
+        ),
+    )
+    patient = await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="C",
+            last_name="L",
+            email=f"cl+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+    return therapist, treatment, patient
+
+
+@pytest.mark.asyncio
+async def test_calendar_is_maintained_by_writes(db_session):
+    """Cada escritura de citas o disponibilidad actualiza el calendario."""
+    therapist, treatment, patient = await _setup(db_session)
+    day = date.today() + timedelta(days=7)
+    weekday = day.strftime("%A").lower()
+
+    slot = await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(weekday=weekday, start_time=time(9), end_time=time(11)),
+    )
+    assert await read_calendar(db_session, therapist.id, day) == [
+        (9 * 3600, 9 * 3600, 11 * 3600)
+    ]
+
+    appointment = await create_appointment(
+        db_session,
+        patient.id,
+        AppointmentCreate(
+            therapist_id=therapist.id,
+            treatment_id=treatment.id,
+            start_time=datetime.combine(day, time(9, 30)),
+        ),
+        BackgroundTasks(),
+    )
+    assert await check_consistency(db_session, [therapist.id]) == []
+
+    statements = []
+    sync_engine = db_session.bind.sync_engine
+
+    def _count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", _count)
+    try:
+        slots = await get_free_slots(db_session, therapist.id, day, 30)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _count)
+    assert len(statements) == 1
+    assert [s["start_time"][11:16] for s in slots] == ["09:00", "10:00", "10:30"]
+
+    await update_appointment(
+        db_session,
+        appointment,
+        AppointmentUpdate(
+            start_time=datetime.combine(day, time(10)),
+            end_time=datetime.combine(day, time(10, 30)),
+        ),
+    )
+    slots = await get_free_slots(db_session, therapist.id, day, 30)
+    assert [s["start_time"][11:16] for s in slots] == ["09:00", "09:30", "10:30"]
+    assert await check_consistency(db_session, [therapist.id]) == []
+
+    await delete_appointment(db_session, appointment)
+    assert len(await get_free_slots(db_session, therapist.id, day, 30)) == 4
+    assert await check_consistency(db_session, [therapist.id]) == []
+
+    await delete_availability_slot(db_session, slot.id)
+    assert await read_calendar(db_session, therapist.id, day) == []
+    assert await check_consistency(db_session, [therapist.id]) == []
+
+
+@pytest.mark.asyncio
+async def test_checker_detects_drift_and_rebuild_fixes_it(db_session):
+    """Una escritura fuera del servicio se detecta y el rebuild la corrige."""
+    therapist, treatment, patient = await _setup(db_session)
+    day = date.today() + timedelta(days=3)
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(
+            weekday=day.strftime("%A").lower(), start_time=time(9), end_time=time(12)
+        ),
+    )
+
+    # Bypass the service layer so the calendar is not refreshed
+    db_session.add(
+        Appointment(
+            patient_id=patient.id,
+            therapist_id=therapist.id,
+            treatment_id=treatment.id,
+            start_time=datetime.combine(day, time(10)),
+            end_time=datetime.combine(day, time(11)),
+        )
+    )
+    await db_session.commit()
+
+    problems = await check_consistency(db_session, [therapist.id])
+    assert [(p["day"], p["issue"]) for p in problems] == [(day, "mismatch")]
+    problems = await check_consistency(db_session, [therapist.id], include_missing=True)
+    assert {p["issue"] for p in problems} == {"mismatch", "missing"}
+
+    summary = await rebuild_calendar(db_session, [therapist.id])
+    assert summary["therapists"] == 1
+    assert await check_consistency(db_session, [therapist.id]) == []
+    slots = await get_free_slots(db_session, therapist.id, day, 60)
+    assert [s["start_time"][11:16] for s in slots] == ["09:00", "11:00"]
@@ -0,0 +1,263 @@
+"""Tests de las retenciones temporales de slots (holds) con expiración."""
+
+from datetime import date, datetime, time, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+
+from app.core.slot_holds import (
+    DatabaseSlotHoldBackend,
+    Hold,
+    InMemorySlotHoldBackend,
+    slot_holds,
+    utcnow,
+)
+from app.schemas.appointment import AppointmentCreate, SlotHoldCreate
+from app.schemas.availability import AvailabilityCreate
+from app.schemas.patient import PatientCreate
+from app.schemas.therapist import TherapistCreate
+from app.schemas.treatment import TreatmentCreate
+from app.services import appointment_service
+from app.services.appointment_batch_service import validate_bookings
+from app.services.appointment_service import create_appointment
+from app.services.availability_service import create_availability
+from app.services.free_slot_service import find_next_free_slots, get_free_slots
+from app.services.patient_service import create_patient
+from app.services.slot_hold_service import confirm_hold, hold_slot, release_hold
+from app.services.therapist_service import create_therapist
+from app.services.treatment_service import create_treatment
+
+
+@pytest.fixture(params=["memory", "database"])
+def backend(request, monkeypatch):
+    store = (
+        InMemorySlotHoldBackend()
+        if request.param == "memory"
+        else DatabaseSlotHoldBackend()
+    )
+    monkeypatch.setattr(slot_holds, "backend", store)
+    return store
+
+
+async def _patient(db_session):
+    return await create_patient(
+        db_session,
+        PatientCreate(
+            first_name="H",
+            last_name="O",
+            email=f"ho+{uuid4().hex}@example.com",
+            supabase_user_id=uuid4().hex,
+        ),
+    )
+
+
+async def _setup(db_session):
+    therapist = await create_therapist(
+        db_session,
+        TherapistCreate(name="Holds", email=f"hold+{uuid4().hex}@example.com"),
+    )
+    treatment = await create_treatment(
+        db_session,
+        TreatmentCreate(
+            name=f"Hold-{uuid4().hex}", description="x", duration_minutes=30, price=1
+        ),
+    )
+    day = date.today() + timedelta(days=5)
+    await create_availability(
+        db_session,
+        therapist.id,
+        AvailabilityCreate(
+            weekday=day.strftime("%A"), start_time=time(18), end_time=time(20)
+        ),
+    )
+    first = await _patient(db_session)
+    second = await _patient(db_session)
+    return therapist, treatment, first, second, day
+
+
+def _starts(slots):
+    return [slot["start_time"][11:16] for slot in slots]
+
+
+@pytest.mark.asyncio
+async def test_in_memory_backend_expires_holds_lazily():
+    """El índice en memoria descarta las retenciones caducadas al consultarlo."""
+    store = InMemorySlotHoldBackend()
+    therapist_id, now = uuid4(), utcnow()
+
+    def _hold(minutes, expires_in):
+        start = now + timedelta(minutes=minutes)
+        return Hold(
+            id=uuid4(),
+            therapist_id=therapist_id,
+            patient_id=uuid4(),
+            treatment_id=uuid4(),
+            start_time=start,
+            end_time=start + timedelta(minutes=30),
+            expires_at=now + timedelta(seconds=expires_in),
+        )
+
+    live, expired = _hold(0, 300), _hold(60, -1)
+    await store.add(None, live)
+    await store.add(None, expired)
+    window = (now, now + timedelta(hours=2))
+    assert await store.active(None, [therapist_id], *window) == [live]
+    assert len(store) == 1 and await store.get(None, expired.id) is None
+
+    await store.remove_patient(None, live.patient_id)
+    assert len(store) == 0
+    assert store.by_therapist == {} and store.by_patient == {}
+
+
+@pytest.mark.asyncio
+async def test_hold_blocks_others_until_confirmed(db_session, backend):
+    """Una retención oculta el slot y bloquea a otros pacientes hasta confirmarla."""
+    therapist, treatment, holder, other, day = await _setup(db_session)
+    start = datetime.combine(day, time(18, 30))
+
+    hold = await hold_slot(
+        db_session,
+        holder.id,
+        SlotHoldCreate(
+            therapist_id=therapist.id, treatment_id=treatment.id, start_time=start
+        ),
+    )
+    assert hold.end_time == start + timedelta(minutes=30)
+    assert hold.expires_at > utcnow()
+
+    slots = await get_free_slots(db_session, therapist.id, day, 30)
+    assert _starts(slots) == ["18:00", "19:00", "19:30"]
+    found = await find_next_free_slots(
+        db_session, 30, day, day, therapist_ids=[therapist.id]
+    )
+    assert "18:30" not in _starts(found)
+    assert await validate_bookings(
+        db_session, [(therapist.id, start, start + timedelta(minutes=30))]
+    ) == ["held"]
+
+    booking = AppointmentCreate(
+        therapist_id=therapist.id, treatment_id=treatment.id, start_time=start
+    )
+    with pytest.raises(HTTPException) as exc:
+        await create_appointment(db_session, other.id, booking, BackgroundTasks())
+    assert exc.value.status_code == 409
+    with pytest.raises(HTTPException) as exc:
+        await hold_slot(
+            db_session,
+            other.id,
+            SlotHoldCreate(
+                therapist_id=therapist.id,
+                treatment_id=treatment.id,
+                start_time=start + timedelta(minutes=15),
+            ),
+        )
+    assert exc.value.status_code == 409
+
+    # Someone else's hold is not theirs to confirm or release
+    with pytest.raises(HTTPException) as exc:
+        await confirm_hold(db_session, other.id, hold.id, BackgroundTasks())
+    assert exc.value.status_code == 404
+
+    appointment = await confirm_hold(
+        db_session, holder.id, hold.id, BackgroundTasks(), notes="Evening"
+    )
+    assert appointment.start_time == start and appointment.notes == "Evening"
+    assert await slot_holds.get(db_session, hold.id) is None
+    slots = await get_free_slots(db_session, therapist.id, day, 30)
+    assert _starts(slots) == ["18:00", "19:00", "19:30"]
+
+
+@pytest.mark.asyncio
+async def test_released_and_expired_holds_free_the_slot(
+    db_session, backend, monkeypatch
+):
+    """Liberar o dejar caducar la retención devuelve el slot a los demás."""
+    therapist, treatment, holder, other, day = await _setup(db_session)
+    data = SlotHoldCreate(
+        therapist_id=therapist.id,
+        treatment_id=treatment.id,
+        start_time=datetime.combine(day, time(19)),
+    )
+
+    hold = await hold_slot(db_session, holder.id, data)
+    # A new hold replaces the patient's previous one
+    moved = await hold_slot(
+        db_session,
+        holder.id,
+        data.model_copy(update={"start_time": datetime.combine(day, time(18))}),
+    )
+    assert await slot_holds.get(db_session, hold.id) is None
+    assert await release_hold(db_session, holder.id, moved.id) == {
+        "detail": "Hold released"
+    }
+    assert len(await get_free_slots(db_session, therapist.id, day, 30)) == 4
+
+    monkeypatch.setattr(slot_holds, "ttl", -1)
+    expired = await hold_slot(db_session, holder.id, data)
+    assert await slot_holds.get(db_session, expired.id) is None
+    assert len(await get_free_slots(db_session, therapist.id, day, 30)) == 4
+    await create_appointment(
+        db_session,
+        other.id,
+        AppointmentCreate(
+            therapist_id=therapist.id,
+            treatment_id=treatment.id,
+            start_time=data.start_time,
+        ),
+        BackgroundTasks(),
+    )
+    with pytest.raises(HTTPException) as exc:
+        await release_hold(db_session, holder.id, expired.id)
+    assert exc.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_hold_endpoints(client, db_session, monkeypatch):
+    """Endpoints de retener, confirmar y liberar, y su efecto en el ETag de slots."""
+    from app.core import security
+    from app.main import app as _app
+
+    monkeypatch.setattr(slot_holds, "backend", InMemorySlotHoldBackend())
+
+    async def _no_notification(*args, **kwargs):
+        return None
+
+    # The client runs background tasks; the booking notifications are not tested here
+    monkeypatch.setattr(appointment_service, "send_appointment", _no_notification)
+    monkeypatch.setattr(appointment_service, "send_push_to_user", _no_notification)
+    therapist, treatment, holder, _, day = await _setup(db_session)
+    params = {
+        "therapist_id": str(therapist.id),
+        "treatment_id": str(treatment.id),
+        "day": day.isoformat(),
+    }
+    before = client.get("/free-slots/", params=params)
+
+    _app.dependency_overrides[security.get_current_user] = lambda: {
+        "id": holder.supabase_user_id,
+        "role": "patient",
+    }
+    payload = {
+        "therapist_id": str(therapist.id),
+        "treatment_id": str(treatment.id),
+        "start_time": datetime.combine(day, time(18)).isoformat(),
+    }
+    resp = client.post("/appointments/holds", json=payload)
+    assert resp.status_code == 200
+    hold = resp.json()
+    assert hold["patient_id"] == str(holder.id)
+
+    after = client.get("/free-slots/", params=params)
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert len(after.json()) == len(before.json()) - 1
+
+    assert client.delete(f"/appointments/holds/{hold['id']}").status_code == 200
+    assert client.get("/free-slots/", params=params).json() == before.json()
+
+    hold = client.post("/appointments/holds", json=payload).json()
+    resp = client.post(f"/appointments/holds/{hold['id']}/confirm", json={})
+    assert resp.status_code == 200
+    assert resp.json()["start_time"].startswith(payload["start_time"])
+    resp = client.post(f"/appointments/holds/{hold['id']}/confirm", json={})
+    assert resp.status_code == 404